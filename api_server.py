@@ -2,35 +2,84 @@
 Простой API сервер для приема отчетов от Mini App
 """
 
+import hmac
 import json
+import os
 import asyncio
-from datetime import datetime
+from email.utils import format_datetime
 from aiohttp import web
 from services.database import DatabaseService
 from bot.config import Config
-from utils.logger import get_logger
+from utils.logger import get_logger, get_correlation_id, bind_correlation_id, reset_correlation_id
+from utils.metrics import REGISTRY, CONTENT_TYPE
+from services.reports import (
+    REPORT_FIELDS, REPORT_LIMITS, parse_report_date, parse_submission_id, submit_report
+)
+from services.history import HISTORY_REQUESTS, history_page, parse_month
+from services.webapp_assets import WebAppAssets
+from services.webapp_auth import InitDataError, default_verifier
+from utils.timezone import business_today, format_moscow_time
 
 logger = get_logger(__name__)
 
+WEBAPP_PREFIX = '/webapp'
+
+WEBAPP_RESPONSES = REGISTRY.counter(
+    'webapp_responses', 'Mini App static responses by status and content encoding', ['status', 'encoding']
+)
+
+@web.middleware
+async def correlation_middleware(request, handler):
+    """Привязка correlation ID к запросу (берётся из X-Request-ID или генерируется)"""
+    token = bind_correlation_id(request.headers.get('X-Request-ID'), prefix='api')
+    try:
+        response = await handler(request)
+        response.headers['X-Request-ID'] = get_correlation_id()
+        return response
+    finally:
+        reset_correlation_id(token)
+
+async def _webapp_user(request):
+    """Сотрудник, открывший Mini App: (user, None) или (None, ответ с ошибкой)
+
+    Личность берётся только из initData в заголовке Authorization: tma <initData>.
+    """
+    try:
+        init_data = request.app['webapp_auth'].from_header(request.headers.get('Authorization'))
+    except InitDataError as e:
+        logger.warning(f"API: {request.path} rejected: {e}")
+        return None, web.json_response({'error': 'Unauthorized'}, status=401)
+
+    user = await request.app['db'].get_user(init_data.telegram_id)
+    if not user:
+        return None, web.json_response({'error': 'User not found'}, status=404)
+    return user, None
+
+def _report_payload(report, user) -> dict:
+    """Отчёт для формы: значения и время отправки в поясе сотрудника"""
+    return {
+        'id': report.id,
+        'report_date': report.report_date,
+        **{field: getattr(report, field) for field in REPORT_FIELDS},
+        'submitted_at': format_moscow_time(report.submitted_at, tz_name=user.timezone),
+    }
+
 async def submit_report_handler(request):
-    """Обработка отправки отчета через API"""
+    """Отправка отчёта формой напрямую, без sendData и Bot API; ответ — подтверждение записи"""
     try:
+        user, error = await _webapp_user(request)
+        if error is not None:
+            return error
+
         data = await request.json()
-        logger.info(f"API: Received report data: {data}")
+        logger.info(f"API: Received report data from {user.full_name}: {data}")
 
         # Валидация данных
-        required_fields = ['calls_count', 'kp_plus', 'kp', 'rejections', 'inadequate', 'telegram_user_id']
-        for field in required_fields:
+        for field in REPORT_FIELDS:
             if field not in data:
                 return web.json_response({'error': f'Missing field: {field}'}, status=400)
 
-        # Инициализация базы данных
-        db = DatabaseService()
-
-        # Получение пользователя
-        user = await db.get_user(data['telegram_user_id'])
-        if not user:
-            return web.json_response({'error': 'User not found'}, status=404)
+        db = request.app['db']
 
         # Валидация данных
         try:
@@ -51,36 +100,35 @@ async def submit_report_handler(request):
         if (kp_plus + kp) > calls_count:
             return web.json_response({'error': 'Resultative calls exceed total calls'}, status=400)
 
-        # Сохранение отчёта
-        today = datetime.now().strftime('%Y-%m-%d')
-        report = await db.create_report(
-            user_id=user.id,
-            report_date=today,
-            calls_count=calls_count,
-            kp_plus=kp_plus,
-            kp=kp,
-            rejections=rejections,
-            inadequate=inadequate
-        )
-
-        if report:
-            # Отправка в Google Sheets (если нужно)
-            from bot.handlers.report import send_to_google_sheets
-            google_sheets_data = {
-                "employee_name": user.full_name,
-                "report_date": today,
-                "calls_count": calls_count,
-                "kp_plus": kp_plus,
-                "kp": kp,
-                "rejections": rejections,
-                "inadequate": inadequate
-            }
-
-            await send_to_google_sheets(google_sheets_data)
+        try:
+            submission_id = parse_submission_id(data.get('submission_id'))
+        except ValueError:
+            return web.json_response({'error': 'Invalid submission_id'}, status=400)
+
+        # Отправка из офлайн-очереди формы несёт дату нажатия, а не сегодняшнюю
+        try:
+            report_date = parse_report_date(data.get('report_date'), user.timezone)
+        except ValueError as e:
+            logger.warning(f"API: {e} from {user.full_name}")
+            return web.json_response({'error': 'Invalid report_date'}, status=400)
 
+        # Сохранение отчёта, выгрузка и уведомление админа (повтор той же отправки ничего не делает)
+        values = {
+            'calls_count': calls_count, 'kp_plus': kp_plus, 'kp': kp,
+            'rejections': rejections, 'inadequate': inadequate,
+        }
+        result = await submit_report(db, user, values, submission_id, bot=request.app['bot'],
+                                     report_date=report_date)
+
+        if result:
             return web.json_response({
                 'status': 'success',
-                'message': 'Вы успешно передали данные'
+                'message': 'Вы успешно передали данные',
+                'duplicate': result.duplicate,
+                'report_id': result.report.id,
+                'report_date': result.report.report_date,
+                'report': _report_payload(result.report, user),
+                'sheets': result.sheets_ok,
             })
         else:
             return web.json_response({'error': 'Failed to save report'}, status=500)
@@ -89,12 +137,159 @@ async def submit_report_handler(request):
         logger.error(f"API error: {e}")
         return web.json_response({'error': 'Internal server error'}, status=500)
 
-async def init_api_app():
-    """Инициализация API приложения"""
-    app = web.Application()
-    app.router.add_post('/api/submit_report', submit_report_handler)
+async def bootstrap_handler(request):
+    """Всё, что нужно форме при открытии, одним ответом: сотрудник, сегодняшний отчёт и правила проверки
+
+    Запрос подписан initData Mini App (Authorization: tma <initData>).
+    """
+    user, error = await _webapp_user(request)
+    if error is not None:
+        return error
+
+    report_date = business_today(user.timezone)
+    report = await request.app['db'].get_report(user.id, report_date)
+    return web.json_response({
+        'user': {
+            'telegram_id': user.telegram_id,
+            'full_name': user.full_name,
+            'timezone': user.timezone or Config.TIMEZONE,
+        },
+        'report_date': report_date,
+        'report': _report_payload(report, user) if report else None,
+        'limits': dict(REPORT_LIMITS, late_days=Config.LATE_REPORT_DAYS),
+    }, headers={'Cache-Control': 'no-store'})
+
+async def history_handler(request):
+    """Месяц истории отчётов сотрудника для календаря: GET /api/history?month=YYYY-MM
+
+    Ответ несёт ETag и Last-Modified; неизменившийся месяц — 304 без тела.
+    """
+    user, error = await _webapp_user(request)
+    if error is not None:
+        return error
+
+    try:
+        month = parse_month(request.query.get('month'), user.timezone)
+    except ValueError:
+        return web.json_response({'error': 'Invalid month'}, status=400)
+
+    page = await history_page(request.app['db'], user, month)
+    if page is None:
+        return web.json_response({'error': 'Internal server error'}, status=500)
+
+    # Ответ личный: в общих кэшах не хранится, браузер каждый раз сверяет его по ETag
+    headers = {'Cache-Control': 'private, no-cache', 'ETag': f'"{page.etag}"', 'Vary': 'Authorization'}
+    if page.last_modified:
+        headers['Last-Modified'] = format_datetime(page.last_modified, usegmt=True)
+    if page.not_modified(request.if_none_match, request.if_modified_since):
+        HISTORY_REQUESTS.inc(result='not_modified')
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=page.body, content_type='application/json', charset='utf-8', headers=headers)
+
+class AssetFileResponse(web.FileResponse):
+    """FileResponse с ETag по содержимому вместо mtime-size файла
+
+    Сжатые варианты лежат в кэше и пересоздаются после перезапуска — тег
+    по времени изменения менялся бы без изменения содержимого.
+    """
+
+    def __init__(self, path, etag: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._asset_etag = etag
+
+    @web.FileResponse.etag.setter
+    def etag(self, value):
+        web.StreamResponse.etag.fset(self, self._asset_etag)
+
+async def webapp_handler(request):
+    """Статика Mini App: сжатый вариант по Accept-Encoding, 304 по If-None-Match"""
+    asset = request.app['webapp'].get(request.match_info['path'])
+    if asset is None:
+        raise web.HTTPNotFound()
+
+    encoding, path = asset.select(request.headers.get('Accept-Encoding', ''))
+    headers = {
+        'Cache-Control': asset.cache_control,
+        'Content-Type': asset.content_type,
+    }
+    if asset.variants:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if request.if_none_match and asset.matches(request.if_none_match):
+        WEBAPP_RESPONSES.inc(status='304', encoding=encoding or 'identity')
+        headers['ETag'] = f'"{asset.etag(encoding)}"'
+        del headers['Content-Type']
+        return web.Response(status=304, headers=headers)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    WEBAPP_RESPONSES.inc(status='200', encoding=encoding or 'identity')
+    return AssetFileResponse(path, asset.etag(encoding), headers=headers)
+
+async def webapp_redirect_handler(request):
+    raise web.HTTPMovedPermanently(f"{WEBAPP_PREFIX}/{'?' + request.query_string if request.query_string else ''}")
+
+LOOPBACK = ('127.0.0.1', '::1')
+
+async def metrics_handler(request):
+    """Метрики в формате Prometheus
+
+    Порт общий с Mini App и API, поэтому доступ закрыт: с METRICS_TOKEN —
+    по заголовку Authorization: Bearer <token>, без него — только с localhost.
+    """
+    token = Config.METRICS_TOKEN
+    if token:
+        scheme, _, value = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(value.strip().encode(), token.encode()):
+            return web.Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    elif request.remote not in LOOPBACK:
+        return web.Response(status=403)
+    return web.Response(body=REGISTRY.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+async def init_api_app(db: DatabaseService = None, bot=None):
+    """Инициализация API приложения
+
+    bot нужен для уведомления администратора о новых отчётах; отдельно
+    запущенный сервер работает без него.
+    """
+    if db is None:
+        db = DatabaseService(Config.DATABASE_PATH, slow_query_ms=Config.SLOW_QUERY_MS,
+                             archive_dir=Config.ARCHIVE_DIR, replica_path=Config.READ_REPLICA_PATH)
+        await db.initialize()
+
+    app = web.Application(middlewares=[correlation_middleware])
+    app['db'] = db
+    app['bot'] = bot
+    app['webapp_auth'] = default_verifier()
+    if app['webapp_auth'] is not None:
+        app.router.add_get('/api/bootstrap', bootstrap_handler)
+        app.router.add_get('/api/history', history_handler)
+        app.router.add_post('/api/submit_report', submit_report_handler)
+    else:
+        # Без токена initData не проверить: API отчётов не поднимаем
+        logger.error("BOT_TOKEN is not set, Mini App API (/api/*) is disabled")
+    app.router.add_get('/metrics', metrics_handler)
+
+    if Config.WEBAPP_DIR and os.path.isdir(Config.WEBAPP_DIR):
+        assets = WebAppAssets(Config.WEBAPP_DIR, Config.WEBAPP_CACHE_DIR)
+        # Хеши и сжатие — разовая работа с диском при старте, не в event loop
+        app['webapp'] = await asyncio.get_running_loop().run_in_executor(None, assets.load)
+        app.router.add_get(WEBAPP_PREFIX, webapp_redirect_handler)
+        app.router.add_get(WEBAPP_PREFIX + '/{path:.*}', webapp_handler)
+    elif Config.WEBAPP_DIR:
+        logger.warning(f"WEBAPP_DIR {Config.WEBAPP_DIR} not found, Mini App is not served")
     return app
 
+async def start_api_server(db: DatabaseService, host: str, port: int, bot=None) -> web.AppRunner:
+    """Запуск API сервера в текущем event loop (рядом с ботом)"""
+    app = await init_api_app(db, bot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"API server listening on {host}:{port}")
+    return runner
+
 if __name__ == '__main__':
     app = init_api_app()
-    web.run_app(app, host='localhost', port=8080)
\ No newline at end of file
+    web.run_app(app, host=Config.WEB_HOST, port=Config.WEB_PORT or 8080)
\ No newline at end of file
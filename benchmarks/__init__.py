@@ -0,0 +1,3 @@
+"""
+Benchmarks for the bot: dispatcher throughput and database scaling
+"""
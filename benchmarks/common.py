@@ -0,0 +1,90 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+BENCH_BOT_TOKEN = '123456:BENCHMARK-TOKEN'
+
+def configure_environment(db_path: str, api_url: Optional[str] = None, sheets_url: Optional[str] = None,
+                          admin_id: int = 0, log_level: str = 'ERROR'):
+    """Point bot configuration at scratch resources. Must run before importing bot.*"""
+    os.environ['BOT_TOKEN'] = BENCH_BOT_TOKEN
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ['LOG_LEVEL'] = log_level
+    os.environ['LOG_FILE'] = ''
+    if admin_id:
+        os.environ['ADMIN_TELEGRAM_ID'] = str(admin_id)
+    if api_url:
+        os.environ['TELEGRAM_API_URL'] = api_url
+    if sheets_url:
+        os.environ['GOOGLE_SHEETS_WEBHOOK_URL'] = sheets_url
+
+def latency_summary(samples: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/max/mean in milliseconds"""
+    values = sorted(samples)
+    if not values:
+        return {'count': 0}
+
+    def pct(p: float) -> float:
+        index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+        return round(values[index] * 1000, 3)
+
+    return {
+        'count': len(values),
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+        'max_ms': round(values[-1] * 1000, 3),
+        'mean_ms': round(statistics.fmean(values) * 1000, 3),
+    }
+
+def environment_info() -> Dict:
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def write_result(result: Dict, path: str):
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Result written to {target}")
+
+def load_result(path: str) -> Dict:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+def check_regression(name: str, current: float, baseline: float, tolerance: float,
+                     higher_is_better: bool = False) -> Optional[str]:
+    """Return a message if current is worse than baseline by more than tolerance"""
+    if not baseline:
+        return None
+
+    if higher_is_better:
+        worse = current < baseline * (1 - tolerance)
+    else:
+        worse = current > baseline * (1 + tolerance)
+
+    if worse:
+        change = (current - baseline) / baseline * 100
+        return f"{name}: {current:g} vs baseline {baseline:g} ({change:+.1f}%)"
+    return None
+
+def report_regressions(regressions: List[str]) -> int:
+    """Print regressions, return process exit code"""
+    if not regressions:
+        print("No regressions against baseline")
+        return 0
+
+    print("Regressions against baseline:")
+    for line in regressions:
+        print(f"  - {line}")
+    return 1
@@ -0,0 +1,159 @@
+"""
+Deterministic synthetic data generator for the bot database.
+
+    python -m benchmarks.datagen --employees 2000 --days 1095 --output /tmp/large.db
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from database.models import DatabaseModel
+
+EMPLOYEE_BASE_ID = 500000000
+REGISTRATION_BASE_ID = 700000000
+BLOCKED_BASE_ID = 800000000
+ADMIN_TELEGRAM_ID = 900000000
+
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Волков', 'Соколов', 'Лебедев', 'Козлов']
+FIRST_NAMES = ['Иван', 'Пётр', 'Сергей', 'Алексей', 'Дмитрий', 'Андрей', 'Мария', 'Анна', 'Елена', 'Ольга']
+
+class Dataset:
+    """What was generated, for picking benchmark arguments"""
+
+    def __init__(self, employees: int, days: int, end_date: date):
+        self.employees = employees
+        self.days = days
+        self.end_date = end_date
+        self.user_ids: List[int] = []
+        self.telegram_ids: List[int] = []
+        self.pending_registration_ids: List[int] = []
+        self.reports = 0
+
+    @property
+    def today(self) -> str:
+        return self.end_date.strftime('%Y-%m-%d')
+
+    def to_dict(self) -> Dict:
+        return {
+            'employees': self.employees,
+            'days': self.days,
+            'reports': self.reports,
+            'pending_registrations': len(self.pending_registration_ids),
+        }
+
+def _full_name(rng: random.Random, index: int) -> str:
+    return f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {index:05d}"
+
+def generate(db_path: str, employees: int, days: int, seed: int = 42, submit_rate: float = 0.85,
+             inactive_rate: float = 0.05, pending_registrations: int = 50, blocked_users: int = 20,
+             end_date: Optional[date] = None) -> Dataset:
+    """Fill an empty database. The same arguments always produce the same rows."""
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    dataset = Dataset(employees, days, end_date)
+
+    asyncio.run(DatabaseModel.create_tables(db_path))
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA synchronous = OFF")
+
+        conn.execute(
+            "INSERT INTO users (telegram_id, full_name, username, is_admin) VALUES (?, ?, ?, 1)",
+            (ADMIN_TELEGRAM_ID, 'Администратор Системы', 'admin')
+        )
+        admin_id = conn.execute("SELECT id FROM users WHERE telegram_id = ?", (ADMIN_TELEGRAM_ID,)).fetchone()[0]
+
+        users = []
+        for i in range(employees):
+            registered = end_date - timedelta(days=rng.randint(0, days))
+            users.append((
+                EMPLOYEE_BASE_ID + i,
+                _full_name(rng, i),
+                f"user{i}",
+                0 if rng.random() < inactive_rate else 1,
+                datetime.combine(registered, datetime.min.time()).isoformat(sep=' '),
+            ))
+        conn.executemany(
+            "INSERT INTO users (telegram_id, full_name, username, is_active, created_at) VALUES (?, ?, ?, ?, ?)",
+            users
+        )
+
+        rows = conn.execute(
+            "SELECT id, telegram_id FROM users WHERE telegram_id >= ? ORDER BY id", (EMPLOYEE_BASE_ID,)
+        ).fetchall()
+        dataset.user_ids = [row[0] for row in rows if row[1] < REGISTRATION_BASE_ID]
+        dataset.telegram_ids = [row[1] for row in rows if row[1] < REGISTRATION_BASE_ID]
+
+        # Отчёты: по дням, чтобы вставка шла пакетами умеренного размера
+        for day_offset in range(days, -1, -1):
+            report_date = end_date - timedelta(days=day_offset)
+            batch = []
+            for user_id in dataset.user_ids:
+                if rng.random() >= submit_rate:
+                    continue
+                calls = rng.randint(10, 150)
+                kp_plus = rng.randint(0, calls // 5)
+                kp = rng.randint(0, calls // 5)
+                submitted = datetime.combine(report_date, datetime.min.time()) + timedelta(
+                    hours=14, minutes=rng.randint(0, 300)
+                )
+                batch.append((
+                    user_id, report_date.strftime('%Y-%m-%d'), calls, kp_plus, kp,
+                    rng.randint(0, calls - kp_plus - kp), rng.randint(0, 10),
+                    submitted.isoformat(sep=' '),
+                ))
+            conn.executemany(
+                """INSERT INTO reports
+                   (user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate, submitted_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                batch
+            )
+            dataset.reports += len(batch)
+
+        # Журнал отправок: у сгенерированных отчётов ровно одна отправка
+        conn.execute(
+            """INSERT INTO report_events
+               (report_id, user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate, created_at)
+               SELECT id, user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate, submitted_at
+               FROM reports ORDER BY id"""
+        )
+
+        statuses = ['pending', 'approved', 'rejected']
+        registrations = [
+            (REGISTRATION_BASE_ID + i, _full_name(rng, i), f"candidate{i}",
+             'pending' if i < pending_registrations else rng.choice(statuses))
+            for i in range(pending_registrations + pending_registrations // 2)
+        ]
+        conn.executemany(
+            "INSERT INTO pending_registrations (telegram_id, full_name, username, status) VALUES (?, ?, ?, ?)",
+            registrations
+        )
+        dataset.pending_registration_ids = [
+            row[0] for row in conn.execute("SELECT id FROM pending_registrations WHERE status = 'pending' ORDER BY id")
+        ]
+
+        conn.executemany(
+            "INSERT INTO blocked_users (telegram_id, full_name, username, reason, blocked_by) VALUES (?, ?, ?, ?, ?)",
+            [(BLOCKED_BASE_ID + i, _full_name(rng, i), f"blocked{i}", 'Спам', admin_id) for i in range(blocked_users)]
+        )
+
+    return dataset
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Generate a synthetic bot database')
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365, help='days of report history')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', required=True, help='path of the database to create')
+    args = parser.parse_args(argv)
+
+    dataset = generate(args.output, args.employees, args.days, seed=args.seed)
+    print(f"Generated {args.output}: {dataset.to_dict()}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
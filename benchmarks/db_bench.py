@@ -0,0 +1,209 @@
+"""
+DatabaseService micro-benchmarks across data size tiers.
+
+Every tier gets a fresh synthetic database (benchmarks.datagen); every
+public DatabaseService method is timed there, and a latency-versus-size
+table is printed.
+
+    python -m benchmarks.db_bench --output benchmarks/results/db.json
+    python -m benchmarks.db_bench --baseline benchmarks/results/db.json
+    python -m benchmarks.db_bench --tiers 20:30,2000:1095 --repeat 50
+
+Regression check compares median latency per (tier, method) and ignores
+differences below --min-delta-ms, which are timer noise.
+"""
+import argparse
+import asyncio
+import inspect
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import (
+    configure_environment,
+    environment_info,
+    write_result,
+    load_result,
+    check_regression,
+    report_regressions,
+)
+from benchmarks.datagen import Dataset, generate
+
+DEFAULT_TIERS = '20:90,200:365,2000:1095'
+
+# Метод -> функция (db, dataset, i) -> awaitable. Порядок важен: изменяющие
+# данные случаи идут после читающих, удаление — последним.
+def _cases() -> List[Tuple[str, Callable]]:
+    def user(ds: Dataset, i: int) -> int:
+        return ds.user_ids[i % len(ds.user_ids)]
+
+    def telegram(ds: Dataset, i: int) -> int:
+        return ds.telegram_ids[i % len(ds.telegram_ids)]
+
+    return [
+        ('get_user', lambda db, ds, i: db.get_user(telegram(ds, i))),
+        ('get_all_users', lambda db, ds, i: db.get_all_users(active_only=True)),
+        ('get_report', lambda db, ds, i: db.get_report(user(ds, i), ds.today)),
+        ('check_report_exists', lambda db, ds, i: db.check_report_exists(user(ds, i), ds.today)),
+        ('get_user_reports', lambda db, ds, i: db.get_user_reports(user(ds, i), limit=7)),
+        ('get_report_history',
+         lambda db, ds, i: db.get_report_history(user(ds, i), ds.today[:8] + '01', '9999-12-31')),
+        ('get_daily_reports', lambda db, ds, i: db.get_daily_reports(ds.today)),
+        ('get_users_without_report', lambda db, ds, i: db.get_users_without_report(ds.today)),
+        ('get_users_without_report_tz',
+         lambda db, ds, i: db.get_users_without_report(ds.today, timezone='Europe/Moscow')),
+        ('get_users_without_report_ids',
+         lambda db, ds, i: db.get_users_without_report(ds.today, telegram_ids=ds.telegram_ids[:1000])),
+        ('get_reminder_preferences', lambda db, ds, i: db.get_reminder_preferences()),
+        ('get_pending_registrations', lambda db, ds, i: db.get_pending_registrations('pending')),
+        ('get_pending_registration', lambda db, ds, i: db.get_pending_registration(700000000 + i)),
+        ('is_user_blocked', lambda db, ds, i: db.is_user_blocked(telegram(ds, i))),
+        ('get_blocked_users', lambda db, ds, i: db.get_blocked_users()),
+        ('get_setting', lambda db, ds, i: db.get_setting('bot_commands_hash')),
+        ('create_report', lambda db, ds, i: db.create_report(user(ds, i), ds.today, 50, 5, 5, 30, 2)),
+        ('create_report_submission',
+         lambda db, ds, i: db.create_report(user(ds, i), ds.today, 50, 5, 5, 30, 2, submission_id=f"bench-{i:08d}")),
+        ('create_report_duplicate',
+         lambda db, ds, i: db.create_report(user(ds, 0), ds.today, 50, 5, 5, 30, 2, submission_id='bench-duplicate')),
+        ('save_submission_result',
+         lambda db, ds, i: db.save_submission_result(f"bench-{i:08d}", {'sheets': True})),
+        ('get_submission_result', lambda db, ds, i: db.get_submission_result(f"bench-{i:08d}")),
+        ('purge_submissions', lambda db, ds, i: db.purge_submissions(72)),
+        ('set_setting', lambda db, ds, i: db.set_setting('bot_commands_hash', f"{i:064x}")),
+        ('update_user', lambda db, ds, i: db.update_user(telegram(ds, i), username=f"renamed{i}")),
+        ('record_delivery_failure',
+         lambda db, ds, i: db.record_delivery_failure(telegram(ds, i), 'forbidden', 'blocked', True, 10 ** 6)),
+        ('reset_delivery_failures', lambda db, ds, i: db.reset_delivery_failures(telegram(ds, i))),
+        ('create_user', lambda db, ds, i: db.create_user(600000000 + i, f"Новый Сотрудник {i}", f"new{i}")),
+        ('create_pending_registration',
+         lambda db, ds, i: db.create_pending_registration(610000000 + i, f"Кандидат Новый {i}")),
+        ('approve_registration', lambda db, ds, i: db.approve_registration(ds.pending_registration_ids[2 * i])),
+        ('reject_registration', lambda db, ds, i: db.reject_registration(ds.pending_registration_ids[2 * i + 1])),
+        ('block_user', lambda db, ds, i: db.block_user(620000000 + i, 'benchmark', ds.user_ids[0])),
+        ('delete_user', lambda db, ds, i: db.delete_user(ds.user_ids[-(i + 1)])),
+    ]
+
+# Методы, которые не имеет смысла мерить в цикле
+# rebuild_reports — полный проход по журналу, его время печатает manage.py rebuild-reports
+# archive_reports и run_maintenance — разовые ночные задачи, их печатает manage.py maintenance
+SKIPPED_METHODS = {'initialize', 'rebuild_reports', 'archive_reports', 'run_maintenance'}
+
+def uncovered_methods() -> List[str]:
+    from services.database import DatabaseService
+
+    covered = {name for name, _ in _cases()} | SKIPPED_METHODS
+    public = {
+        name for name, member in inspect.getmembers(DatabaseService, inspect.iscoroutinefunction)
+        if not name.startswith('_')
+    }
+    return sorted(public - covered)
+
+async def _time_tier(db_path: str, dataset: Dataset, repeat: int) -> Dict[str, Dict[str, float]]:
+    from services.database import DatabaseService
+
+    db = DatabaseService(db_path, slow_query_ms=float('inf'))
+    results = {}
+
+    for name, case in _cases():
+        # Прогрев: первый вызов читает страницы с диска
+        await case(db, dataset, repeat)
+
+        samples = []
+        for i in range(repeat):
+            started = time.perf_counter()
+            await case(db, dataset, i)
+            samples.append(time.perf_counter() - started)
+
+        samples.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(samples) * 1000, 3),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        }
+    return results
+
+def run_benchmark(tiers: List[Tuple[int, int]], repeat: int, seed: int) -> Dict:
+    result = {'benchmark': 'database', 'environment': environment_info(), 'repeat': repeat, 'tiers': {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for employees, days in tiers:
+            tier = f"{employees}x{days}"
+            db_path = str(Path(tmp) / f"{tier}.db")
+
+            started = time.perf_counter()
+            # +2 запасных заявки на прогревочный вызов approve/reject
+            dataset = generate(db_path, employees, days, seed=seed, pending_registrations=2 * repeat + 4)
+            print(f"Tier {tier}: generated {dataset.reports} reports in {time.perf_counter() - started:.1f} s")
+
+            result['tiers'][tier] = {
+                'dataset': dataset.to_dict(),
+                'methods': asyncio.run(_time_tier(db_path, dataset, repeat)),
+            }
+
+    return result
+
+def print_curves(result: Dict):
+    tiers = list(result['tiers'])
+    methods = list(next(iter(result['tiers'].values()))['methods']) if tiers else []
+
+    header = f"{'method':30}" + ''.join(f"{tier:>16}" for tier in tiers) + f"{'growth':>10}"
+    print(f"\nMedian latency, ms\n{header}\n{'-' * len(header)}")
+    for method in methods:
+        values = [result['tiers'][tier]['methods'][method]['median_ms'] for tier in tiers]
+        growth = f"×{values[-1] / values[0]:.1f}" if values and values[0] else '-'
+        print(f"{method:30}" + ''.join(f"{value:>16.3f}" for value in values) + f"{growth:>10}")
+
+def compare(result: Dict, baseline: Dict, tolerance: float, min_delta_ms: float) -> int:
+    regressions = []
+    for tier, data in result['tiers'].items():
+        base_tier = baseline.get('tiers', {}).get(tier)
+        if not base_tier:
+            continue
+        for method, timings in data['methods'].items():
+            base = base_tier['methods'].get(method)
+            if not base or timings['median_ms'] - base['median_ms'] < min_delta_ms:
+                continue
+            message = check_regression(f"{tier} {method} median_ms", timings['median_ms'], base['median_ms'], tolerance)
+            if message:
+                regressions.append(message)
+    return report_regressions(regressions)
+
+def parse_tiers(value: str) -> List[Tuple[int, int]]:
+    tiers = []
+    for item in value.split(','):
+        employees, days = item.split(':')
+        tiers.append((int(employees), int(days)))
+    return tiers
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='DatabaseService latency across data sizes')
+    parser.add_argument('--tiers', default=DEFAULT_TIERS, help='employees:days,... (default %(default)s)')
+    parser.add_argument('--repeat', type=int, default=20, help='calls per method and tier')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write result JSON to this path')
+    parser.add_argument('--baseline', help='compare with a stored result and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression (0.5 = 50%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='ignore smaller absolute differences')
+    args = parser.parse_args(argv)
+
+    # Каждый уровень получает свою БД; DATABASE_PATH нужен только для Config
+    configure_environment(str(Path(tempfile.gettempdir()) / 'db_bench.db'))
+
+    missing = uncovered_methods()
+    if missing:
+        print(f"Warning: DatabaseService methods without a benchmark case: {', '.join(missing)}")
+
+    result = run_benchmark(parse_tiers(args.tiers), args.repeat, args.seed)
+    print_curves(result)
+
+    if args.output:
+        write_result(result, args.output)
+
+    if args.baseline:
+        return compare(result, load_result(args.baseline), args.tolerance, args.min_delta_ms)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
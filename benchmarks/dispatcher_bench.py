@@ -0,0 +1,133 @@
+"""
+End-to-end dispatcher throughput benchmark against a local fake Bot API.
+
+Runs the real Dispatcher from bot.main (report, admin and start routers
+with all middlewares) in polling mode against FakeTelegramServer, with a
+scratch SQLite database and a fake Google Sheets webhook.
+
+    python -m benchmarks.dispatcher_bench --employees 200 --output benchmarks/results/dispatcher.json
+    python -m benchmarks.dispatcher_bench --employees 200 --baseline benchmarks/results/dispatcher.json
+
+Latency is measured from the moment an update is queued in the fake
+server to the end of its processing, so it includes the getUpdates
+round trip. CPU per update is process CPU time and therefore also
+includes the fake server running in the same process.
+"""
+import argparse
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import (
+    environment_info,
+    latency_summary,
+    write_result,
+    load_result,
+    check_regression,
+    report_regressions,
+)
+from benchmarks.harness import DispatcherHarness
+from benchmarks.workload import ADMIN_TELEGRAM_ID, build_workload, employee_telegram_id
+
+def seed_users(db_path: str, employees: int):
+    """Admin plus N active employees"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO users (telegram_id, full_name, username, is_admin) VALUES (?, ?, ?, 1)",
+            (ADMIN_TELEGRAM_ID, 'Админ Бенчмарков', 'admin')
+        )
+        conn.executemany(
+            "INSERT INTO users (telegram_id, full_name, username) VALUES (?, ?, ?)",
+            [(employee_telegram_id(i), f"Сотрудник{i:05d} Тестовый", f"emp{i}") for i in range(employees)]
+        )
+
+async def run_benchmark(employees: int, rate: float, admin_refresh_every: int, sheets_delay: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        harness = DispatcherHarness(str(Path(tmp) / 'bench.db'), ADMIN_TELEGRAM_ID, sheets_delay=sheets_delay)
+        await harness.start()
+        seed_users(harness.db_path, employees)
+        await harness.start_polling()
+
+        workload = build_workload(employees, admin_refresh_every=admin_refresh_every)
+
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+
+        for update in workload:
+            update = dict(update)
+            kind = update.pop('kind')
+            harness.feed(update, tag=kind)
+            if rate:
+                await asyncio.sleep(1 / rate)
+
+        await harness.wait(len(workload), timeout=max(60, len(workload)))
+        duration = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+        api_calls = dict(harness.server.calls)
+        await harness.stop()
+
+    all_latencies = harness.all_latencies()
+    return {
+        'benchmark': 'dispatcher',
+        'environment': environment_info(),
+        'params': {
+            'employees': employees,
+            'rate': rate,
+            'admin_refresh_every': admin_refresh_every,
+            'sheets_delay': sheets_delay,
+        },
+        'updates': len(all_latencies),
+        'duration_s': round(duration, 3),
+        'throughput_ups': round(len(all_latencies) / duration, 2),
+        'cpu_ms_per_update': round(cpu / len(all_latencies) * 1000, 3),
+        'latency': latency_summary(all_latencies),
+        'latency_by_kind': {kind: latency_summary(values) for kind, values in sorted(harness.latencies.items())},
+        'api_calls': api_calls,
+    }
+
+def compare(result: dict, baseline: dict, tolerance: float) -> int:
+    regressions = [
+        check_regression('throughput_ups', result['throughput_ups'], baseline['throughput_ups'],
+                         tolerance, higher_is_better=True),
+        check_regression('p95_ms', result['latency']['p95_ms'], baseline['latency']['p95_ms'], tolerance),
+        check_regression('p99_ms', result['latency']['p99_ms'], baseline['latency']['p99_ms'], tolerance),
+        check_regression('cpu_ms_per_update', result['cpu_ms_per_update'], baseline['cpu_ms_per_update'], tolerance),
+    ]
+    return report_regressions([r for r in regressions if r])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--employees', type=int, default=100, help='number of synthetic employees')
+    parser.add_argument('--rate', type=float, default=0, help='updates per second to enqueue (0 = burst)')
+    parser.add_argument('--admin-refresh-every', type=int, default=10,
+                        help='admin refresh after every N employees (0 = never)')
+    parser.add_argument('--sheets-delay', type=float, default=0.0, help='fake Sheets webhook delay, seconds')
+    parser.add_argument('--output', help='write result JSON to this path')
+    parser.add_argument('--baseline', help='compare with a stored result and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_benchmark(args.employees, args.rate, args.admin_refresh_every, args.sheets_delay))
+
+    latency = result['latency']
+    print(
+        f"{result['updates']} updates in {result['duration_s']} s: {result['throughput_ups']} updates/s, "
+        f"p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms, "
+        f"CPU {result['cpu_ms_per_update']} ms/update"
+    )
+    for kind, summary in result['latency_by_kind'].items():
+        print(f"  {kind:15} n={summary['count']:5}  p50 {summary['p50_ms']:8} ms  p95 {summary['p95_ms']:8} ms")
+
+    if args.output:
+        write_result(result, args.output)
+
+    if args.baseline:
+        return compare(result, load_result(args.baseline), args.tolerance)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
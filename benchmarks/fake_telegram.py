@@ -0,0 +1,126 @@
+"""
+Local fake Telegram Bot API and Google Sheets webhook for benchmarks
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 100000001
+
+class FakeTelegramServer:
+    """Minimal Bot API: getUpdates long polling plus the methods the bot calls.
+
+    Updates are queued with enqueue(); their enqueue time is kept so the
+    benchmark can compute end-to-end latency. Every outbound call is
+    counted per method. /sheets acts as the Google Apps Script webhook.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, sheets_delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.sheets_delay = sheets_delay
+        self.calls: Counter = Counter()
+        self.enqueued_at: Dict[int, float] = {}
+        self.first_message_at: Dict[int, float] = {}
+        self._updates: List[dict] = []
+        self._new_updates = asyncio.Event()
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def sheets_url(self) -> str:
+        return f"{self.base_url}/sheets"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/sheets', self._sheets)
+        app.router.add_route('*', '/bot{token}/{method}', self._api)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def enqueue(self, update: dict) -> int:
+        """Queue update for getUpdates, returns assigned update_id"""
+        update_id = self._next_update_id
+        self._next_update_id += 1
+        update = dict(update, update_id=update_id)
+        self._updates.append(update)
+        self.enqueued_at[update_id] = time.perf_counter()
+        self._new_updates.set()
+        return update_id
+
+    async def _sheets(self, request: web.Request) -> web.Response:
+        self.calls['sheets'] += 1
+        await request.read()
+        if self.sheets_delay:
+            await asyncio.sleep(self.sheets_delay)
+        return web.json_response({'status': 'success'})
+
+    async def _api(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = dict(await request.post()) if request.body_exists else {}
+        self.calls[method] += 1
+
+        handler = getattr(self, f"_method_{method}", None)
+        result = await handler(params) if handler else True
+        return web.json_response({'ok': True, 'result': result})
+
+    def _message(self, params: dict) -> dict:
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        self.first_message_at.setdefault(int(params.get('chat_id', 0)), time.perf_counter())
+        return {
+            'message_id': int(params.get('message_id') or message_id),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench'},
+            'text': params.get('text', ''),
+        }
+
+    async def _method_getMe(self, params: dict) -> dict:
+        return {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+    async def _method_getUpdates(self, params: dict) -> list:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        if offset:
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return self._updates[:limit]
+
+    async def _method_sendMessage(self, params: dict) -> dict:
+        return self._message(params)
+
+    async def _method_editMessageText(self, params: dict) -> dict:
+        return self._message(params)
+
+    async def _method_sendDocument(self, params: dict) -> dict:
+        return self._message(params)
+
+def encode_web_app_data(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False)
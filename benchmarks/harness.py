@@ -0,0 +1,97 @@
+"""
+Runs the production Dispatcher in polling mode against FakeTelegramServer
+"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from benchmarks.common import configure_environment
+from benchmarks.fake_telegram import FakeTelegramServer
+
+class DispatcherHarness:
+    """Fake Bot API + scratch database + real Dispatcher, with per-update latency.
+
+    Latency of an update is the time from feed() to the end of its
+    processing in the dispatcher, so it includes the getUpdates round trip.
+    """
+
+    def __init__(self, db_path: str, admin_id: int, sheets_delay: float = 0.0):
+        self.db_path = db_path
+        self.admin_id = admin_id
+        self.server = FakeTelegramServer(sheets_delay=sheets_delay)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.db = None
+        self._tags: Dict[int, str] = {}
+        self._completed = 0
+        self._expected: Optional[int] = None
+        self._done = asyncio.Event()
+        self._bot = None
+        self._dp = None
+        self._polling: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start fake server and open the scratch database"""
+        await self.server.start()
+        configure_environment(self.db_path, api_url=self.server.base_url,
+                              sheets_url=self.server.sheets_url, admin_id=self.admin_id)
+
+        # Импорт только после настройки окружения: Config читает его при импорте
+        from services.database import DatabaseService
+
+        self.db = DatabaseService(self.db_path)
+        await self.db.initialize()
+
+    async def start_polling(self):
+        """Build bot and dispatcher from bot.main and start polling"""
+        from aiogram import BaseMiddleware
+        from bot.main import create_bot, create_dispatcher
+
+        harness = self
+
+        class CompletionMiddleware(BaseMiddleware):
+            async def __call__(self, handler, event, data):
+                try:
+                    return await handler(event, data)
+                finally:
+                    harness._complete(event.update_id)
+
+        self._bot = create_bot()
+        self._dp = create_dispatcher(self.db)
+        self._dp.update.outer_middleware(CompletionMiddleware())
+
+        self._polling = asyncio.create_task(
+            self._dp.start_polling(self._bot, polling_timeout=1, handle_signals=False, close_bot_session=False)
+        )
+        await asyncio.sleep(0.2)
+        self.server.calls.clear()
+
+    def _complete(self, update_id: int):
+        latency = time.perf_counter() - self.server.enqueued_at[update_id]
+        self.latencies[self._tags.get(update_id, 'update')].append(latency)
+        self._completed += 1
+        if self._expected is not None and self._completed >= self._expected:
+            self._done.set()
+
+    def feed(self, update: dict, tag: str = 'update') -> int:
+        update_id = self.server.enqueue(update)
+        self._tags[update_id] = tag
+        return update_id
+
+    async def wait(self, expected: int, timeout: float):
+        """Wait until expected updates have been processed in total"""
+        self._expected = expected
+        if self._completed >= expected:
+            return
+        await asyncio.wait_for(self._done.wait(), timeout=timeout)
+
+    async def stop(self):
+        if self._dp and self._polling:
+            await self._dp.stop_polling()
+            await self._polling
+        if self._bot:
+            await self._bot.session.close()
+        await self.server.stop()
+
+    def all_latencies(self) -> List[float]:
+        return [value for values in self.latencies.values() for value in values]
@@ -0,0 +1,196 @@
+"""
+Reminder scheduling at scale: ReminderDispatcher heap versus one APScheduler job per user.
+
+    python -m benchmarks.reminder_bench --users 10000
+    python -m benchmarks.reminder_bench --users 10000 --output benchmarks/results/reminders.json
+    python -m benchmarks.reminder_bench --users 10000 --baseline benchmarks/results/reminders.json
+
+The dispatcher is driven by a simulated clock through a full day, so
+no real waiting happens. Measured: build time and memory for N users,
+cost of incremental preference changes, and pop cost per due reminder.
+For reference the same users are registered as per-user CronTrigger jobs
+in a paused AsyncIOScheduler.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.common import (
+    configure_environment,
+    environment_info,
+    write_result,
+    load_result,
+    check_regression,
+    report_regressions,
+)
+
+TIMEZONES = [
+    'Europe/Kaliningrad', 'Europe/Moscow', 'Europe/Samara', 'Asia/Yekaterinburg',
+    'Asia/Omsk', 'Asia/Novosibirsk', 'Asia/Irkutsk', 'Asia/Vladivostok',
+]
+DEFAULT_SHARE = 0.6  # доля пользователей без своих настроек
+
+def make_preferences(users: int, seed: int) -> List[Tuple[int, str, str]]:
+    rng = random.Random(seed)
+    preferences = []
+    for i in range(users):
+        if rng.random() < DEFAULT_SHARE:
+            preferences.append((500000000 + i, None, None))
+        else:
+            slot = rng.randrange(8 * 4, 21 * 4)  # 08:00–20:45 с шагом 15 минут
+            preferences.append((500000000 + i, rng.choice(TIMEZONES), f"{slot // 4:02d}:{slot % 4 * 15:02d}"))
+    return preferences
+
+async def _noop_sender(stage: str, report_date: str, telegram_ids: List[int]):
+    return None
+
+def bench_dispatcher(preferences: List[Tuple[int, str, str]], updates: int, seed: int) -> Dict:
+    from services.reminder_dispatcher import ReminderDispatcher
+
+    start_clock = time.time()
+    clock = [start_clock]
+
+    # Память меряется на отдельном экземпляре: tracemalloc сильно замедляет сборку
+    tracemalloc.start()
+    ReminderDispatcher(_noop_sender, clock=lambda: clock[0]).sync(preferences)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    dispatcher = ReminderDispatcher(_noop_sender, clock=lambda: clock[0])
+    started = time.perf_counter()
+    dispatcher.sync(preferences)
+    build_s = time.perf_counter() - started
+
+    # Повторная синхронизация без изменений — так выглядит периодическая сверка с БД
+    started = time.perf_counter()
+    dispatcher.sync(preferences)
+    resync_s = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    started = time.perf_counter()
+    for _ in range(updates):
+        telegram_id = rng.choice(preferences)[0]
+        slot = rng.randrange(8 * 4, 21 * 4)
+        dispatcher.set_user(telegram_id, rng.choice(TIMEZONES), f"{slot // 4:02d}:{slot % 4 * 15:02d}")
+    update_s = time.perf_counter() - started
+    heap_after_updates = len(dispatcher._heap)
+
+    # Сутки на симулированных часах: прыгаем к следующему срабатыванию и забираем пачку
+    end = start_clock + 24 * 3600
+    batches = fired = 0
+    started = time.perf_counter()
+    while True:
+        next_at = dispatcher.next_fire_at()
+        if next_at is None or next_at > end:
+            break
+        clock[0] = next_at
+        due = dispatcher.pop_due()
+        batches += len(due)
+        fired += sum(len(ids) for ids in due.values())
+    day_s = time.perf_counter() - started
+
+    return {
+        'build_ms': round(build_s * 1000, 2),
+        'build_peak_kib': round(peak / 1024, 1),
+        'resync_unchanged_ms': round(resync_s * 1000, 2),
+        'update_us': round(update_s / max(updates, 1) * 1e6, 2),
+        'heap_entries_after_updates': heap_after_updates,
+        'day_batches': batches,
+        'day_reminders': fired,
+        'day_ms': round(day_s * 1000, 2),
+        'pop_us': round(day_s / max(fired, 1) * 1e6, 2),
+    }
+
+async def bench_apscheduler(preferences: List[Tuple[int, str, str]]) -> Dict:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.cron import CronTrigger
+    from bot.config import Config
+
+    scheduler = AsyncIOScheduler(timezone=Config.TIMEZONE)
+    scheduler.start(paused=True)
+
+    def add_jobs():
+        for telegram_id, timezone, reminder_time in preferences:
+            hour, minute = (reminder_time or Config.REMINDER_TIME).split(':')
+            for stage in ('daily', 'repeat'):
+                scheduler.add_job(
+                    _noop_sender,
+                    CronTrigger(hour=int(hour), minute=int(minute), timezone=timezone or Config.TIMEZONE),
+                    args=(stage, '', [telegram_id]), id=f"{stage}:{telegram_id}", replace_existing=True
+                )
+
+    tracemalloc.start()
+    add_jobs()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    scheduler.remove_all_jobs()
+
+    started = time.perf_counter()
+    add_jobs()
+    build_s = time.perf_counter() - started
+
+    jobs = len(scheduler.get_jobs())
+    scheduler.shutdown(wait=False)
+    return {
+        'build_ms': round(build_s * 1000, 2),
+        'build_peak_kib': round(peak / 1024, 1),
+        'jobs': jobs,
+    }
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> int:
+    current, base = result['dispatcher'], baseline['dispatcher']
+    regressions = [
+        check_regression(name, current[name], base[name], tolerance)
+        for name in ('build_ms', 'build_peak_kib', 'update_us', 'pop_us')
+    ]
+    return report_regressions([r for r in regressions if r])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Per-user reminder scheduling at scale')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--updates', type=int, default=1000, help='random preference changes to apply')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-apscheduler', action='store_true', help='do not build the per-user job reference')
+    parser.add_argument('--output', help='write result JSON to this path')
+    parser.add_argument('--baseline', help='compare with a stored result and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative regression (0.5 = 50%%)')
+    args = parser.parse_args(argv)
+
+    configure_environment(str(Path(tempfile.gettempdir()) / 'reminder_bench.db'))
+
+    preferences = make_preferences(args.users, args.seed)
+    result = {
+        'benchmark': 'reminders',
+        'environment': environment_info(),
+        'params': {'users': args.users, 'updates': args.updates, 'seed': args.seed},
+        'dispatcher': bench_dispatcher(preferences, args.updates, args.seed),
+    }
+    if not args.skip_apscheduler:
+        result['apscheduler'] = asyncio.run(bench_apscheduler(preferences))
+
+    d = result['dispatcher']
+    print(f"ReminderDispatcher, {args.users} users:")
+    print(f"  build {d['build_ms']} ms, peak {d['build_peak_kib']} KiB, unchanged resync {d['resync_unchanged_ms']} ms")
+    print(f"  preference update {d['update_us']} µs, heap after {args.updates} updates: {d['heap_entries_after_updates']}")
+    print(f"  simulated day: {d['day_reminders']} reminders in {d['day_batches']} batches, "
+          f"{d['day_ms']} ms total, {d['pop_us']} µs per reminder")
+    if 'apscheduler' in result:
+        a = result['apscheduler']
+        print(f"APScheduler, one job per user and stage: {a['jobs']} jobs, "
+              f"build {a['build_ms']} ms, peak {a['build_peak_kib']} KiB")
+
+    if args.output:
+        write_result(result, args.output)
+
+    if args.baseline:
+        return compare(result, load_result(args.baseline), args.tolerance)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
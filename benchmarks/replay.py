@@ -0,0 +1,248 @@
+"""
+Replay a recorded update stream (bot.middlewares.recorder) into the Dispatcher.
+
+    python -m benchmarks.replay recordings/updates.jsonl.gz --speed 1
+    python -m benchmarks.replay recordings/updates.jsonl.gz --speed 10 --output benchmarks/results/replay.json
+    python -m benchmarks.replay recordings/updates.jsonl.gz --speed 0 --baseline benchmarks/results/replay.json
+
+--speed 1 keeps the recorded gaps between updates, N compresses them N
+times, 0 feeds everything at once. The scratch database gets the
+recorded admin plus every user who used the bot as a registered
+employee; users whose first message is /start or the registration button stay
+unregistered so their flow is replayed as well.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from benchmarks.common import (
+    environment_info,
+    latency_summary,
+    write_result,
+    load_result,
+    check_regression,
+    report_regressions,
+)
+from benchmarks.harness import DispatcherHarness
+
+# Пользователь, начавший с этих сообщений, считается незарегистрированным
+REGISTRATION_TEXTS = {'/start', '✅ Начать регистрацию'}
+
+class Recording:
+    def __init__(self, header: Dict, updates: List[Tuple[float, Dict]]):
+        self.header = header
+        self.updates = updates
+
+    @property
+    def admin_id(self) -> Optional[int]:
+        return self.header.get('admin_id')
+
+    @property
+    def duration(self) -> float:
+        return self.updates[-1][0] - self.updates[0][0] if self.updates else 0.0
+
+def load_recording(path: str) -> Recording:
+    opener = gzip.open if path.endswith('.gz') else open
+    header, updates = {}, []
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'header' in record:
+                # Файл мог дописываться после перезапуска бота — берём первый заголовок
+                header = header or record['header']
+            else:
+                updates.append((record['t'], record['u']))
+    updates.sort(key=lambda item: item[0])
+    return Recording(header, updates)
+
+def classify(update: Dict) -> str:
+    """Tag for the per-kind latency table"""
+    if 'callback_query' in update:
+        data = update['callback_query'].get('data', '')
+        return f"callback:{data.split('_')[0]}"
+    message = update.get('message')
+    if not message:
+        return next((key for key in update if key != 'update_id'), 'update')
+    if 'web_app_data' in message:
+        return 'web_app_data'
+    text = message.get('text', '')
+    if text.startswith('/'):
+        return f"command:{text.split()[0]}"
+    return 'text'
+
+def shift_report_date(update: Dict, recorded_at: float, today: date) -> Dict:
+    """Move a Mini App report_date by the days since recording
+
+    A report queued offline keeps its distance from the day it was sent, so
+    the replay goes through the same late-report path instead of being
+    rejected as too old.
+    """
+    web_app_data = update.get('message', {}).get('web_app_data')
+    if not web_app_data:
+        return update
+    try:
+        data = json.loads(web_app_data.get('data', ''))
+        recorded = datetime.strptime(data['report_date'], '%Y-%m-%d').date()
+    except (ValueError, TypeError, KeyError):
+        return update
+    days = (today - datetime.fromtimestamp(recorded_at, timezone.utc).date()).days
+    data['report_date'] = (recorded + timedelta(days=days)).isoformat()
+    message = dict(update['message'], web_app_data=dict(web_app_data, data=json.dumps(data, ensure_ascii=False)))
+    return dict(update, message=message)
+
+def _sender(update: Dict) -> Optional[Dict]:
+    for key in ('message', 'callback_query', 'edited_message'):
+        if key in update:
+            return update[key].get('from')
+    return None
+
+def seed_users(db_path: str, recording: Recording) -> Tuple[int, int]:
+    """Admin plus registered employees; returns (registered, unregistered)
+
+    A user whose first message is /start or the registration button is
+    left unregistered, everyone else is an active employee.
+    """
+    senders: Dict[int, Dict] = {}
+    unregistered: Set[int] = set()
+    for _, update in recording.updates:
+        sender = _sender(update)
+        if not sender or sender.get('is_bot') or sender['id'] in senders:
+            continue
+        senders[sender['id']] = sender
+        if update.get('message', {}).get('text') in REGISTRATION_TEXTS and sender['id'] != recording.admin_id:
+            unregistered.add(sender['id'])
+
+    employees = [user_id for user_id in senders if user_id not in unregistered and user_id != recording.admin_id]
+
+    with sqlite3.connect(db_path) as conn:
+        if recording.admin_id:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (telegram_id, full_name, username, is_admin) VALUES (?, ?, ?, 1)",
+                (recording.admin_id, 'Админ Записи', 'admin')
+            )
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (telegram_id, full_name, username) VALUES (?, ?, ?)",
+            [
+                (user_id, f"{senders[user_id].get('first_name', 'Anon')} Сотрудник", senders[user_id].get('username'))
+                for user_id in employees
+            ]
+        )
+    return len(employees), len(unregistered)
+
+async def run_replay(recording: Recording, speed: float, sheets_delay: float, timeout: float) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        harness = DispatcherHarness(str(Path(tmp) / 'replay.db'), recording.admin_id or 0, sheets_delay=sheets_delay)
+        await harness.start()
+        registered, unregistered = seed_users(harness.db_path, recording)
+        await harness.start_polling()
+
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        first_t = recording.updates[0][0] if recording.updates else 0.0
+        today = datetime.now(timezone.utc).date()
+
+        for t, update in recording.updates:
+            if speed:
+                delay = (t - first_t) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            harness.feed(shift_report_date(update, t, today), tag=classify(update))
+
+        try:
+            await harness.wait(len(recording.updates), timeout=timeout)
+            timed_out = False
+        except asyncio.TimeoutError:
+            timed_out = True
+        duration = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+        api_calls = dict(harness.server.calls)
+        await harness.stop()
+
+    latencies = harness.all_latencies()
+    processed = len(latencies)
+    return {
+        'benchmark': 'replay',
+        'environment': environment_info(),
+        'params': {
+            'speed': speed,
+            'sheets_delay': sheets_delay,
+            'recorded_updates': len(recording.updates),
+            'recorded_duration_s': round(recording.duration, 3),
+            'registered_users': registered,
+            'unregistered_users': unregistered,
+        },
+        'updates': processed,
+        'timed_out': timed_out,
+        'duration_s': round(duration, 3),
+        'throughput_ups': round(processed / duration, 2) if duration else 0,
+        'cpu_ms_per_update': round(cpu / processed * 1000, 3) if processed else 0,
+        'latency': latency_summary(latencies),
+        'latency_by_kind': {kind: latency_summary(values) for kind, values in sorted(harness.latencies.items())},
+        'api_calls': api_calls,
+    }
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> int:
+    regressions = [
+        check_regression('p95_ms', result['latency'].get('p95_ms', 0), baseline['latency'].get('p95_ms', 0), tolerance),
+        check_regression('p99_ms', result['latency'].get('p99_ms', 0), baseline['latency'].get('p99_ms', 0), tolerance),
+        check_regression('cpu_ms_per_update', result['cpu_ms_per_update'], baseline['cpu_ms_per_update'], tolerance),
+    ]
+    # Пропускная способность сравнима только при подаче без пауз
+    if result['params']['speed'] == 0 and baseline['params']['speed'] == 0:
+        regressions.append(check_regression('throughput_ups', result['throughput_ups'], baseline['throughput_ups'],
+                                            tolerance, higher_is_better=True))
+    if result['timed_out']:
+        regressions.append(f"only {result['updates']} of {result['params']['recorded_updates']} updates processed")
+    return report_regressions([r for r in regressions if r])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Replay a recorded update stream into the Dispatcher')
+    parser.add_argument('recording', help='file written by UPDATE_RECORD_PATH (.jsonl or .jsonl.gz)')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 = real time, N = N times faster, 0 = no pauses')
+    parser.add_argument('--limit', type=int, default=0, help='replay only the first N updates')
+    parser.add_argument('--sheets-delay', type=float, default=0.0, help='fake Sheets webhook delay, seconds')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for processing after the last update')
+    parser.add_argument('--output', help='write result JSON to this path')
+    parser.add_argument('--baseline', help='compare with a stored result and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording)
+    if args.limit:
+        recording.updates = recording.updates[:args.limit]
+    if not recording.updates:
+        print(f"No updates in {args.recording}")
+        return 1
+
+    result = asyncio.run(run_replay(recording, args.speed, args.sheets_delay, args.timeout))
+
+    latency = result['latency']
+    print(
+        f"{result['updates']}/{len(recording.updates)} updates in {result['duration_s']} s "
+        f"(recorded {result['params']['recorded_duration_s']} s, speed {args.speed:g}): "
+        f"{result['throughput_ups']} updates/s, p50 {latency.get('p50_ms')} ms, p95 {latency.get('p95_ms')} ms, "
+        f"p99 {latency.get('p99_ms')} ms, CPU {result['cpu_ms_per_update']} ms/update"
+    )
+    for kind, summary in result['latency_by_kind'].items():
+        print(f"  {kind:24} n={summary['count']:5}  p50 {summary['p50_ms']:8} ms  p95 {summary['p95_ms']:8} ms")
+
+    if args.output:
+        write_result(result, args.output)
+
+    if args.baseline:
+        return compare(result, load_result(args.baseline), args.tolerance)
+    return 1 if result['timed_out'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
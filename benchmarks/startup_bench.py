@@ -0,0 +1,175 @@
+"""
+Cold start benchmark: import time of bot.main and wall clock to the first processed update.
+
+    python -m benchmarks.startup_bench
+    python -m benchmarks.startup_bench --import-budget-ms 3000 --startup-budget-ms 6000
+    python -m benchmarks.startup_bench --output benchmarks/results/startup.json
+    python -m benchmarks.startup_bench --baseline benchmarks/results/startup.json
+
+Import time is the cumulative `-X importtime` figure for bot.main, best of
+--repeat runs. Startup time is measured by launching run_bot.py (as the
+Procfile does) against FakeTelegramServer with an update already queued,
+until the bot answers it. It is measured twice on the same database:
+the first start sets bot commands, a restart should skip set_my_commands.
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.common import (
+    configure_environment,
+    environment_info,
+    write_result,
+    load_result,
+    check_regression,
+    report_regressions,
+)
+from benchmarks.fake_telegram import FakeTelegramServer
+from benchmarks.workload import ADMIN_TELEGRAM_ID, text_update
+
+ROOT = Path(__file__).resolve().parent.parent
+VISITOR_ID = 400000001
+
+_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+def measure_imports(repeat: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """Best cumulative bot.main import time (ms) and the slowest top-level imports of that run"""
+    best_total, best_modules = None, []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import bot.main'],
+            cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True, check=True
+        )
+        # Дети выводятся раньше родителя: отступ 3 — прямой импорт модуля верхнего уровня (отступ 1)
+        total, modules, children = None, [], []
+        for match in _IMPORTTIME.finditer(completed.stderr):
+            cumulative_ms = int(match.group(2)) / 1000
+            indent = len(match.group(3))
+            name = match.group(4)
+            if indent == 3:
+                children.append((name, cumulative_ms))
+            elif indent == 1:
+                if name == 'bot.main':
+                    total, modules = cumulative_ms, children
+                children = []
+        if total is not None and (best_total is None or total < best_total):
+            best_total, best_modules = total, sorted(modules, key=lambda item: -item[1])[:10]
+    return best_total or 0.0, best_modules
+
+async def measure_start(server: FakeTelegramServer, timeout: float) -> Dict:
+    """Launch run_bot.py and time it until the queued update is answered"""
+    server.calls.clear()
+    server.first_message_at.clear()
+    server.enqueue(text_update(VISITOR_ID, '/help'))
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'run_bot.py'], cwd=ROOT, env=os.environ.copy(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    try:
+        deadline = started + timeout
+        while VISITOR_ID not in server.first_message_at:
+            if process.poll() is not None:
+                raise RuntimeError(f"run_bot.py exited with {process.returncode}:\n{process.stderr.read()}")
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"No answer to the queued update within {timeout} s")
+            await asyncio.sleep(0.005)
+    finally:
+        process.terminate()
+        await asyncio.get_running_loop().run_in_executor(None, process.wait)
+
+    admin_notified = server.first_message_at.get(ADMIN_TELEGRAM_ID)
+    return {
+        'first_update_ms': round((server.first_message_at[VISITOR_ID] - started) * 1000, 1),
+        'admin_notified_ms': round((admin_notified - started) * 1000, 1) if admin_notified else None,
+        'set_my_commands_calls': server.calls.get('setMyCommands', 0),
+        'api_calls': dict(server.calls),
+    }
+
+async def run_startups(timeout: float) -> Dict[str, Dict]:
+    server = FakeTelegramServer()
+    await server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            configure_environment(str(Path(tmp) / 'startup.db'), api_url=server.base_url,
+                                  sheets_url=server.sheets_url, admin_id=ADMIN_TELEGRAM_ID)
+            return {
+                'first_start': await measure_start(server, timeout),
+                'restart': await measure_start(server, timeout),
+            }
+    finally:
+        await server.stop()
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> int:
+    regressions = [
+        check_regression('import_ms', result['import_ms'], baseline['import_ms'], tolerance),
+        check_regression('restart first_update_ms', result['starts']['restart']['first_update_ms'],
+                         baseline['starts']['restart']['first_update_ms'], tolerance),
+    ]
+    return report_regressions([r for r in regressions if r])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Bot cold start: import time and time to first update')
+    parser.add_argument('--repeat', type=int, default=3, help='import time runs, best is reported')
+    parser.add_argument('--import-budget-ms', type=float, default=0, help='fail if bot.main import is slower (0 = off)')
+    parser.add_argument('--startup-budget-ms', type=float, default=0,
+                        help='fail if a restart answers its first update later (0 = off)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for one start')
+    parser.add_argument('--output', help='write result JSON to this path')
+    parser.add_argument('--baseline', help='compare with a stored result and fail on regression')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed relative regression (0.3 = 30%%)')
+    args = parser.parse_args(argv)
+
+    # Окружение для подпроцессов: бот не должен открывать HTTP порт и писать запись трафика
+    configure_environment(str(Path(tempfile.gettempdir()) / 'startup_bench.db'))
+    os.environ['GOOGLE_SPREADSHEET_ID'] = 'benchmark'
+    for name in ('PORT', 'WEB_PORT', 'UPDATE_RECORD_PATH'):
+        os.environ.pop(name, None)
+
+    import_ms, modules = measure_imports(args.repeat)
+    print(f"bot.main import: {import_ms:.1f} ms (best of {args.repeat})")
+    for name, cumulative_ms in modules:
+        print(f"  {name:40} {cumulative_ms:9.1f} ms")
+
+    starts = asyncio.run(run_startups(args.timeout))
+    for name, start in starts.items():
+        print(
+            f"{name:12} first update answered after {start['first_update_ms']} ms, "
+            f"admin notified after {start['admin_notified_ms']} ms, setMyCommands x{start['set_my_commands_calls']}"
+        )
+
+    result = {
+        'benchmark': 'startup',
+        'environment': environment_info(),
+        'import_ms': round(import_ms, 1),
+        'import_top': [{'module': name, 'cumulative_ms': round(ms, 1)} for name, ms in modules],
+        'starts': starts,
+    }
+    if args.output:
+        write_result(result, args.output)
+
+    failures = []
+    if args.import_budget_ms and import_ms > args.import_budget_ms:
+        failures.append(f"import_ms: {import_ms:.1f} over budget {args.import_budget_ms:g}")
+    restart_ms = starts['restart']['first_update_ms']
+    if args.startup_budget_ms and restart_ms > args.startup_budget_ms:
+        failures.append(f"restart first_update_ms: {restart_ms} over budget {args.startup_budget_ms:g}")
+    if starts['restart']['set_my_commands_calls']:
+        failures.append("restart called setMyCommands although commands did not change")
+    if failures:
+        return report_regressions(failures)
+
+    if args.baseline:
+        return compare(result, load_result(args.baseline), args.tolerance)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Synthetic update workload: employees submitting reports, checking status, admin refreshing
+"""
+import itertools
+import json
+import random
+import time
+from typing import List
+
+ADMIN_TELEGRAM_ID = 900000000
+EMPLOYEE_BASE_ID = 500000000
+
+_ids = itertools.count(1)
+
+def employee_telegram_id(index: int) -> int:
+    return EMPLOYEE_BASE_ID + index
+
+def _user(telegram_id: int, first_name: str) -> dict:
+    return {'id': telegram_id, 'is_bot': False, 'first_name': first_name}
+
+def _chat(telegram_id: int) -> dict:
+    return {'id': telegram_id, 'type': 'private'}
+
+def _message(telegram_id: int, first_name: str, **fields) -> dict:
+    message = {
+        'message_id': next(_ids),
+        'date': int(time.time()),
+        'chat': _chat(telegram_id),
+        'from': _user(telegram_id, first_name),
+    }
+    message.update(fields)
+    return message
+
+def web_app_data_update(telegram_id: int, rng: random.Random) -> dict:
+    calls = rng.randint(20, 120)
+    kp_plus = rng.randint(0, calls // 4)
+    kp = rng.randint(0, calls // 4)
+    payload = {
+        'calls_count': calls,
+        'kp_plus': kp_plus,
+        'kp': kp,
+        'rejections': rng.randint(0, calls - kp_plus - kp),
+        'inadequate': rng.randint(0, 10),
+        'submission_id': f"{rng.getrandbits(128):032x}",
+    }
+    return {'message': _message(
+        telegram_id, 'Employee',
+        web_app_data={'data': json.dumps(payload), 'button_text': '📊 Отправить отчёт'}
+    )}
+
+def text_update(telegram_id: int, text: str) -> dict:
+    return {'message': _message(telegram_id, 'Employee', text=text)}
+
+def callback_update(telegram_id: int, data: str) -> dict:
+    return {'callback_query': {
+        'id': str(next(_ids)),
+        'from': _user(telegram_id, 'Employee'),
+        'chat_instance': str(telegram_id),
+        'data': data,
+        'message': _message(telegram_id, 'Bench', text='...'),
+    }}
+
+def build_workload(employees: int, admin_refresh_every: int = 10, seed: int = 42) -> List[dict]:
+    """Updates in arrival order, each tagged with a 'kind' key (stripped before sending).
+
+    Every employee submits a report and presses "📈 Мой статус"; a share
+    of them also presses the inline refresh. Every admin_refresh_every
+    employee updates the admin refreshes the panel or today's status.
+    """
+    rng = random.Random(seed)
+    updates = []
+
+    for index in range(employees):
+        telegram_id = employee_telegram_id(index)
+        updates.append(('web_app_data', web_app_data_update(telegram_id, rng)))
+        updates.append(('status', text_update(telegram_id, '📈 Мой статус')))
+        if rng.random() < 0.3:
+            updates.append(('refresh_status', callback_update(telegram_id, 'refresh_status')))
+
+        if admin_refresh_every and (index + 1) % admin_refresh_every == 0:
+            data = rng.choice(['admin_refresh', 'admin_today_status'])
+            updates.append(('admin', callback_update(ADMIN_TELEGRAM_ID, data)))
+
+    rng.shuffle(updates)
+    return [dict(update, kind=kind) for kind, update in updates]
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -9,6 +10,7 @@ class Config:
     # Telegram
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     ADMIN_TELEGRAM_ID = int(os.getenv('ADMIN_TELEGRAM_ID', 0))
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')  # локальный Bot API сервер (по умолчанию api.telegram.org)
 
     # Google Sheets
     GOOGLE_SPREADSHEET_ID = os.getenv('GOOGLE_SPREADSHEET_ID')
@@ -18,19 +20,50 @@ class Config:
     TIMEZONE = os.getenv('TIMEZONE', 'Europe/Moscow')
     REMINDER_TIME = os.getenv('REMINDER_TIME', '18:00')
     REMINDER_REPEAT_AFTER_MINUTES = int(os.getenv('REMINDER_REPEAT_AFTER_MINUTES', 30))
+    REMINDER_ESCALATION = os.getenv('REMINDER_ESCALATION')  # например daily:0,repeat:30,admin:90
+    SUMMARY_FILE_THRESHOLD = int(os.getenv('SUMMARY_FILE_THRESHOLD', 300))  # строк в сводке, дальше — файлом
+    DELIVERY_MAX_FAILURES = int(os.getenv('DELIVERY_MAX_FAILURES', 3))  # после стольких отказов подряд — неактивен
+    SUBMISSION_RETENTION_HOURS = int(os.getenv('SUBMISSION_RETENTION_HOURS', 72))  # сколько помнить ID отправок отчётов
+    LATE_REPORT_DAYS = int(os.getenv('LATE_REPORT_DAYS', 2))  # за сколько прошлых дней принимать отчёт из очереди Mini App
 
     # Database
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'database/database.db')
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR')  # годовые архивы отчётов, по умолчанию database/archive рядом с базой
+    REPORT_RETENTION_DAYS = int(os.getenv('REPORT_RETENTION_DAYS', 730))  # старше — в архив, 0 = не архивировать
+    MAINTENANCE_TIME = os.getenv('MAINTENANCE_TIME', '03:30')  # архив, vacuum и статистика БД (TIMEZONE)
+    BACKUP_DIR = os.getenv('BACKUP_DIR', 'database/backups')
+    BACKUP_INTERVAL_HOURS = int(os.getenv('BACKUP_INTERVAL_HOURS', 6))  # горячая копия базы, 0 = не снимать
+    BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 28))  # сколько последних копий хранить
+    READ_REPLICA_PATH = os.getenv('READ_REPLICA_PATH')  # копия базы для сводок и статистики, пусто = читать основную
+    READ_REPLICA_REFRESH_MINUTES = int(os.getenv('READ_REPLICA_REFRESH_MINUTES', 5))
 
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/bot.log')
+    # LOG_FORMAT, LOG_SAMPLE_RATE, LOG_SAMPLE_WINDOW читает utils/logger.py из окружения напрямую
 
     # Development
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
-    # Mini App URL (GitHub Pages)
+    # Event loop monitor (стек блокирующего кода снимается в DEBUG режиме)
+    LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', 0.5))
+    LOOP_BLOCK_THRESHOLD_MS = float(os.getenv('LOOP_BLOCK_THRESHOLD_MS', 250))
+
+    # Запись входящих обновлений для benchmarks.replay (пусто = выключено)
+    UPDATE_RECORD_PATH = os.getenv('UPDATE_RECORD_PATH')
+    UPDATE_RECORD_SALT = os.getenv('UPDATE_RECORD_SALT')  # пусто — соль создаётся и хранится в <UPDATE_RECORD_PATH>.salt
+
+    # HTTP server (API + /metrics). PORT задаётся хостингом для web-процесса
+    WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
+    WEB_PORT = int(os.getenv('WEB_PORT', os.getenv('PORT', 0)))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Bearer-токен для /metrics; пусто — только с localhost
+
+    # Mini App URL (GitHub Pages или https://<хост>/webapp/ — раздача нашим HTTP сервером)
     WEBAPP_URL = os.getenv('WEBAPP_URL', 'https://victorfortuna.github.io/DailyReport')
+    WEBAPP_DIR = os.getenv('WEBAPP_DIR', 'docs')  # пусто — сервер статику не раздаёт
+    WEBAPP_CACHE_DIR = os.getenv('WEBAPP_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'dailyreport-webapp'))
+    WEBAPP_AUTH_MAX_AGE = int(os.getenv('WEBAPP_AUTH_MAX_AGE', 86400))  # секунд, сколько действует initData Mini App
 
     # Google Sheets Webhook
     GOOGLE_SHEETS_WEBHOOK_URL = os.getenv('GOOGLE_SHEETS_WEBHOOK_URL', 'https://script.google.com/macros/s/AKfycbyopLLgXsfJQzBN81HWeuTr-2PWXZVV52Vdkvw3LJbHpgwq7k9ioLfMWtsnvpWoRcqD2w/exec')
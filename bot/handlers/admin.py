@@ -3,12 +3,15 @@
 """
 
 from datetime import datetime
+from html import escape
+from typing import List
 from aiogram import Router, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
 from bot.keyboards import (
     get_admin_keyboard,
+    get_admin_pages_keyboard,
     get_admin_users_keyboard,
     get_admin_user_actions_keyboard,
     get_admin_registrations_keyboard,
@@ -16,13 +19,15 @@ from bot.keyboards import (
     get_confirmation_keyboard,
     get_back_keyboard
 )
+from bot.rendering import edit_if_changed, send_long_message, split_lines
 from services.database import DatabaseService
+from services.escalation import get_policy
 from bot.config import Config
 from utils.logger import get_logger
-from utils.timezone import format_moscow_time
+from utils.timezone import business_now, business_today, format_moscow_time
 
 logger = get_logger(__name__)
-router = Router()
+router = Router(name="admin")
 
 def is_admin(user_id: int) -> bool:
     """Проверка прав администратора"""
@@ -39,19 +44,19 @@ async def admin_panel(message: Message, db: DatabaseService):
         await message.answer("❌ Доступ запрещён. Только для администраторов.")
         return
 
-    today = datetime.now().strftime('%d.%m.%Y')
+    today = business_today(format_string='%d.%m.%Y')
 
     try:
         # Получаем базовую статистику
-        all_users = await db.get_all_users(active_only=True)
-        today_reports = await db.get_daily_reports(datetime.now().strftime('%Y-%m-%d'))
+        all_users = await db.get_all_users(active_only=True, replica=True)
+        today_reports = await db.get_daily_reports(business_today(), replica=True)
         logger.info(f"Admin stats: {len(all_users)} users, {len(today_reports)} reports")
     except Exception as e:
         logger.error(f"Error getting admin stats: {e}")
         await message.answer("❌ Ошибка получения статистики. Проверьте логи.")
         return
 
-    current_time = format_moscow_time(datetime.now(), '%H:%M:%S')
+    current_time = business_now().strftime('%H:%M:%S')
 
     await message.answer(
         f"👨‍💼 <b>Административная панель</b>\n\n"
@@ -64,48 +69,115 @@ async def admin_panel(message: Message, db: DatabaseService):
         reply_markup=get_admin_keyboard()
     )
 
-@router.callback_query(F.data == "admin_today_status")
-async def admin_today_status(callback: CallbackQuery, db: DatabaseService):
-    """Статус отчётов за сегодня"""
+@router.message(Command("slow_queries"))
+async def admin_slow_queries(message: Message, command: CommandObject, db: DatabaseService):
+    """Самые медленные запросы к БД с момента запуска: /slow_queries [N]"""
 
-    if not is_admin(callback.from_user.id):
-        await callback.answer("❌ Доступ запрещён", show_alert=True)
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Доступ запрещён. Только для администраторов.")
+        return
+
+    try:
+        limit = max(1, min(int(command.args), 20)) if command.args else 10
+    except ValueError:
+        await message.answer("❌ Использование: /slow_queries [N]")
+        return
+
+    top_queries = db.query_stats.top(limit)
+    if not top_queries:
+        await message.answer("📭 С момента запуска запросов к базе ещё не было.")
         return
 
-    today = datetime.now().strftime('%Y-%m-%d')
-    today_display = datetime.now().strftime('%d.%m.%Y')
+    text = (
+        f"🐢 <b>Самые медленные запросы (топ {len(top_queries)})</b>\n"
+        f"⏱ Порог медленного запроса: {db.slow_query_ms:g} мс\n\n"
+    )
+    for i, stat in enumerate(top_queries, 1):
+        text += (
+            f"{i}. <b>{stat.max_time * 1000:.1f} мс</b> макс, "
+            f"{stat.avg_time * 1000:.1f} мс сред., ×{stat.count}, "
+            f"строк {stat.rows}, медленных {stat.slow_count}\n"
+            f"<code>{escape(stat.fingerprint[:200])}</code>\n\n"
+        )
+
+    await message.answer(text)
+
+async def _today_status_lines(db: DatabaseService) -> List[str]:
+    """Строки сводки за сегодня: итоги первыми, затем списки сдавших и не сдавших"""
+    today = business_today()
+    today_display = business_today(format_string='%d.%m.%Y')
 
-    # Получаем данные
-    all_users = await db.get_all_users(active_only=True)
-    daily_reports = await db.get_daily_reports(today)
-    users_without_report = await db.get_users_without_report(today)
+    # Получаем данные (сводка терпит отставание реплики, если она настроена)
+    all_users = await db.get_all_users(active_only=True, replica=True)
+    daily_reports = await db.get_daily_reports(today, replica=True)
+    users_without_report = await db.get_users_without_report(today, replica=True)
 
-    # Формируем сообщение
-    status_text = f"📊 <b>Отчёты за {today_display}</b>\n\n"
+    lines = [
+        f"📊 <b>Отчёты за {today_display}</b>",
+        "",
+        f"👥 Всего сотрудников: {len(all_users)}",
+        f"✅ Отправлено: {len(daily_reports)}",
+        f"❌ Не отправлено: {len(users_without_report)}",
+        f"📊 Процент выполнения: {round(len(daily_reports) / len(all_users) * 100) if all_users else 0}%",
+    ]
 
     if daily_reports:
-        status_text += f"✅ <b>Отправили отчёт ({len(daily_reports)}):</b>\n"
+        lines += ["", f"✅ <b>Отправили отчёт ({len(daily_reports)}):</b>"]
         for report in daily_reports:
             time_str = format_moscow_time(datetime.fromisoformat(report['submitted_at']))
             calls = report['calls_count']
             resultative = report['kp_plus'] + report['kp']
             conversion = round((resultative / calls) * 100, 1) if calls > 0 else 0
-            status_text += f"• {report['full_name']} - {time_str} ({calls} звонков, {conversion}%)\n"
-        status_text += "\n"
+            lines.append(f"• {escape(report['full_name'])} - {time_str} ({calls} звонков, {conversion}%)")
 
     if users_without_report:
-        status_text += f"❌ <b>Не отправили отчёт ({len(users_without_report)}):</b>\n"
-        for user in users_without_report:
-            status_text += f"• {user.full_name}\n"
-        status_text += "\n"
-
-    status_text += f"📈 <b>Общая статистика:</b>\n"
-    status_text += f"👥 Всего сотрудников: {len(all_users)}\n"
-    status_text += f"✅ Отправлено: {len(daily_reports)}\n"
-    status_text += f"❌ Не отправлено: {len(users_without_report)}\n"
-    status_text += f"📊 Процент выполнения: {round(len(daily_reports) / len(all_users) * 100) if all_users else 0}%"
-
-    await callback.message.edit_text(status_text, reply_markup=get_admin_keyboard())
+        lines += ["", f"❌ <b>Не отправили отчёт ({len(users_without_report)}):</b>"]
+        lines.extend(f"• {escape(user.full_name)}" for user in users_without_report)
+
+    return lines
+
+# Сколько строк сводки (заголовок и итоги) остаётся текстом, когда список уходит файлом
+TODAY_STATUS_HEAD = 6
+
+@router.callback_query(F.data == "admin_today_status")
+@router.callback_query(F.data.startswith("admin_today_page_"))
+async def admin_today_status(callback: CallbackQuery, db: DatabaseService):
+    """Статус отчётов за сегодня (длинная сводка листается страницами)"""
+
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Доступ запрещён", show_alert=True)
+        return
+
+    lines = await _today_status_lines(db)
+    pages = split_lines(lines)
+
+    page = 0
+    if callback.data.startswith("admin_today_page_"):
+        page = min(max(int(callback.data.rsplit("_", 1)[-1]), 0), len(pages) - 1)
+
+    if len(pages) == 1:
+        keyboard = get_admin_keyboard()
+    else:
+        keyboard = get_admin_pages_keyboard(
+            "admin_today", page, len(pages), with_file=len(lines) > Config.SUMMARY_FILE_THRESHOLD
+        )
+
+    await edit_if_changed(callback.message, pages[page], reply_markup=keyboard)
+    await callback.answer()
+
+@router.callback_query(F.data == "admin_today_file")
+async def admin_today_status_file(callback: CallbackQuery, db: DatabaseService):
+    """Полная сводка за сегодня файлом"""
+
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Доступ запрещён", show_alert=True)
+        return
+
+    lines = await _today_status_lines(db)
+    await send_long_message(
+        callback.bot, callback.from_user.id, lines,
+        document_name=f"reports_{business_today()}.txt", head=TODAY_STATUS_HEAD, as_file=True
+    )
     await callback.answer()
 
 @router.callback_query(F.data == "admin_users_list")
@@ -119,7 +191,8 @@ async def admin_users_list(callback: CallbackQuery, db: DatabaseService):
     users = await db.get_all_users(active_only=False)
 
     if not users:
-        await callback.message.edit_text(
+        await edit_if_changed(
+            callback.message,
             "👥 <b>Список сотрудников пуст</b>\n\n"
             "Пользователи появятся здесь после регистрации через /start",
             reply_markup=get_admin_keyboard()
@@ -145,7 +218,8 @@ async def admin_users_list(callback: CallbackQuery, db: DatabaseService):
         for user in inactive_users[:5]:
             users_text += f"• {user.full_name}\n"
 
-    await callback.message.edit_text(
+    await edit_if_changed(
+        callback.message,
         users_text,
         reply_markup=get_admin_users_keyboard(users[:20])  # Показываем кнопки для первых 20
     )
@@ -162,7 +236,7 @@ async def admin_stats(callback: CallbackQuery, db: DatabaseService):
     # Получаем данные за последние 7 дней
     stats_text = "📈 <b>Статистика системы</b>\n\n"
 
-    all_users = await db.get_all_users(active_only=False)
+    all_users = await db.get_all_users(active_only=False, replica=True)
     active_users = [u for u in all_users if u.is_active]
 
     stats_text += f"👥 <b>Пользователи:</b>\n"
@@ -171,8 +245,8 @@ async def admin_stats(callback: CallbackQuery, db: DatabaseService):
     stats_text += f"• Неактивных: {len(all_users) - len(active_users)}\n\n"
 
     # Статистика по дням
-    today = datetime.now().strftime('%Y-%m-%d')
-    today_reports = await db.get_daily_reports(today)
+    today = business_today()
+    today_reports = await db.get_daily_reports(today, replica=True)
 
     stats_text += f"📊 <b>Отчёты за сегодня:</b>\n"
     stats_text += f"• Отправлено: {len(today_reports)}\n"
@@ -189,7 +263,7 @@ async def admin_stats(callback: CallbackQuery, db: DatabaseService):
         stats_text += f"• Результативных: {total_resultative}\n"
         stats_text += f"• Средняя конверсия: {avg_conversion}%\n"
 
-    await callback.message.edit_text(stats_text, reply_markup=get_admin_keyboard())
+    await edit_if_changed(callback.message, stats_text, reply_markup=get_admin_keyboard())
     await callback.answer()
 
 @router.callback_query(F.data == "admin_settings")
@@ -203,7 +277,7 @@ async def admin_settings(callback: CallbackQuery):
     settings_text = (
         f"⚙️ <b>Настройки системы</b>\n\n"
         f"🕐 <b>Время напоминаний:</b> {Config.REMINDER_TIME}\n"
-        f"🔄 <b>Повтор через:</b> {Config.REMINDER_REPEAT_AFTER_MINUTES} мин\n"
+        f"🔄 <b>Этапы напоминаний:</b> {get_policy().describe()}\n"
         f"🌍 <b>Часовой пояс:</b> {Config.TIMEZONE}\n"
         f"📱 <b>Mini App URL:</b> {Config.WEBAPP_URL}\n"
         f"🗄️ <b>База данных:</b> {Config.DATABASE_PATH}\n"
@@ -234,12 +308,16 @@ async def admin_user_details(callback: CallbackQuery, db: DatabaseService):
             return
 
         # Получаем статистику пользователя
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = business_today(user.timezone)
         today_reports = await db.get_daily_reports(today)
         user_reports = [r for r in today_reports if r.get('telegram_id') == user.telegram_id]
 
         status_emoji = "✅" if user.is_active else "❌"
         reg_date = format_moscow_time(user.created_at, '%d.%m.%Y %H:%M') if user.created_at else 'Неизвестно'
+        delivery_line = (
+            f"📵 <b>Ошибка доставки:</b> {escape(user.last_delivery_error)} (подряд: {user.delivery_failures})\n"
+            if user.last_delivery_error else ""
+        )
 
         user_text = (
             f"👤 <b>Информация о сотруднике</b>\n\n"
@@ -247,7 +325,9 @@ async def admin_user_details(callback: CallbackQuery, db: DatabaseService):
             f"🆔 <b>Telegram ID:</b> <code>{user.telegram_id}</code>\n"
             f"📱 <b>Username:</b> @{user.username or 'отсутствует'}\n"
             f"{status_emoji} <b>Статус:</b> {'Активный' if user.is_active else 'Неактивный'}\n"
-            f"📅 <b>Зарегистрирован:</b> {reg_date}\n\n"
+            f"📅 <b>Зарегистрирован:</b> {reg_date}\n"
+            f"🌍 <b>Часовой пояс:</b> {user.timezone or Config.TIMEZONE}\n"
+            f"{delivery_line}\n"
             f"📊 <b>Отчёт за сегодня:</b> {'✅ Отправлен' if user_reports else '❌ Не отправлен'}\n\n"
             f"Выберите действие:"
         )
@@ -376,12 +456,12 @@ async def admin_refresh(callback: CallbackQuery, db: DatabaseService):
         return
 
     # Генерируем админ-панель напрямую (без вызова admin_panel с callback.message)
-    today = datetime.now().strftime('%d.%m.%Y')
+    today = business_today(format_string='%d.%m.%Y')
 
     try:
         # Получаем базовую статистику
-        all_users = await db.get_all_users(active_only=True)
-        today_reports = await db.get_daily_reports(datetime.now().strftime('%Y-%m-%d'))
+        all_users = await db.get_all_users(active_only=True, replica=True)
+        today_reports = await db.get_daily_reports(business_today(), replica=True)
         logger.info(f"Admin stats: {len(all_users)} users, {len(today_reports)} reports")
     except Exception as e:
         logger.error(f"Error getting admin stats: {e}")
@@ -389,10 +469,11 @@ async def admin_refresh(callback: CallbackQuery, db: DatabaseService):
         await callback.answer()
         return
 
-    # Добавляем временную метку чтобы избежать ошибки "message is not modified"
-    current_time = format_moscow_time(datetime.now(), '%H:%M:%S')
+    # Время с точностью до минуты: повторное нажатие без изменений не дёргает Telegram
+    current_time = business_now().strftime('%H:%M')
 
-    await callback.message.edit_text(
+    edited = await edit_if_changed(
+        callback.message,
         f"👨‍💼 <b>Административная панель</b>\n\n"
         f"📅 <b>Дата:</b> {today}\n"
         f"👥 <b>Активных сотрудников:</b> {len(all_users)}\n"
@@ -402,7 +483,7 @@ async def admin_refresh(callback: CallbackQuery, db: DatabaseService):
         f"Выберите действие:",
         reply_markup=get_admin_keyboard()
     )
-    await callback.answer("✅ Обновлено")
+    await callback.answer("✅ Обновлено" if edited else "✅ Без изменений")
 
 @router.callback_query(F.data == "admin_registrations")
 async def admin_registrations_list(callback: CallbackQuery, db: DatabaseService):
@@ -425,7 +506,7 @@ async def admin_registrations_list(callback: CallbackQuery, db: DatabaseService)
             "Заявки будут отображаться здесь после того, как новые пользователи "
             "попытаются зарегистрироваться через /start"
         )
-        await callback.message.edit_text(registrations_text, reply_markup=get_admin_keyboard())
+        await edit_if_changed(callback.message, registrations_text, reply_markup=get_admin_keyboard())
         await callback.answer()
         return
 
@@ -450,7 +531,7 @@ async def admin_registrations_list(callback: CallbackQuery, db: DatabaseService)
     # Показываем только pending заявки в кнопках
     keyboard = get_admin_registrations_keyboard(pending_registrations)
 
-    await callback.message.edit_text(registrations_text, reply_markup=keyboard)
+    await edit_if_changed(callback.message, registrations_text, reply_markup=keyboard)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("admin_reg_"))
@@ -3,8 +3,6 @@
 """
 
 import json
-import aiohttp
-from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, WebAppInfo
 
@@ -14,63 +12,14 @@ from bot.keyboards import (
     get_user_status_keyboard,
     get_back_keyboard
 )
+from bot.rendering import render_user_status
 from services.database import DatabaseService
-from bot.config import Config
+from services.reports import parse_report_date, parse_submission_id, submit_report
 from utils.logger import get_logger
-from utils.timezone import format_moscow_time
+from utils.timezone import business_today, format_moscow_time
 
 logger = get_logger(__name__)
-router = Router()
-
-async def send_to_google_sheets(report_data: dict) -> bool:
-    """Отправка данных отчёта в Google Таблицу"""
-    try:
-        # Подготовка данных для Google Sheets
-        payload = {
-            "secret_key": Config.GOOGLE_SHEETS_SECRET_KEY,
-            "employee_name": report_data.get("employee_name"),
-            "report_date": report_data.get("report_date"),
-            "calls_count": report_data.get("calls_count"),
-            "kp_plus": report_data.get("kp_plus"),
-            "kp": report_data.get("kp"),
-            "rejections": report_data.get("rejections"),
-            "inadequate": report_data.get("inadequate")
-        }
-
-        # Отправка POST запроса в Google Apps Script
-        timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(
-                Config.GOOGLE_SHEETS_WEBHOOK_URL,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                allow_redirects=True
-            ) as response:
-                logger.info(f"Google Sheets response status: {response.status}")
-
-                if response.status != 200:
-                    text = await response.text()
-                    logger.error(f"Google Sheets HTTP error {response.status}: {text[:200]}...")
-                    return False
-
-                content_type = response.headers.get('content-type', '')
-                if 'application/json' not in content_type:
-                    text = await response.text()
-                    logger.error(f"Google Sheets returned HTML instead of JSON: {text[:200]}...")
-                    return False
-
-                result = await response.json()
-
-                if result.get("status") == "success":
-                    logger.info(f"Successfully sent data to Google Sheets for {report_data.get('employee_name')}")
-                    return True
-                else:
-                    logger.error(f"Google Sheets error: {result.get('message', 'Unknown error')}")
-                    return False
-
-    except Exception as e:
-        logger.error(f"Failed to send data to Google Sheets: {e}")
-        return False
+router = Router(name="report")
 
 @router.message(F.text == "📊 Отправить отчёт")
 async def request_report(message: Message, db: DatabaseService):
@@ -82,7 +31,7 @@ async def request_report(message: Message, db: DatabaseService):
         return
 
     # Проверим, отправлен ли уже отчёт за сегодня
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = business_today(user.timezone)
     existing_report = await db.get_report(user.id, today)
 
     if existing_report:
@@ -94,14 +43,14 @@ async def request_report(message: Message, db: DatabaseService):
             f"🔄 КЦ: {existing_report.kp}\n"
             f"❌ Отказы: {existing_report.rejections}\n"
             f"📵 Пустые звонки: {existing_report.inadequate}\n\n"
-            f"🕐 <b>Время отправки:</b> {format_moscow_time(existing_report.submitted_at)}\n\n"
+            f"🕐 <b>Время отправки:</b> {format_moscow_time(existing_report.submitted_at, tz_name=user.timezone)}\n\n"
             f"💡 <b>Хотите обновить данные?</b>\n"
             f"Просто отправьте отчёт заново - данные обновятся.",
             reply_markup=get_report_keyboard()
         )
     else:
         await message.answer(
-            f"📊 <b>Отправка отчёта за {datetime.now().strftime('%d.%m.%Y')}</b>\n\n"
+            f"📊 <b>Отправка отчёта за {business_today(user.timezone, '%d.%m.%Y')}</b>\n\n"
             f"👤 <b>Сотрудник:</b> {user.full_name}\n\n"
             f"📱 Нажмите кнопку ниже для открытия формы отчёта:",
             reply_markup=get_report_keyboard()
@@ -119,7 +68,7 @@ async def open_report_form_callback(callback: CallbackQuery, db: DatabaseService
     await callback.message.edit_text(
         f"📊 <b>Форма отчёта</b>\n\n"
         f"👤 <b>Сотрудник:</b> {user.full_name}\n"
-        f"📅 <b>Дата:</b> {datetime.now().strftime('%d.%m.%Y')}\n\n"
+        f"📅 <b>Дата:</b> {business_today(user.timezone, '%d.%m.%Y')}\n\n"
         f"📱 Нажмите кнопку для открытия формы:",
         reply_markup=get_report_keyboard()
     )
@@ -170,72 +119,67 @@ async def process_web_app_data(message: Message, db: DatabaseService):
             await message.answer("❌ Количество результативных звонков не может превышать общее количество.")
             return
 
-        # Сохранение отчёта
-        today = datetime.now().strftime('%Y-%m-%d')
-        report = await db.create_report(
-            user_id=user.id,
-            report_date=today,
-            calls_count=calls_count,
-            kp_plus=kp_plus,
-            kp=kp,
-            rejections=rejections,
-            inadequate=inadequate
-        )
+        try:
+            submission_id = parse_submission_id(data.get('submission_id'))
+        except ValueError:
+            logger.warning(f"Ignoring malformed submission_id from {user.full_name}: {data.get('submission_id')!r}")
+            submission_id = None
+
+        # Отправка из офлайн-очереди формы несёт дату нажатия, а не сегодняшнюю
+        try:
+            report_date = parse_report_date(data.get('report_date'), user.timezone)
+        except ValueError as e:
+            logger.warning(f"Rejected web app report from {user.full_name}: {e}")
+            await message.answer(
+                "❌ Отчёт не принят: дата отчёта устарела или указана неверно.\n"
+                "Откройте форму заново и отправьте отчёт за сегодня."
+            )
+            return
+
+        # Сохранение отчёта, выгрузка и уведомление админа (повтор той же отправки ничего не делает)
+        values = {
+            'calls_count': calls_count, 'kp_plus': kp_plus, 'kp': kp,
+            'rejections': rejections, 'inadequate': inadequate,
+        }
+        result = await submit_report(db, user, values, submission_id, bot=message.bot,
+                                     report_date=report_date)
+
+        if result:
+            report = result.report
 
-        if report:
             # Подсчёт статистики
-            total_resultative = kp_plus + kp
-            conversion = round((total_resultative / calls_count) * 100, 1) if calls_count > 0 else 0
-
-            # Отправка данных в Google Таблицу
-            google_sheets_data = {
-                "employee_name": user.full_name,
-                "report_date": today,
-                "calls_count": calls_count,
-                "kp_plus": kp_plus,
-                "kp": kp,
-                "rejections": rejections,
-                "inadequate": inadequate
-            }
-
-            sheets_success = await send_to_google_sheets(google_sheets_data)
-            sheets_status = "✅ Данные сохранены в Google Таблицу" if sheets_success else "⚠️ Ошибка сохранения в Google Таблицу (данные в базе сохранены)"
+            total_resultative = report.kp_plus + report.kp
+            conversion = round((total_resultative / report.calls_count) * 100, 1) if report.calls_count > 0 else 0
+
+            if result.sheets_ok is None:
+                sheets_status = "⏳ Данные сохраняются в Google Таблицу"
+            elif result.sheets_ok:
+                sheets_status = "✅ Данные сохранены в Google Таблицу"
+            else:
+                sheets_status = "⚠️ Ошибка сохранения в Google Таблицу (данные в базе сохранены)"
+            title = "ℹ️ <b>Этот отчёт уже принят</b>" if result.duplicate else "✅ <b>Отчёт успешно отправлен!</b>"
+            year, month, day = report.report_date.split('-')
 
             # Отправка подтверждения
             await message.answer(
-                f"✅ <b>Отчёт успешно отправлен!</b>\n\n"
-                f"📊 <b>Ваши результаты за {datetime.now().strftime('%d.%m.%Y')}:</b>\n\n"
-                f"📞 <b>Звонков:</b> {calls_count}\n"
-                f"✅ <b>КЦ+:</b> {kp_plus}\n"
-                f"🔄 <b>КЦ:</b> {kp}\n"
-                f"❌ <b>Отказы:</b> {rejections}\n"
-                f"📵 <b>Пустые звонки:</b> {inadequate}\n\n"
+                f"{title}\n\n"
+                f"📊 <b>Ваши результаты за {day}.{month}.{year}:</b>\n\n"
+                f"📞 <b>Звонков:</b> {report.calls_count}\n"
+                f"✅ <b>КЦ+:</b> {report.kp_plus}\n"
+                f"🔄 <b>КЦ:</b> {report.kp}\n"
+                f"❌ <b>Отказы:</b> {report.rejections}\n"
+                f"📵 <b>Пустые звонки:</b> {report.inadequate}\n\n"
                 f"📈 <b>Статистика:</b>\n"
                 f"🎯 <b>Результативных:</b> {total_resultative}\n"
                 f"📊 <b>Конверсия:</b> {conversion}%\n\n"
-                f"🕐 <b>Время отправки:</b> {format_moscow_time(report.submitted_at)}\n\n"
+                f"🕐 <b>Время отправки:</b> {format_moscow_time(report.submitted_at, tz_name=user.timezone)}\n\n"
                 f"{sheets_status}\n\n"
                 f"🙏 Спасибо за работу!",
                 reply_markup=get_main_menu_keyboard(user.full_name)
             )
 
-            logger.info(f"Report saved for {user.full_name}: {calls_count} calls, {total_resultative} resultative")
-
-            # Уведомление админа о новом отчёте
-            try:
-                await message.bot.send_message(
-                    Config.ADMIN_TELEGRAM_ID,
-                    f"📊 <b>Новый отчёт получен</b>\n\n"
-                    f"👤 <b>Сотрудник:</b> {user.full_name}\n"
-                    f"📅 <b>Дата:</b> {datetime.now().strftime('%d.%m.%Y')}\n"
-                    f"🕐 <b>Время:</b> {format_moscow_time(report.submitted_at)}\n\n"
-                    f"📞 <b>Звонков:</b> {calls_count}\n"
-                    f"🎯 <b>Результативных:</b> {total_resultative} ({conversion}%)\n"
-                    f"✅ <b>КЦ+:</b> {kp_plus} | 🔄 <b>КЦ:</b> {kp}\n"
-                    f"❌ <b>Отказы:</b> {rejections} | 📵 <b>Пустые звонки:</b> {inadequate}"
-                )
-            except Exception as e:
-                logger.warning(f"Failed to notify admin about new report: {e}")
+            if not result.duplicate:
+                logger.info(f"Report saved for {user.full_name}: {calls_count} calls, {total_resultative} resultative")
 
         else:
             await message.answer(
@@ -264,69 +208,25 @@ async def process_web_app_data(message: Message, db: DatabaseService):
         logger.error(f"Error processing web app data from {user.full_name}: {e}")
 
 @router.message(F.text == "📈 Мой статус")
-async def user_status(message: Message, db: DatabaseService):
-    """Показать статус пользователя"""
+async def user_status(message: Message, db: DatabaseService, telegram_id: int = None):
+    """Показать статус пользователя
 
-    user = await db.get_user(message.from_user.id)
+    Из callback передаётся telegram_id нажавшего: message там — сообщение бота.
+    """
+
+    user = await db.get_user(telegram_id or message.from_user.id)
     if not user:
         await message.answer("❌ Сначала необходимо зарегистрироваться. Используйте /start")
         return
 
-    # Проверяем отчёт за сегодня
-    today = datetime.now().strftime('%Y-%m-%d')
-    today_report = await db.get_report(user.id, today)
-
-    # Получаем последние отчёты
-    recent_reports = await db.get_user_reports(user.id, limit=7)
-
-    # Формируем сообщение
-    status_text = f"📈 <b>Статус отчётов</b>\n\n👤 <b>{user.full_name}</b>\n\n"
-
-    # Статус сегодняшнего отчёта
-    if today_report:
-        total_resultative = today_report.kp_plus + today_report.kp
-        conversion = round((total_resultative / today_report.calls_count) * 100, 1) if today_report.calls_count > 0 else 0
-
-        status_text += (
-            f"✅ <b>Отчёт за сегодня отправлен</b>\n"
-            f"🕐 Время: {today_report.submitted_at.strftime('%H:%M')}\n"
-            f"📞 Звонков: {today_report.calls_count}\n"
-            f"🎯 Результативных: {total_resultative} ({conversion}%)\n\n"
-        )
-    else:
-        status_text += f"❌ <b>Отчёт за сегодня не отправлен</b>\n\n"
-
-    # Статистика за неделю - только факт отправки
-    status_text += "📅 <b>Отчёты за последние 7 дней:</b>\n"
-
-    from datetime import timedelta
-    today_date = datetime.now().date()
-
-    # Создаем словарь отчётов по датам для быстрого поиска
-    reports_by_date = {r.report_date: r for r in recent_reports}
-
-    for i in range(7):
-        check_date = today_date - timedelta(days=i)
-        check_date_str = check_date.strftime('%Y-%m-%d')
-        display_date = check_date.strftime('%d.%m')
-
-        if i == 0:
-            display_date += " (сегодня)"
-        elif i == 1:
-            display_date += " (вчера)"
-
-        if check_date_str in reports_by_date:
-            status_text += f"✅ {display_date}\n"
-        else:
-            status_text += f"❌ {display_date}\n"
-
+    status_text = await render_user_status(user, db)
     await message.answer(status_text, reply_markup=get_user_status_keyboard())
 
 @router.callback_query(F.data == "refresh_status")
 async def refresh_status(callback: CallbackQuery, db: DatabaseService):
     """Обновить статус пользователя"""
     # Используем тот же код что и в user_status, но для callback
-    await user_status(callback.message, db)
+    await user_status(callback.message, db, telegram_id=callback.from_user.id)
     await callback.answer("✅ Статус обновлён")
 
 @router.callback_query(F.data == "cancel_report")
@@ -342,5 +242,5 @@ async def cancel_report(callback: CallbackQuery):
 @router.callback_query(F.data == "check_status")
 async def check_status_callback(callback: CallbackQuery, db: DatabaseService):
     """Проверка статуса через callback (из напоминаний)"""
-    await user_status(callback.message, db)
+    await user_status(callback.message, db, telegram_id=callback.from_user.id)
     await callback.answer()
\ No newline at end of file
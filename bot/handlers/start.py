@@ -3,7 +3,9 @@
 """
 
 from aiogram import Router, F
-from aiogram.filters import CommandStart, Command, StateFilter
+from datetime import time
+from html import escape
+from aiogram.filters import CommandStart, Command, CommandObject, StateFilter
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -13,21 +15,31 @@ from bot.keyboards import (
     get_registration_keyboard,
     get_help_keyboard
 )
+from bot.config import Config
 from services.database import DatabaseService
+from services.escalation import get_policy
 from utils.logger import get_logger
+from utils.timezone import business_now, is_valid_timezone
 
 logger = get_logger(__name__)
-router = Router()
+router = Router(name="start")
 
 class RegistrationStates(StatesGroup):
     waiting_for_name = State()
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext, db: DatabaseService):
+async def cmd_start(message: Message, state: FSMContext, db: DatabaseService, scheduler=None):
     """Обработчик команды /start"""
 
     user = await db.get_user(message.from_user.id)
 
+    if user and not user.is_active and user.delivery_failures:
+        # Отключён за недоставленные сообщения — раз пишет боту, чат снова доступен
+        await db.update_user(message.from_user.id, is_active=1, delivery_failures=0, last_delivery_error=None)
+        if scheduler:
+            await scheduler.refresh_user_reminders(message.from_user.id)
+        logger.info(f"User {user.full_name} ({message.from_user.id}) reactivated after delivery failures")
+
     if user:
         # Пользователь уже зарегистрирован
         await message.answer(
@@ -268,7 +280,11 @@ async def help_handler(message: Message, db: DatabaseService):
         "• Заполните форму с данными за день и нажмите кнопку \"Отправить\"\n\n"
         "📈 <b>Мой статус</b>\n"
         "• Показывает отправлен ли отчёт за сегодня\n"
-        "• Отображает статистику за последние дни"
+        "• Отображает статистику за последние дни\n\n"
+        "🌍 <b>/timezone</b>\n"
+        "• Показывает и меняет ваш часовой пояс: по нему считается «сегодня» и приходят напоминания\n\n"
+        "⏰ <b>/reminder</b>\n"
+        "• Показывает и меняет время напоминания об отчёте"
     )
 
 @router.message(Command("help"))
@@ -289,6 +305,94 @@ async def cmd_status(message: Message, db: DatabaseService):
     from bot.handlers.report import user_status
     await user_status(message, db)
 
+@router.message(Command("timezone"))
+async def cmd_timezone(message: Message, command: CommandObject, db: DatabaseService, scheduler=None):
+    """Показать или сменить часовой пояс сотрудника: /timezone Asia/Yekaterinburg"""
+    user = await db.get_user(message.from_user.id)
+    if not user:
+        await message.answer("❌ Сначала необходимо зарегистрироваться. Используйте /start")
+        return
+
+    current = user.timezone or Config.TIMEZONE
+    tz_name = (command.args or '').strip()
+
+    if not tz_name:
+        await message.answer(
+            f"🌍 <b>Ваш часовой пояс:</b> {current}\n"
+            f"🕐 Сейчас у вас {business_now(current).strftime('%H:%M')}, "
+            f"напоминание приходит в {user.reminder_time or Config.REMINDER_TIME}.\n\n"
+            "Чтобы сменить пояс, отправьте, например:\n"
+            "<code>/timezone Asia/Yekaterinburg</code>\n"
+            "<code>/timezone Europe/Moscow</code>"
+        )
+        return
+
+    if not is_valid_timezone(tz_name):
+        await message.answer(
+            f"❌ Неизвестный часовой пояс: <code>{escape(tz_name)}</code>\n\n"
+            "Укажите название из базы IANA, например <code>Asia/Novosibirsk</code>."
+        )
+        return
+
+    # Пояс по умолчанию храним как NULL — он следует за настройкой TIMEZONE
+    stored = None if tz_name == Config.TIMEZONE else tz_name
+    if not await db.update_user(message.from_user.id, timezone=stored):
+        await message.answer("❌ Не удалось сохранить часовой пояс. Попробуйте позже.")
+        return
+
+    if scheduler:
+        await scheduler.refresh_user_reminders(message.from_user.id)
+
+    await message.answer(
+        f"✅ <b>Часовой пояс изменён:</b> {tz_name}\n"
+        f"🕐 Сейчас у вас {business_now(tz_name).strftime('%H:%M')}, "
+        f"отчёт за день считается по этому времени."
+    )
+    logger.info(f"User {user.full_name} ({message.from_user.id}) set timezone {tz_name}")
+
+@router.message(Command("reminder"))
+async def cmd_reminder(message: Message, command: CommandObject, db: DatabaseService, scheduler=None):
+    """Показать или сменить время напоминания: /reminder 17:30, /reminder default"""
+    user = await db.get_user(message.from_user.id)
+    if not user:
+        await message.answer("❌ Сначала необходимо зарегистрироваться. Используйте /start")
+        return
+
+    value = (command.args or '').strip()
+
+    if not value:
+        await message.answer(
+            f"⏰ <b>Напоминание об отчёте:</b> {user.reminder_time or Config.REMINDER_TIME} "
+            f"({user.timezone or Config.TIMEZONE})\n"
+            f"🔄 Напоминания, пока отчёт не отправлен: {get_policy().describe()}\n\n"
+            "Чтобы сменить время, отправьте, например:\n"
+            "<code>/reminder 17:30</code>\n"
+            "<code>/reminder default</code> — вернуть общее время"
+        )
+        return
+
+    if value.lower() == 'default':
+        reminder_time = None
+    else:
+        try:
+            reminder_time = time.fromisoformat(value).strftime('%H:%M')
+        except ValueError:
+            await message.answer("❌ Укажите время в формате ЧЧ:ММ, например <code>/reminder 17:30</code>")
+            return
+
+    if not await db.update_user(message.from_user.id, reminder_time=reminder_time):
+        await message.answer("❌ Не удалось сохранить время напоминания. Попробуйте позже.")
+        return
+
+    if scheduler:
+        await scheduler.refresh_user_reminders(message.from_user.id)
+
+    await message.answer(
+        f"✅ <b>Напоминание будет приходить в {reminder_time or Config.REMINDER_TIME}</b> "
+        f"({user.timezone or Config.TIMEZONE})"
+    )
+    logger.info(f"User {user.full_name} ({message.from_user.id}) set reminder time {reminder_time or 'default'}")
+
 # Обработчики callback для помощи
 @router.callback_query(F.data.startswith("help_"))
 async def help_callbacks(callback: CallbackQuery):
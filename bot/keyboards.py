@@ -2,6 +2,7 @@
 Клавиатуры и кнопки для Telegram бота
 """
 
+from functools import lru_cache
 from aiogram.types import (
     InlineKeyboardMarkup, InlineKeyboardButton,
     ReplyKeyboardMarkup, KeyboardButton,
@@ -9,6 +10,10 @@ from aiogram.types import (
 )
 from bot.config import Config
 
+# Клавиатуры без параметров (и меню на сотрудника) не меняются, поэтому строятся один раз
+# и переиспользуются — разметку нельзя изменять после получения из функции.
+
+@lru_cache(maxsize=1024)
 def get_main_menu_keyboard(user_full_name: str = None) -> ReplyKeyboardMarkup:
     """Главное меню для сотрудников"""
 
@@ -36,6 +41,7 @@ def get_main_menu_keyboard(user_full_name: str = None) -> ReplyKeyboardMarkup:
     )
     return keyboard
 
+@lru_cache(maxsize=None)
 def get_report_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для отправки отчёта через Mini App"""
     webapp = WebAppInfo(url=Config.WEBAPP_URL)
@@ -46,6 +52,22 @@ def get_report_keyboard() -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@lru_cache(maxsize=256)
+def get_admin_pages_keyboard(prefix: str, page: int, pages: int, with_file: bool = False) -> InlineKeyboardMarkup:
+    """Админ-клавиатура с листанием длинной сводки: callback_data вида {prefix}_page_{N}"""
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="◀️", callback_data=f"{prefix}_page_{page - 1}"))
+    navigation.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=f"{prefix}_page_{page}"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(text="▶️", callback_data=f"{prefix}_page_{page + 1}"))
+
+    rows = [navigation]
+    if with_file:
+        rows.append([InlineKeyboardButton(text="📄 Полный список файлом", callback_data=f"{prefix}_file")])
+    return InlineKeyboardMarkup(inline_keyboard=rows + get_admin_keyboard().inline_keyboard)
+
+@lru_cache(maxsize=None)
 def get_admin_keyboard() -> InlineKeyboardMarkup:
     """Административная клавиатура"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -79,11 +101,13 @@ def get_admin_users_keyboard(users: list) -> InlineKeyboardMarkup:
 
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+@lru_cache(maxsize=None)
 def get_user_status_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для просмотра статуса пользователя"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
     return keyboard
 
+@lru_cache(maxsize=64)
 def get_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
     """Клавиатура подтверждения действия"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -94,6 +118,7 @@ def get_confirmation_keyboard(action: str) -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@lru_cache(maxsize=None)
 def get_back_keyboard() -> InlineKeyboardMarkup:
     """Простая клавиатура с кнопкой "Назад" """
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -101,6 +126,7 @@ def get_back_keyboard() -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@lru_cache(maxsize=None)
 def get_help_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для справки"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -111,6 +137,22 @@ def get_help_keyboard() -> InlineKeyboardMarkup:
     ])
     return keyboard
 
+@lru_cache(maxsize=None)
+def get_reminder_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура под напоминанием об отчёте"""
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text="📊 Отправить отчёт",
+            web_app=WebAppInfo(url=Config.WEBAPP_URL)
+        )],
+        [InlineKeyboardButton(
+            text="📈 Мой статус",
+            callback_data="check_status"
+        )]
+    ])
+    return keyboard
+
+@lru_cache(maxsize=None)
 def get_registration_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура для начала регистрации"""
     keyboard = ReplyKeyboardMarkup(
@@ -122,6 +164,7 @@ def get_registration_keyboard() -> ReplyKeyboardMarkup:
     )
     return keyboard
 
+@lru_cache(maxsize=256)
 def get_admin_user_actions_keyboard(user_id: int) -> InlineKeyboardMarkup:
     """Действия с конкретным пользователем для админа"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -5,20 +5,121 @@ Telegram Daily Report Bot
 """
 
 import asyncio
-import logging
+import hashlib
+import json
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.types import BotCommand, BotCommandScopeDefault
 
 from bot.config import Config
 from bot.handlers import start, report, admin
+from bot.middlewares.correlation import CorrelationMiddleware
+from bot.middlewares.metrics import (
+    UpdateMetricsMiddleware,
+    HandlerMetricsMiddleware,
+    TelegramRequestMetricsMiddleware
+)
 from services.database import DatabaseService
 from services.scheduler import SchedulerService
+from services.loop_monitor import LoopMonitor
 from utils.logger import get_logger
 
 # Настройка логирования
 logger = get_logger(__name__)
 
+BOT_COMMANDS = [
+    BotCommand(command="admin", description="⚙️ Открыть админ-панель"),
+]
+COMMANDS_HASH_KEY = 'bot_commands_hash'
+
+def create_bot() -> Bot:
+    """Создать бота (с локальным Bot API сервером, если задан TELEGRAM_API_URL)"""
+    session = None
+    if Config.TELEGRAM_API_URL:
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+        session = AiohttpSession(api=TelegramAPIServer.from_base(Config.TELEGRAM_API_URL))
+
+    bot = Bot(
+        token=Config.BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    bot.session.middleware(TelegramRequestMetricsMiddleware())
+    return bot
+
+def create_dispatcher(db_service: DatabaseService) -> Dispatcher:
+    """Создать диспетчер с middleware и роутерами"""
+    dp = Dispatcher()
+    dp.update.outer_middleware(CorrelationMiddleware())
+    if Config.UPDATE_RECORD_PATH:
+        from bot.middlewares.recorder import UpdateRecorderMiddleware
+        recorder = UpdateRecorderMiddleware(
+            Config.UPDATE_RECORD_PATH,
+            salt=Config.UPDATE_RECORD_SALT,
+            admin_id=Config.ADMIN_TELEGRAM_ID
+        )
+        dp.update.outer_middleware(recorder)
+        dp.shutdown.register(recorder.close)
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+
+    # Добавление сервисов в диспетчер
+    dp["db"] = db_service
+
+    # Регистрация роутеров (порядок важен!)
+    dp.include_router(report.router)  # WebApp данные должны обрабатываться первыми
+    dp.include_router(admin.router)   # Админ команды должны быть выше универсального обработчика
+    dp.include_router(start.router)
+
+    return dp
+
+async def sync_bot_commands(bot: Bot, db_service: DatabaseService):
+    """Установить команды бота, если они изменились с прошлого запуска"""
+    payload = json.dumps([command.model_dump() for command in BOT_COMMANDS], sort_keys=True, ensure_ascii=False)
+    commands_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    if await db_service.get_setting(COMMANDS_HASH_KEY) == commands_hash:
+        logger.info("Bot commands unchanged, skipping set_my_commands")
+        return
+
+    await bot.set_my_commands(BOT_COMMANDS, BotCommandScopeDefault())
+    await db_service.set_setting(COMMANDS_HASH_KEY, commands_hash)
+    logger.info("Bot commands set successfully")
+
+async def init_database(db_service: DatabaseService, bot: Bot) -> bool:
+    """Инициализировать БД и синхронизировать команды бота (им нужна таблица settings)"""
+    try:
+        await db_service.initialize()
+        logger.info("Database initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        return False
+
+    try:
+        await sync_bot_commands(bot, db_service)
+    except Exception as e:
+        logger.warning(f"Failed to set bot commands: {e}")
+    return True
+
+async def log_bot_info(bot: Bot):
+    """Получение информации о боте"""
+    bot_info = await bot.get_me()
+    logger.info(f"Bot started: @{bot_info.username}")
+    logger.info(f"Bot ID: {bot_info.id}")
+
+async def notify_admin_started(bot: Bot):
+    """Уведомление админа о запуске"""
+    try:
+        await bot.send_message(
+            Config.ADMIN_TELEGRAM_ID,
+            "🚀 Daily Report Bot запущен!"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to notify admin: {e}")
+
 async def main():
     """Основная функция запуска бота"""
 
@@ -31,62 +132,55 @@ async def main():
         logger.error("Please check your .env file and set all required variables")
         return
 
-    # Инициализация бота
-    bot = Bot(
-        token=Config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    # Мониторинг задержки event loop
+    loop_monitor = LoopMonitor(
+        interval=Config.LOOP_MONITOR_INTERVAL,
+        block_threshold=Config.LOOP_BLOCK_THRESHOLD_MS / 1000,
+        capture_stacks=Config.DEBUG
     )
+    await loop_monitor.start()
 
-    # Инициализация диспетчера
-    dp = Dispatcher()
+    # Инициализация бота
+    bot = create_bot()
+    db_service = DatabaseService(Config.DATABASE_PATH, slow_query_ms=Config.SLOW_QUERY_MS,
+                                 archive_dir=Config.ARCHIVE_DIR, replica_path=Config.READ_REPLICA_PATH)
+
+    # Независимые шаги запуска идут параллельно: БД (+ команды бота), getMe, уведомление админа
+    db_ready, bot_info_result, _ = await asyncio.gather(
+        init_database(db_service, bot),
+        log_bot_info(bot),
+        notify_admin_started(bot),
+        return_exceptions=True
+    )
 
-    # Инициализация базы данных
-    db_service = DatabaseService(Config.DATABASE_PATH)
-    try:
-        await db_service.initialize()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+    if db_ready is not True:
+        await loop_monitor.stop()
+        await bot.session.close()
         return
 
-    # Добавление сервисов в диспетчер
-    dp["db"] = db_service
+    if isinstance(bot_info_result, Exception):
+        # Без getMe (неверный токен, нет сети) polling всё равно не запустится
+        logger.error(f"Error during bot execution: {bot_info_result}")
+        await loop_monitor.stop()
+        await bot.session.close()
+        return
 
-    # Регистрация роутеров (порядок важен!)
-    dp.include_router(report.router)  # WebApp данные должны обрабатываться первыми
-    dp.include_router(admin.router)   # Админ команды должны быть выше универсального обработчика
-    dp.include_router(start.router)
+    # Инициализация диспетчера
+    dp = create_dispatcher(db_service)
 
     # Инициализация и запуск планировщика
     scheduler = SchedulerService(bot, db_service)
+    dp["scheduler"] = scheduler  # /timezone и /reminder сразу пересчитывают напоминания
     await scheduler.start()
     logger.info("Scheduler started successfully")
 
-    try:
-        # Получение информации о боте
-        bot_info = await bot.get_me()
-        logger.info(f"Bot started: @{bot_info.username}")
-        logger.info(f"Bot ID: {bot_info.id}")
-
-        # Установка команд бота
-        from aiogram.types import BotCommand, BotCommandScopeDefault
-
-        commands = [
-            BotCommand(command="admin", description="⚙️ Открыть админ-панель"),
-        ]
-
-        await bot.set_my_commands(commands, BotCommandScopeDefault())
-        logger.info("Bot commands set successfully")
-
-        # Уведомление админа о запуске
-        try:
-            await bot.send_message(
-                Config.ADMIN_TELEGRAM_ID,
-                "🚀 Daily Report Bot запущен!"
-            )
-        except Exception as e:
-            logger.warning(f"Failed to notify admin: {e}")
+    # HTTP сервер: API для Mini App и /metrics
+    api_runner = None
+    if Config.WEB_PORT:
+        from api_server import start_api_server
+        api_runner = await start_api_server(db_service, Config.WEB_HOST, Config.WEB_PORT, bot=bot)
 
+    try:
         # Запуск polling
         logger.info("Starting polling...")
         await dp.start_polling(bot)
@@ -98,10 +192,17 @@ async def main():
         await scheduler.stop()
         logger.info("Scheduler stopped")
 
+        # Остановка HTTP сервера
+        if api_runner:
+            await api_runner.cleanup()
+            logger.info("API server stopped")
+
         # Закрытие сессии бота
         await bot.session.close()
         logger.info("Bot session closed")
 
+        await loop_monitor.stop()
+
 if __name__ == "__main__":
     try:
         # Запуск бота
@@ -0,0 +1 @@
+# Middlewares package initialization
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Middleware для привязки correlation ID к каждому обновлению Telegram
+"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from utils.logger import bind_correlation_id, reset_correlation_id
+
+class CorrelationMiddleware(BaseMiddleware):
+    """Выставляет correlation ID вида upd-<update_id> на время обработки обновления"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        token = bind_correlation_id(f"upd-{event.update_id}")
+        try:
+            return await handler(event, data)
+        finally:
+            reset_correlation_id(token)
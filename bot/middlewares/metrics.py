@@ -0,0 +1,85 @@
+"""
+Middleware для сбора метрик обработчиков и запросов к Telegram Bot API
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import REGISTRY
+
+UPDATES_IN_FLIGHT = REGISTRY.gauge(
+    'updates_in_flight', 'Updates currently being processed by the dispatcher'
+)
+UPDATE_SECONDS = REGISTRY.histogram(
+    'update_duration_seconds', 'Full update processing time', ['event_type']
+)
+HANDLER_SECONDS = REGISTRY.histogram(
+    'handler_duration_seconds', 'Handler latency', ['router', 'handler', 'status']
+)
+TELEGRAM_REQUEST_SECONDS = REGISTRY.histogram(
+    'telegram_request_duration_seconds', 'Telegram Bot API request latency', ['method']
+)
+TELEGRAM_REQUEST_ERRORS = REGISTRY.counter(
+    'telegram_request_errors', 'Failed Telegram Bot API requests', ['method', 'error']
+)
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware: время обработки обновления и число обновлений в работе"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        UPDATES_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATES_IN_FLIGHT.dec()
+            UPDATE_SECONDS.observe(time.perf_counter() - started, event_type=event.event_type)
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутренний middleware: латентность каждого обработчика по роутеру и имени функции"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get('handler')
+        router = data.get('event_router')
+        labels = {
+            'router': router.name if router else 'unknown',
+            'handler': getattr(handler_object.callback, '__name__', 'unknown') if handler_object else 'unknown',
+        }
+
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, status=status, **labels)
+
+class TelegramRequestMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: латентность и ошибки запросов к Bot API"""
+
+    async def __call__(self, make_request, bot, method):
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_REQUEST_ERRORS.inc(method=api_method, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=api_method)
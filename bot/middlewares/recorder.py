@@ -0,0 +1,218 @@
+"""
+Middleware для записи входящих обновлений в анонимизированный журнал (JSONL)
+
+Запись нужна для воспроизведения реального трафика в benchmarks.replay.
+Идентификаторы заменяются стабильными псевдонимами (HMAC с солью), имена
+и произвольный текст хешируются; команды, кнопки меню, callback_data,
+числовые поля отчёта из Mini App, его submission_id и report_date
+сохраняются как есть.
+
+Обновление сериализуется в обработчике, а на диск строки уходят пачкой из
+фоновой задачи через executor — event loop не ждёт записи и fsync-ов.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RECORDING_VERSION = 1
+
+# Тексты кнопок, которые можно записывать без изменений
+MENU_TEXTS = {
+    "📊 Отправить отчёт",
+    "📈 Мой статус",
+    "ℹ️ Помощь",
+    "✅ Начать регистрацию",
+    "⚙️ Открыть админ-панель",
+    "Меню",
+}
+
+# Поля отчёта из Mini App; остальное содержимое web_app_data отбрасывается.
+# submission_id и report_date нужны, чтобы воспроизведение доходило до защиты от повторов и поздних отчётов
+REPORT_FIELDS = ('calls_count', 'kp_plus', 'kp', 'rejections', 'inadequate', 'submission_id', 'report_date')
+
+# Буфер записи: сброс на диск раз в FLUSH_SECONDS или при FLUSH_RECORDS строках
+FLUSH_SECONDS = 1.0
+FLUSH_RECORDS = 256
+
+ID_FIELDS = {'id', 'user_id', 'chat_id'}
+NAME_FIELDS = {'first_name', 'last_name', 'username', 'title'}
+# Объекты, в которых 'id' — это Telegram ID пользователя или чата
+ID_OWNERS = {'from', 'from_user', 'chat', 'user', 'sender_chat', 'forward_from', 'via_bot'}
+
+class Anonymizer:
+    """Стабильная замена идентификаторов и персональных данных"""
+
+    def __init__(self, salt: str):
+        self._key = salt.encode('utf-8')
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self._key, value.encode('utf-8'), hashlib.sha256).digest()
+
+    def user_id(self, value: int) -> int:
+        """Псевдоним в диапазоне обычных Telegram ID, знак сохраняется (группы < 0)"""
+        alias = 1_000_000_000 + int.from_bytes(self._digest(str(abs(value)))[:4], 'big') % 1_000_000_000
+        return -alias if value < 0 else alias
+
+    def token(self, value: str, length: int = 8) -> str:
+        return self._digest(value).hex()[:length]
+
+    def text(self, value: str) -> str:
+        """Команды и кнопки остаются, прочий текст заменяется с сохранением числа слов"""
+        if value.startswith('/') or value in MENU_TEXTS:
+            return value
+        words = value.split()
+        return ' '.join(f"Anon{self.token(word, 6)}" for word in words) or value
+
+    def web_app_data(self, value: str) -> str:
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return self.text(value)
+        if not isinstance(data, dict):
+            return '{}'
+        return json.dumps({key: data[key] for key in REPORT_FIELDS if key in data}, ensure_ascii=False)
+
+    def scrub(self, value: Any, owner: Optional[str] = None) -> Any:
+        if isinstance(value, list):
+            return [self.scrub(item, owner) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        result = {}
+        for key, item in value.items():
+            if key in ID_FIELDS and isinstance(item, int) and (key != 'id' or owner in ID_OWNERS):
+                result[key] = self.user_id(item)
+            elif key in NAME_FIELDS and isinstance(item, str):
+                result[key] = f"anon_{self.token(item)}" if key == 'username' else f"Anon{self.token(item)}"
+            elif key in ('text', 'caption') and isinstance(item, str):
+                result[key] = self.text(item)
+            elif key == 'web_app_data' and isinstance(item, dict):
+                result[key] = dict(item, data=self.web_app_data(item.get('data', '')))
+            elif key in ('phone_number', 'contact', 'location'):
+                continue
+            else:
+                result[key] = self.scrub(item, key)
+        return result
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """Дописывает каждое обновление в файл записи (.gz — со сжатием)
+
+    Формат: первая строка {"header": {...}}, далее {"t": unix_time, "u": update}.
+    Обновление ставится в буфер до обработки, ошибки записи не мешают обработке.
+    Без salt соль генерируется один раз и хранится рядом с записью (<path>.salt),
+    чтобы псевдонимы совпадали между перезапусками.
+    """
+
+    def __init__(self, path: str, salt: Optional[str] = None, admin_id: int = 0):
+        self.path = path
+        self.recorded = 0
+        self._buffer: List[str] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._burst: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.anonymizer = Anonymizer(salt or self._stored_salt())
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        opener = gzip.open if path.endswith('.gz') else open
+        # gzip дописывает новый member при каждом открытии — файл остаётся читаемым целиком
+        self._file = opener(path, 'at', encoding='utf-8')
+
+        if is_new:
+            header = {
+                'version': RECORDING_VERSION,
+                'created_at': int(time.time()),
+                'admin_id': self.anonymizer.user_id(admin_id) if admin_id else None,
+            }
+            self._write_lines([self._line({'header': header})])
+
+        logger.info(f"Recording updates to {path}")
+
+    def _stored_salt(self) -> str:
+        """Соль из <path>.salt; при первом запуске создаётся (доступ только владельцу)"""
+        salt_path = self.path + '.salt'
+        try:
+            with open(salt_path) as f:
+                salt = f.read().strip()
+            if salt:
+                return salt
+        except FileNotFoundError:
+            pass
+        salt = secrets.token_hex(16)
+        fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(salt + '\n')
+        logger.warning(f"UPDATE_RECORD_SALT is not set, generated one and saved it to {salt_path}")
+        return salt
+
+    @staticmethod
+    def _line(record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    def _write_lines(self, lines: List[str]):
+        """Блокирующая запись пачки строк; из event loop — только через executor"""
+        self._file.write(''.join(lines))
+        self._file.flush()
+
+    def record(self, event: Update):
+        update = event.model_dump(mode='json', by_alias=True, exclude_none=True)
+        update.pop('update_id', None)
+        self._buffer.append(self._line({'t': round(time.time(), 3), 'u': self.anonymizer.scrub(update)}))
+        self.recorded += 1
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        if len(self._buffer) >= FLUSH_RECORDS and (self._burst is None or self._burst.done()):
+            self._burst = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Записать накопленное; записи идут по одной, чтобы строки не перемешались"""
+        async with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_lines, lines)
+            except Exception as e:
+                logger.warning(f"Failed to write {len(lines)} recorded updates: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(FLUSH_SECONDS)
+            await self.flush()
+
+    async def close(self):
+        """Дописать буфер и закрыть файл (регистрируется на dp.shutdown)"""
+        if self._flusher:
+            self._flusher.cancel()
+        await self.flush()
+        self._file.close()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        try:
+            self.record(event)
+        except Exception as e:
+            logger.warning(f"Failed to record update {event.update_id}: {e}")
+        return await handler(event, data)
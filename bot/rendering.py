@@ -0,0 +1,245 @@
+"""
+Слой отрисовки экранов: кэш текста статуса, пропуск неизменившихся правок
+и разбиение длинных сводок на сообщения
+"""
+
+import hashlib
+import html
+import re
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from bot import keyboards
+from bot.config import Config
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+from utils.timezone import business_now, format_moscow_time
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.types import Message
+    from database.models import User
+    from services.database import DatabaseService
+
+logger = get_logger(__name__)
+
+RENDER_CACHE_ENTRIES = REGISTRY.gauge(
+    'render_cache_entries', 'Entries in rendering caches', ['cache']
+)
+RENDER_CACHE_LOOKUPS = REGISTRY.counter(
+    'render_cache_lookups', 'Rendering cache lookups by result', ['cache', 'result']
+)
+MESSAGE_EDITS_SKIPPED = REGISTRY.counter(
+    'message_edits_skipped', 'edit_message_text calls skipped because the content did not change'
+)
+
+# Лимит текста сообщения Telegram (в UTF-16 единицах, как считает Bot API)
+TELEGRAM_TEXT_LIMIT = 4096
+TELEGRAM_CAPTION_LIMIT = 1024
+
+# Отчёт могут сохранить в другом процессе (api_server.py отдельно) — текст живёт не дольше этого
+STATUS_CACHE_SECONDS = 600
+STATUS_CACHE_SIZE = 4096
+EDIT_HASHES_SIZE = 1024
+
+class StatusCache:
+    """Готовый текст «📈 Мой статус» на пользователя
+
+    Ключ — (бизнес-дата, часовой пояс) пользователя: с новым днём или
+    сменой пояса текст пересчитывается сам. Новый отчёт сбрасывает запись
+    через invalidate().
+    """
+
+    def __init__(self, ttl: float = STATUS_CACHE_SECONDS, max_entries: int = STATUS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, str], float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, telegram_id: int, key: Tuple[str, str]) -> Optional[str]:
+        entry = self._entries.get(telegram_id)
+        if entry and entry[0] == key and time.monotonic() - entry[1] < self.ttl:
+            RENDER_CACHE_LOOKUPS.inc(cache='status', result='hit')
+            return entry[2]
+        RENDER_CACHE_LOOKUPS.inc(cache='status', result='miss')
+        return None
+
+    def put(self, telegram_id: int, key: Tuple[str, str], text: str):
+        self._entries[telegram_id] = (key, time.monotonic(), text)
+        self._entries.move_to_end(telegram_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        self._entries.pop(telegram_id, None)
+
+STATUS_CACHE = StatusCache()
+
+async def render_user_status(user: "User", db: "DatabaseService") -> str:
+    """Текст статуса отчётов сотрудника за сегодня и 7 дней (из кэша, если отчётов не было)"""
+    now = business_now(user.timezone)
+    today = now.strftime('%Y-%m-%d')
+    key = (today, user.timezone or '')
+
+    cached = STATUS_CACHE.get(user.telegram_id, key)
+    if cached is not None:
+        return cached
+
+    # Сегодняшний отчёт, если он есть, — среди последних семи
+    recent_reports = await db.get_user_reports(user.id, limit=7)
+    reports_by_date = {r.report_date: r for r in recent_reports}
+    today_report = reports_by_date.get(today)
+
+    parts = [f"📈 <b>Статус отчётов</b>\n\n👤 <b>{user.full_name}</b>\n\n"]
+
+    if today_report:
+        total_resultative = today_report.kp_plus + today_report.kp
+        conversion = round((total_resultative / today_report.calls_count) * 100, 1) if today_report.calls_count > 0 else 0
+
+        parts.append(
+            f"✅ <b>Отчёт за сегодня отправлен</b>\n"
+            f"🕐 Время: {format_moscow_time(today_report.submitted_at, tz_name=user.timezone)}\n"
+            f"📞 Звонков: {today_report.calls_count}\n"
+            f"🎯 Результативных: {total_resultative} ({conversion}%)\n\n"
+        )
+    else:
+        parts.append("❌ <b>Отчёт за сегодня не отправлен</b>\n\n")
+
+    # Статистика за неделю - только факт отправки
+    parts.append("📅 <b>Отчёты за последние 7 дней:</b>\n")
+    today_date = now.date()
+    for i in range(7):
+        check_date = today_date - timedelta(days=i)
+        display_date = check_date.strftime('%d.%m')
+        if i == 0:
+            display_date += " (сегодня)"
+        elif i == 1:
+            display_date += " (вчера)"
+        mark = "✅" if check_date.strftime('%Y-%m-%d') in reports_by_date else "❌"
+        parts.append(f"{mark} {display_date}\n")
+
+    text = ''.join(parts)
+    STATUS_CACHE.put(user.telegram_id, key, text)
+    return text
+
+# Последняя правка сообщения: (chat_id, message_id) -> (хеш нашего текста, хеш того, что показал Telegram)
+_edit_hashes: "OrderedDict[Tuple[int, int], Tuple[str, str]]" = OrderedDict()
+
+def _content_hash(text: str, reply_markup) -> str:
+    markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup is not None else ''
+    return hashlib.sha1(f"{text}\x00{markup}".encode('utf-8')).hexdigest()
+
+def _shown_hash(message: "Message") -> str:
+    return _content_hash(message.html_text or '', message.reply_markup)
+
+async def edit_if_changed(message: "Message", text: str, reply_markup=None) -> bool:
+    """edit_text, только если текст или клавиатура отличаются от уже показанных
+
+    Правка пропускается, когда новый хеш совпадает с хешем нашей прошлой
+    правки и сообщение с тех пор не меняли другие обработчики (сверяется
+    то, что сейчас показывает Telegram). Ответ «message is not modified»
+    тоже считается пропуском, а не сбоем. Возвращает False при пропуске.
+    """
+    from aiogram.exceptions import TelegramBadRequest
+
+    key = (message.chat.id, message.message_id)
+    digest = _content_hash(text, reply_markup)
+    previous = _edit_hashes.get(key)
+    if previous and previous[0] == digest and previous[1] == _shown_hash(message):
+        MESSAGE_EDITS_SKIPPED.inc()
+        return False
+
+    try:
+        result = await message.edit_text(text, reply_markup=reply_markup)
+        shown = _shown_hash(result) if hasattr(result, 'message_id') else None
+        edited = True
+    except TelegramBadRequest as e:
+        if 'message is not modified' not in str(e):
+            raise
+        MESSAGE_EDITS_SKIPPED.inc()
+        shown = _shown_hash(message)
+        edited = False
+
+    if shown:
+        _edit_hashes[key] = (digest, shown)
+        _edit_hashes.move_to_end(key)
+        while len(_edit_hashes) > EDIT_HASHES_SIZE:
+            _edit_hashes.popitem(last=False)
+    return edited
+
+def text_length(text: str) -> int:
+    """Длина текста так, как её считает Telegram: эмодзи вне BMP занимают две единицы"""
+    return len(text.encode('utf-16-le')) // 2
+
+def split_lines(lines: Iterable[str], limit: int = TELEGRAM_TEXT_LIMIT) -> List[str]:
+    """Склеить строки в сообщения не длиннее limit, разрывая только между строками
+
+    Теги разметки тоже учитываются в длине — с запасом, зато без риска
+    превысить лимит. Строка длиннее лимита (чего в сводках не бывает)
+    режется по символам.
+    """
+    pages: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        length = text_length(line) + 1  # + перевод строки
+        if length - 1 > limit:
+            if current:
+                pages.append('\n'.join(current))
+                current, size = [], 0
+            step = limit // 2  # в UTF-16 символ может занимать две единицы
+            pages.extend(line[i:i + step] for i in range(0, len(line), step))
+            continue
+        if current and size + length > limit:
+            pages.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += length
+    if current:
+        pages.append('\n'.join(current))
+    return [page.strip('\n') or '—' for page in pages] or ['—']
+
+_TAG = re.compile(r'<[^>]+>')
+
+def to_plain_text(lines: Iterable[str]) -> str:
+    """Сводка для файла: без HTML разметки"""
+    return '\n'.join(html.unescape(_TAG.sub('', line)) for line in lines) + '\n'
+
+async def send_long_message(bot: "Bot", chat_id: int, lines: List[str], document_name: str,
+                            head: int = 0, as_file: Optional[bool] = None, **kwargs):
+    """Отправить сводку: несколькими сообщениями или файлом
+
+    По умолчанию (as_file=None) файлом уходит сводка длиннее
+    SUMMARY_FILE_THRESHOLD строк. head — сколько первых строк (заголовок
+    и итоги) показать текстом, когда полный список уходит файлом.
+    Остальные kwargs уходят в последнее сообщение (например, reply_markup).
+    """
+    from aiogram.types import BufferedInputFile
+
+    if as_file is None:
+        as_file = len(lines) > Config.SUMMARY_FILE_THRESHOLD
+    if as_file:
+        document = BufferedInputFile(to_plain_text(lines).encode('utf-8'), filename=document_name)
+        caption = '\n'.join(lines[:head]).strip()
+        if caption and text_length(caption) <= TELEGRAM_CAPTION_LIMIT:
+            await bot.send_document(chat_id, document, caption=caption, **kwargs)
+        else:
+            for page in split_lines(lines[:head]) if caption else []:
+                await bot.send_message(chat_id, page)
+            await bot.send_document(chat_id, document, **kwargs)
+        return
+
+    pages = split_lines(lines)
+    for number, page in enumerate(pages, start=1):
+        await bot.send_message(chat_id, page, **(kwargs if number == len(pages) else {}))
+
+RENDER_CACHE_ENTRIES.set_function(lambda: len(STATUS_CACHE), cache='status')
+RENDER_CACHE_ENTRIES.set_function(lambda: len(_edit_hashes), cache='edit_hashes')
+for _name in ('get_main_menu_keyboard', 'get_admin_user_actions_keyboard', 'get_confirmation_keyboard'):
+    RENDER_CACHE_ENTRIES.set_function(
+        lambda builder=getattr(keyboards, _name): builder.cache_info().currsize, cache=_name[4:]
+    )
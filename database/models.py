@@ -10,6 +10,13 @@ class DatabaseModel:
     async def create_tables(db_path: str):
         """Create all database tables"""
         async with aiosqlite.connect(db_path) as db:
+            # Free pages are returned to the OS by the maintenance job (PRAGMA incremental_vacuum).
+            # Takes effect only for a new file; existing ones switch with manage.py maintenance --vacuum
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # WAL: readers (read-only analytics connections, the backup API) never block the writer
+            # and see a consistent snapshot. Persistent in the file, so existing databases switch here too
+            await db.execute("PRAGMA journal_mode = WAL")
+
             # Users table
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -76,14 +83,127 @@ class DatabaseModel:
                 )
             ''')
 
+            # Append-only log of report submissions; reports holds the latest state of each
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_events'"
+            )
+            has_events = await cursor.fetchone() is not None
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS report_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    report_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    report_date DATE NOT NULL,
+                    calls_count INTEGER NOT NULL,
+                    kp_plus INTEGER NOT NULL,
+                    kp INTEGER NOT NULL,
+                    rejections INTEGER NOT NULL,
+                    inadequate INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Replay walks this index, so events of one report come out together and in order
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_report_events_user_date ON report_events(user_id, report_date)"
+            )
+
+            await DatabaseModel._add_missing_columns(db)
+
+            # Client-generated submission IDs: a repeated ID returns the first result
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS report_submissions (
+                    submission_id TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    event_id INTEGER,
+                    result TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_report_submissions_created ON report_submissions(created_at)"
+            )
+
+            if not has_events:
+                # Databases from before the log: every existing report becomes its first event
+                await db.execute('''
+                    INSERT INTO report_events
+                        (report_id, user_id, report_date, calls_count, kp_plus, kp,
+                         rejections, inadequate, created_at)
+                    SELECT id, user_id, report_date, calls_count, kp_plus, kp,
+                           rejections, inadequate, submitted_at
+                    FROM reports ORDER BY id
+                ''')
+
             await db.commit()
 
+    @staticmethod
+    async def create_archive_tables(db: aiosqlite.Connection, schema: str):
+        """Create reports and report_events in an attached yearly archive database
+
+        Same columns as the hot tables, without foreign keys: users stay in the
+        main database.
+        """
+        await db.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.reports (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                report_date DATE NOT NULL,
+                calls_count INTEGER NOT NULL,
+                kp_plus INTEGER NOT NULL,
+                kp INTEGER NOT NULL,
+                rejections INTEGER NOT NULL,
+                inadequate INTEGER NOT NULL,
+                submitted_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                UNIQUE(user_id, report_date)
+            )
+        ''')
+        await db.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.report_events (
+                id INTEGER PRIMARY KEY,
+                report_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                report_date DATE NOT NULL,
+                calls_count INTEGER NOT NULL,
+                kp_plus INTEGER NOT NULL,
+                kp INTEGER NOT NULL,
+                rejections INTEGER NOT NULL,
+                inadequate INTEGER NOT NULL,
+                created_at TIMESTAMP
+            )
+        ''')
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_report_events_user_date ON report_events(user_id, report_date)"
+        )
+
+    # Колонки, добавленные после первого релиза: (таблица, колонка, определение)
+    ADDED_COLUMNS = [
+        ('users', 'timezone', 'TEXT'),  # NULL = Config.TIMEZONE
+        ('users', 'reminder_time', 'TEXT'),  # HH:MM, NULL = Config.REMINDER_TIME
+        ('users', 'delivery_failures', 'INTEGER DEFAULT 0'),  # consecutive permanent delivery failures
+        ('users', 'last_delivery_error', 'TEXT'),  # "kind: error" of the last failed send
+        ('reports', 'updated_at', 'TIMESTAMP'),  # last resubmission, NULL = never changed
+    ]
+
+    @staticmethod
+    async def _add_missing_columns(db: aiosqlite.Connection):
+        """Bring existing databases up to date with ALTER TABLE ADD COLUMN"""
+        existing: Dict[str, List[str]] = {}
+        for table, column, definition in DatabaseModel.ADDED_COLUMNS:
+            if table not in existing:
+                cursor = await db.execute(f"PRAGMA table_info({table})")
+                existing[table] = [row[1] for row in await cursor.fetchall()]
+            if column not in existing[table]:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                existing[table].append(column)
+
 class User:
     """User model"""
 
     def __init__(self, id: int = None, telegram_id: int = None, full_name: str = None,
                  username: str = None, is_admin: bool = False, is_active: bool = True,
-                 created_at: datetime = None, updated_at: datetime = None):
+                 created_at: datetime = None, updated_at: datetime = None, timezone: str = None,
+                 reminder_time: str = None, delivery_failures: int = 0, last_delivery_error: str = None):
         self.id = id
         self.telegram_id = telegram_id
         self.full_name = full_name
@@ -92,6 +212,10 @@ class User:
         self.is_active = is_active
         self.created_at = created_at
         self.updated_at = updated_at
+        self.timezone = timezone
+        self.reminder_time = reminder_time
+        self.delivery_failures = delivery_failures
+        self.last_delivery_error = last_delivery_error
 
     def to_dict(self) -> Dict:
         """Convert user to dictionary"""
@@ -104,6 +228,10 @@ class User:
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'timezone': self.timezone,
+            'reminder_time': self.reminder_time,
+            'delivery_failures': self.delivery_failures,
+            'last_delivery_error': self.last_delivery_error,
         }
 
     @classmethod
@@ -118,6 +246,10 @@ class User:
             is_active=bool(row['is_active']),
             created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
             updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None,
+            timezone=row['timezone'],
+            reminder_time=row['reminder_time'],
+            delivery_failures=row['delivery_failures'] or 0,
+            last_delivery_error=row['last_delivery_error'],
         )
 
 class Report:
@@ -125,7 +257,8 @@ class Report:
 
     def __init__(self, id: int = None, user_id: int = None, report_date: str = None,
                  calls_count: int = 0, kp_plus: int = 0, kp: int = 0,
-                 rejections: int = 0, inadequate: int = 0, submitted_at: datetime = None):
+                 rejections: int = 0, inadequate: int = 0, submitted_at: datetime = None,
+                 updated_at: datetime = None, duplicate: bool = False):
         self.id = id
         self.user_id = user_id
         self.report_date = report_date
@@ -135,6 +268,9 @@ class Report:
         self.rejections = rejections
         self.inadequate = inadequate
         self.submitted_at = submitted_at
+        self.updated_at = updated_at
+        # Set by create_report when the submission ID was already used; not stored
+        self.duplicate = duplicate
 
     def to_dict(self) -> Dict:
         """Convert report to dictionary"""
@@ -148,6 +284,7 @@ class Report:
             'rejections': self.rejections,
             'inadequate': self.inadequate,
             'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
     @classmethod
@@ -163,6 +300,7 @@ class Report:
             rejections=row['rejections'],
             inadequate=row['inadequate'],
             submitted_at=datetime.fromisoformat(row['submitted_at']) if row['submitted_at'] else None,
+            updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None,
         )
 
 class PendingRegistration:
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Служебные команды Daily Report Bot
+
+    python manage.py rebuild-reports --check    # сверить reports с журналом report_events
+    python manage.py rebuild-reports            # пересобрать reports из журнала
+    python manage.py build-assets               # собрать Mini App из webapp/ в docs/
+    python manage.py build-assets --check       # проверить, что docs/ собран и укладывается в бюджет
+    python manage.py maintenance                # архив старых отчётов, vacuum и статистика (как ночная задача)
+    python manage.py maintenance --vacuum       # один раз для старой базы: перейти на incremental vacuum
+    python manage.py backup                     # горячая копия базы в BACKUP_DIR (бот может работать)
+    python manage.py restore FILE --check       # проверить копию: контрольная сумма и integrity_check
+    python manage.py restore FILE               # восстановить базу из копии (бот остановлен)
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bot.config import Config
+from services import asset_build
+
+async def rebuild_reports(args) -> int:
+    """Пересборка снимка reports из report_events"""
+    from services.database import DatabaseService
+
+    db = DatabaseService(args.db)
+    # Миграции: у старой базы журнал заполняется из текущих отчётов
+    await db.initialize()
+
+    started = time.perf_counter()
+    result = await db.rebuild_reports(dry_run=args.check)
+    if result is None:
+        print("Rebuild failed, see the log", file=sys.stderr)
+        return 1
+
+    elapsed = time.perf_counter() - started
+    action = 'would change' if args.check else 'changed'
+    print(f"{result['events']} events -> {result['reports']} reports in {elapsed:.1f} s: "
+          f"{action} {result['changed']}, {'would remove' if args.check else 'removed'} {result['removed']}")
+    # В режиме --check расхождение — ошибка, чтобы команду можно было ставить в проверки
+    return 1 if args.check and (result['changed'] or result['removed']) else 0
+
+async def maintenance(args) -> int:
+    """Обслуживание базы вручную: то же, что ночная задача планировщика"""
+    from datetime import timedelta
+    from services.database import DatabaseService
+    from utils.timezone import business_now
+
+    db = DatabaseService(args.db, archive_dir=args.archive_dir)
+    await db.initialize()
+
+    if args.retention_days > 0:
+        before = (business_now() - timedelta(days=args.retention_days)).strftime('%Y-%m-%d')
+        moved = await db.archive_reports(before)
+        if moved is None:
+            print("Archiving failed, see the log", file=sys.stderr)
+            return 1
+        print(f"Archived {moved['reports']} reports and {moved['events']} events "
+              f"from {moved['months']} months before {before} into {db.archive_dir}")
+
+    started = time.perf_counter()
+    result = await db.run_maintenance(full_vacuum=args.vacuum)
+    if result is None:
+        print("Maintenance failed, see the log", file=sys.stderr)
+        return 1
+    print(f"auto_vacuum={result['auto_vacuum']}, freed {result['freed_pages']} pages, "
+          f"{result['size_bytes']} bytes, statistics: {result['statistics']} "
+          f"({time.perf_counter() - started:.1f} s)")
+    if result['auto_vacuum'] != 'incremental':
+        print("Free pages are not returned to the OS: run once with --vacuum", file=sys.stderr)
+    return 0
+
+async def backup(args) -> int:
+    """Копия базы сейчас; без --keep хранится столько копий, сколько у ночной задачи"""
+    from services.backup import BackupError, create_backup
+
+    try:
+        path = await asyncio.get_running_loop().run_in_executor(
+            None, create_backup, args.db, args.dir, args.keep
+        )
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{path} ({os.path.getsize(path)} bytes)")
+    return 0
+
+async def restore(args) -> int:
+    """Восстановление: копия проверяется целиком до того, как тронуть базу"""
+    from services.backup import BackupError, restore_backup
+
+    try:
+        previous = await asyncio.get_running_loop().run_in_executor(
+            None, restore_backup, args.backup, args.db, args.check
+        )
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.check:
+        print(f"{args.backup}: checksum and integrity_check ok")
+    else:
+        print(f"Restored {args.db} from {args.backup}" +
+              (f", previous database kept as {previous}" if previous else ""))
+    return 0
+
+async def build_assets(args) -> int:
+    """Сборка Mini App; с --check ничего не пишет и падает на устаревшем docs/ или превышении бюджета"""
+    if args.check:
+        report, stale = asset_build.check(args.source, args.output, args.budget)
+    else:
+        report, stale = asset_build.build(args.source, args.output, args.budget), []
+    print(report.render())
+
+    if stale:
+        print(f"{args.output}/ is out of date with {args.source}/ (run `python manage.py build-assets`):",
+              file=sys.stderr)
+        for name in stale:
+            print(f"  {name}", file=sys.stderr)
+    if report.over_budget:
+        print(f"First paint payload exceeds the budget of {args.budget} bytes", file=sys.stderr)
+    return 1 if stale or report.over_budget else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Daily Report Bot maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = subparsers.add_parser('rebuild-reports', help='rebuild the reports table from report_events')
+    rebuild.add_argument('--db', default=Config.DATABASE_PATH, help='database path (default: DATABASE_PATH)')
+    rebuild.add_argument('--check', action='store_true', help='only report differences, write nothing')
+    rebuild.set_defaults(handler=rebuild_reports)
+
+    maintain = subparsers.add_parser('maintenance', help='archive old reports, vacuum and refresh statistics')
+    maintain.add_argument('--db', default=Config.DATABASE_PATH, help='database path (default: DATABASE_PATH)')
+    maintain.add_argument('--archive-dir', default=Config.ARCHIVE_DIR,
+                          help='yearly archives directory (default: ARCHIVE_DIR or archive/ next to the database)')
+    maintain.add_argument('--retention-days', type=int, default=Config.REPORT_RETENTION_DAYS,
+                          help='archive reports older than this, 0 = keep all (default: REPORT_RETENTION_DAYS)')
+    maintain.add_argument('--vacuum', action='store_true',
+                          help='full VACUUM switching to incremental auto_vacuum; blocks writers while it runs')
+    maintain.set_defaults(handler=maintenance)
+
+    snapshot = subparsers.add_parser('backup', help='online compressed backup of the database')
+    snapshot.add_argument('--db', default=Config.DATABASE_PATH, help='database path (default: DATABASE_PATH)')
+    snapshot.add_argument('--dir', default=Config.BACKUP_DIR, help='backup directory (default: BACKUP_DIR)')
+    snapshot.add_argument('--keep', type=int, default=Config.BACKUP_KEEP,
+                          help='keep this many newest backups (default: BACKUP_KEEP)')
+    snapshot.set_defaults(handler=backup)
+
+    recover = subparsers.add_parser('restore', help='verify a backup and replace the database with it')
+    recover.add_argument('backup', help='backup file (*.db.gz with a .sha256 next to it)')
+    recover.add_argument('--db', default=Config.DATABASE_PATH, help='database path (default: DATABASE_PATH)')
+    recover.add_argument('--check', action='store_true', help='only verify the backup, leave the database as is')
+    recover.set_defaults(handler=restore)
+
+    assets = subparsers.add_parser('build-assets', help='build the Mini App from webapp/ into docs/')
+    assets.add_argument('--source', default='webapp', help='source directory (default: webapp)')
+    assets.add_argument('--output', default='docs', help='output directory (default: docs)')
+    assets.add_argument('--budget', type=int, default=asset_build.FIRST_PAINT_BUDGET,
+                        help=f'first paint payload limit, gzip bytes (default: {asset_build.FIRST_PAINT_BUDGET})')
+    assets.add_argument('--check', action='store_true', help='build to a temp dir and compare with the output')
+    assets.set_defaults(handler=build_assets)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+if __name__ == '__main__':
+    sys.exit(main())
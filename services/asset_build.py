@@ -0,0 +1,324 @@
+"""
+Сборка Mini App: webapp/ — исходники, docs/ — результат для GitHub Pages и WEBAPP_DIR
+
+    python manage.py build-assets            # собрать webapp/ в docs/
+    python manage.py build-assets --check    # собрать во временный каталог и сверить с docs/
+
+Шаги сборки:
+- JS и CSS минифицируются (без внешних зависимостей, консервативно:
+  комментарии и лишние пробелы, переводы строк в JS сохраняются);
+- правила CSS, нужные для первой отрисовки разметки index.html, встраиваются
+  в <style>, полный файл стилей подгружается без блокировки;
+- имена ресурсов получают хеш содержимого (app.js -> app.46ff0f86.js);
+- рядом кладутся сжатые варианты .gz (и .br, если установлен brotli);
+- считается объём первой загрузки: страница и синхронные скрипты в сжатом
+  виде. Превышение бюджета — ошибка, так сборку можно ставить в CI.
+"""
+
+import gzip
+import hashlib
+import re
+import tempfile
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from services.webapp_assets import brotli, fingerprinted
+
+# Бюджет первой загрузки в сжатых байтах (gzip): index.html со встроенным CSS и синхронные скрипты
+FIRST_PAINT_BUDGET = 12 * 1024
+
+# Состояния, которых нет на первой отрисовке
+INTERACTIVE_PSEUDO = re.compile(r':(hover|active|focus|focus-visible|focus-within)\b')
+# Файлы в каталоге сборки, которые сборка не трогает
+KEEP = {'CNAME', '.nojekyll'}
+
+# --- CSS ---
+
+def minify_css(css: str) -> str:
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Пробел после двоеточия в объявлениях не нужен; в селекторах перед ним он значим и остаётся
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+def _css_blocks(css: str) -> List[Tuple[str, str]]:
+    """Верхний уровень минифицированного CSS: [(заголовок, тело)] с учётом вложенных @media"""
+    blocks = []
+    depth = 0
+    start = head_end = 0
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                head_end = i
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:head_end].strip(), css[head_end + 1:i]))
+                start = i + 1
+    return blocks
+
+def _selector_used(selector: str, used: Set[str]) -> bool:
+    if INTERACTIVE_PSEUDO.search(selector):
+        return False
+    names = re.findall(r'[.#][A-Za-z_][\w-]*', selector)
+    return all(name in used for name in names)
+
+def critical_css(css: str, used: Set[str]) -> str:
+    """Правила, которые применимы к разметке страницы сразу при загрузке
+
+    Селектор попадает, если все его классы и id есть в разметке и в нём
+    нет интерактивных псевдоклассов. @keyframes и прочие @-правила кроме
+    @media остаются в полном файле.
+    """
+    parts = []
+    for head, body in _css_blocks(css):
+        if head.startswith('@media'):
+            inner = critical_css(body, used)
+            if inner:
+                parts.append(f"{head}{{{inner}}}")
+        elif head.startswith('@'):
+            continue
+        else:
+            selectors = [s for s in head.split(',') if _selector_used(s, used)]
+            if selectors:
+                parts.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(parts)
+
+class _MarkupNames(HTMLParser):
+    """Классы (.name) и id (#name) из разметки страницы"""
+
+    def __init__(self):
+        super().__init__()
+        self.names: Set[str] = set()
+
+    def handle_starttag(self, tag, attrs):
+        for key, value in attrs:
+            if key == 'class' and value:
+                self.names.update(f".{name}" for name in value.split())
+            elif key == 'id' and value:
+                self.names.add(f"#{value}")
+
+# --- JS ---
+
+_WORD = re.compile(r'[\w$]')
+# После этих символов и слов «/» начинает регулярное выражение, а не деление
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield', 'await'}
+
+def minify_js(source: str) -> str:
+    """Убрать комментарии, отступы и лишние пробелы; строки, шаблоны и регулярки не трогаются
+
+    Переводы строк сохраняются (по одному), чтобы не зависеть от
+    автоматической расстановки точек с запятой.
+    """
+    out: List[str] = []
+    i, n = 0, len(source)
+    pending_space = pending_newline = False
+
+    def emit(token: str):
+        nonlocal pending_space, pending_newline
+        if out:
+            last = out[-1][-1]
+            if pending_newline and last != '\n':
+                out.append('\n')
+            elif pending_space and (
+                (_WORD.match(last) and _WORD.match(token[0]))
+                or (last in '+-' and token[0] == last)
+            ):
+                out.append(' ')
+        pending_space = pending_newline = False
+        out.append(token)
+
+    def regex_allowed() -> bool:
+        if not out:
+            return True
+        last = out[-1]
+        return last[-1] in _REGEX_PREFIX or last in _REGEX_KEYWORDS
+
+    while i < n:
+        char = source[i]
+        if char in ' \t\r':
+            pending_space = True
+            i += 1
+        elif char == '\n':
+            pending_newline = True
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+        elif char in '"\'`' or (char == '/' and regex_allowed()):
+            # Строка, шаблон или регулярное выражение — копируется как есть
+            j = i + 1
+            in_class = False
+            while j < n:
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if char == '/' and source[j] == '[':
+                    in_class = True
+                elif char == '/' and source[j] == ']':
+                    in_class = False
+                elif source[j] == char and not in_class:
+                    break
+                j += 1
+            if char == '/':
+                j += 1
+                while j < n and source[j].isalpha():
+                    j += 1
+            else:
+                j += 1
+            emit(source[i:j])
+            i = j
+        else:
+            j = i + 1
+            if _WORD.match(char):
+                while j < n and _WORD.match(source[j]):
+                    j += 1
+            emit(source[i:j])
+            i = j
+    return ''.join(out).strip() + '\n'
+
+# --- Сборка ---
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+class BuildReport:
+    """Размеры собранных файлов и бюджет первой загрузки"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.rows: List[Tuple[str, int, int, int]] = []  # имя, исходник, результат, gzip
+        self.first_paint = 0
+
+    @property
+    def over_budget(self) -> bool:
+        return self.first_paint > self.budget
+
+    def add(self, name: str, source: int, output: int, gzipped: int, first_paint: bool):
+        self.rows.append((name, source, output, gzipped))
+        if first_paint:
+            self.first_paint += gzipped
+
+    def render(self) -> str:
+        lines = [f"{'file':<32} {'source':>8} {'built':>8} {'gzip':>8}"]
+        for name, source, output, gzipped in self.rows:
+            lines.append(f"{name:<32} {source:>8} {output:>8} {gzipped:>8}")
+        status = 'OVER BUDGET' if self.over_budget else 'ok'
+        lines.append(f"first paint (gzip): {self.first_paint} / {self.budget} bytes — {status}")
+        return '\n'.join(lines)
+
+def build(source_dir: str, output_dir: str, budget: int = FIRST_PAINT_BUDGET) -> BuildReport:
+    """Собрать source_dir в output_dir; файлы, которых нет в результате, из output_dir удаляются"""
+    source, output = Path(source_dir), Path(output_dir)
+    report = BuildReport(budget)
+    files: Dict[str, bytes] = {}
+    renames: Dict[str, str] = {}
+    full_css = ''
+
+    for path in sorted(p for p in source.rglob('*') if p.is_file() and not p.name.startswith('.')):
+        name = path.relative_to(source).as_posix()
+        if path.suffix == '.html':
+            continue
+        raw = path.read_bytes()
+        if path.suffix == '.css':
+            css = minify_css(raw.decode('utf-8'))
+            full_css += css
+            built = css.encode('utf-8')
+        elif path.suffix == '.js':
+            built = minify_js(raw.decode('utf-8')).encode('utf-8')
+        else:
+            built = raw
+        hashed = fingerprinted(name, hashlib.sha256(built).hexdigest())
+        renames[name] = hashed
+        files[hashed] = built
+        report.add(hashed, len(raw), len(built), len(_compress(built)['.gz']), first_paint=False)
+
+    for path in sorted(source.rglob('*.html')):
+        name = path.relative_to(source).as_posix()
+        raw = path.read_bytes()
+        html = raw.decode('utf-8')
+        parser = _MarkupNames()
+        parser.feed(html)
+
+        for original, hashed in renames.items():
+            if original.endswith('.css'):
+                link = re.compile(rf'<link rel="stylesheet" href="(?:\./)?{re.escape(original)}">')
+                html = link.sub(
+                    f'<style>{critical_css(full_css, parser.names)}</style>\n'
+                    f'    <link rel="preload" href="{hashed}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+                    f'    <noscript><link rel="stylesheet" href="{hashed}"></noscript>',
+                    html
+                )
+            else:
+                html = re.sub(rf'"(?:\./)?{re.escape(original)}"', f'"{hashed}"', html)
+        # Отступы и комментарии разметки
+        html = re.sub(r'<!--(?!\[).*?-->', '', html, flags=re.S)
+        html = re.sub(r'\n\s*', '\n', html).strip() + '\n'
+        built = html.encode('utf-8')
+        files[name] = built
+        report.add(name, len(raw), len(built), len(_compress(built)['.gz']), first_paint=True)
+
+        # Синхронные скрипты со страницы тоже нужны до того, как форма заработает
+        for script in re.findall(r'<script src="([^"]+)"></script>', html):
+            if script in files:
+                report.first_paint += len(_compress(files[script])['.gz'])
+
+    _write_tree(output, files)
+    return report
+
+def _write_tree(output: Path, files: Dict[str, bytes]):
+    expected: Set[str] = set()
+    for name, data in files.items():
+        expected.add(name)
+        target = output / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists() or target.read_bytes() != data:
+            target.write_bytes(data)
+        for suffix, compressed in _compress(data).items():
+            expected.add(name + suffix)
+            variant = output / (name + suffix)
+            if not variant.exists() or variant.read_bytes() != compressed:
+                variant.write_bytes(compressed)
+
+    for path in sorted(output.rglob('*'), reverse=True):
+        name = path.relative_to(output).as_posix()
+        if path.is_file() and name not in expected and path.name not in KEEP:
+            path.unlink()
+        elif path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+def differences(built_dir: str, target_dir: str) -> List[str]:
+    """Файлы, которыми target_dir отличается от свежей сборки built_dir"""
+    built, target = Path(built_dir), Path(target_dir)
+
+    def listing(root: Path) -> Dict[str, bytes]:
+        return {
+            p.relative_to(root).as_posix(): p.read_bytes()
+            for p in root.rglob('*')
+            # .br без пакета brotli не собрать — такие файлы не сверяются
+            if p.is_file() and p.name not in KEEP and (brotli is not None or p.suffix != '.br')
+        }
+
+    expected, actual = listing(built), listing(target)
+    return sorted(
+        name for name in expected.keys() | actual.keys()
+        if expected.get(name) != actual.get(name)
+    )
+
+def check(source_dir: str, output_dir: str, budget: int = FIRST_PAINT_BUDGET) -> Tuple[BuildReport, List[str]]:
+    """Собрать во временный каталог: (отчёт, файлы docs/, устаревшие относительно webapp/)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        report = build(source_dir, tmp, budget)
+        return report, differences(tmp, output_dir)
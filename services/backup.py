@@ -0,0 +1,246 @@
+"""
+Горячие резервные копии базы через SQLite backup API
+
+Копия снимается, пока бот работает: страницы переносятся шагами по
+BACKUP_STEP_PAGES с паузой между шагами, поэтому писатели ждут не дольше
+одного шага. Готовая копия проверяется (PRAGMA integrity_check), сжимается
+gzip, рядом кладётся контрольная сумма в формате sha256sum. Хранятся
+последние BACKUP_KEEP копий.
+
+    python manage.py backup                               # снять копию сейчас
+    python manage.py restore backups/<файл>.db.gz --check # только проверить копию
+    python manage.py restore backups/<файл>.db.gz         # восстановить (бот остановлен)
+
+Тем же способом обновляется реплика для чтения (READ_REPLICA_PATH):
+несжатая копия, которую DatabaseService открывает только на чтение для
+сводок и статистики.
+
+Функции блокирующие: из event loop их вызывают через run_in_executor.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+BACKUP_SECONDS = REGISTRY.histogram(
+    'backup_duration_seconds', 'Online database backup run time'
+)
+BACKUPS = REGISTRY.counter(
+    'backups', 'Database backups by result', ['result']
+)
+BACKUP_LAST_SUCCESS = REGISTRY.gauge(
+    'backup_last_success_timestamp_seconds', 'Unix time of the last successful backup'
+)
+BACKUP_SIZE_BYTES = REGISTRY.gauge(
+    'backup_size_bytes', 'Compressed size of the last backup'
+)
+REPLICA_REFRESH_SECONDS = REGISTRY.histogram(
+    'replica_refresh_duration_seconds', 'Read replica refresh run time'
+)
+
+# Шаг копирования: 256 страниц (1 МиБ при странице 4 КиБ), между шагами база свободна для записи
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.05
+
+PREFIX = 'dailyreport-'
+SUFFIX = '.db.gz'
+CHUNK = 1024 * 1024
+
+class BackupError(Exception):
+    """Копия не снята или не прошла проверку"""
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _copy(db_path: str, target: str):
+    """Постраничная копия работающей базы в target; копия в режиме DELETE, без -wal рядом"""
+    # mode=rw: отсутствующую базу не создавать пустой
+    source = sqlite3.connect(f"file:{db_path}?mode=rw", uri=True)
+    dest = sqlite3.connect(target)
+    try:
+        source.backup(dest, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP)
+        dest.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dest.close()
+        source.close()
+
+def _temp_file(directory: str, prefix: str, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=directory)
+    os.close(fd)
+    return path
+
+def integrity_check(db_path: str) -> str:
+    """'ok' или первое найденное повреждение"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check(1)").fetchone()[0]
+    finally:
+        conn.close()
+
+def list_backups(backup_dir: str) -> List[str]:
+    """Копии в каталоге, от новых к старым (имя содержит время снятия)"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [name for name in os.listdir(backup_dir) if name.startswith(PREFIX) and name.endswith(SUFFIX)]
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+def create_backup(db_path: str, backup_dir: str, keep: int) -> str:
+    """Снять копию работающей базы; путь к .db.gz. BackupError — копия не годится"""
+    started = time.perf_counter()
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    target = os.path.join(backup_dir, f"{PREFIX}{stamp}{SUFFIX}")
+    # Уникальные временные файлы: ручной backup и задача планировщика могут совпасть по секунде
+    raw = _temp_file(backup_dir, f".{PREFIX}{stamp}.", '.db.tmp')
+    partial = _temp_file(backup_dir, f".{PREFIX}{stamp}.", '.gz.tmp')
+
+    try:
+        _copy(db_path, raw)
+        result = integrity_check(raw)
+        if result != 'ok':
+            raise BackupError(f"Backup of {db_path} failed integrity check: {result}")
+
+        with open(raw, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, CHUNK)
+        checksum = sha256_file(partial)
+        try:
+            # link не перезаписывает: копия, снятая в ту же секунду другим процессом, остаётся целой со своей суммой
+            os.link(partial, target)
+        except FileExistsError:
+            logger.info(f"Backup {target} was just taken by another run, keeping it")
+            return target
+        with open(target + '.sha256', 'w') as f:
+            f.write(f"{checksum}  {os.path.basename(target)}\n")
+    except (sqlite3.Error, OSError) as e:
+        BACKUPS.inc(result='failure')
+        raise BackupError(f"Backup of {db_path} failed: {e}") from e
+    except BackupError:
+        BACKUPS.inc(result='failure')
+        raise
+    finally:
+        for leftover in (raw, partial):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(target)
+    BACKUPS.inc(result='success')
+    BACKUP_SECONDS.observe(elapsed)
+    BACKUP_LAST_SUCCESS.set(time.time())
+    BACKUP_SIZE_BYTES.set(size)
+    logger.info(f"Backup {target}: {size} bytes in {elapsed:.1f} s")
+
+    rotate(backup_dir, keep)
+    return target
+
+def rotate(backup_dir: str, keep: int) -> List[str]:
+    """Удалить копии сверх последних keep; список удалённых"""
+    removed = []
+    for path in list_backups(backup_dir)[max(keep, 1):]:
+        for name in (path, path + '.sha256'):
+            if os.path.exists(name):
+                os.remove(name)
+        removed.append(path)
+    if removed:
+        logger.info(f"Removed {len(removed)} old backups from {backup_dir}")
+    return removed
+
+def refresh_replica(db_path: str, replica_path: str) -> str:
+    """Обновить реплику для чтения: копия рядом и атомарная подмена
+
+    Читатели, открывшие прежнюю реплику, дочитывают её; следующие
+    соединения откроют новый файл.
+    """
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(replica_path))
+    os.makedirs(directory, exist_ok=True)
+    partial = f"{replica_path}.{os.getpid()}.tmp"
+    try:
+        _copy(db_path, partial)
+        os.replace(partial, replica_path)
+    except (sqlite3.Error, OSError) as e:
+        raise BackupError(f"Replica refresh of {replica_path} failed: {e}") from e
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    elapsed = time.perf_counter() - started
+    REPLICA_REFRESH_SECONDS.observe(elapsed)
+    logger.debug(f"Read replica {replica_path} refreshed in {elapsed:.2f} s")
+    return replica_path
+
+def verify_backup(path: str) -> Optional[str]:
+    """Сверить контрольную сумму копии; None — всё в порядке, иначе причина"""
+    checksum_file = path + '.sha256'
+    if not os.path.exists(path):
+        return f"{path} not found"
+    if not os.path.exists(checksum_file):
+        return f"{checksum_file} not found"
+    with open(checksum_file) as f:
+        expected = f.read().split()[0]
+    if sha256_file(path) != expected:
+        return f"{path} does not match its checksum"
+    return None
+
+def restore_backup(path: str, db_path: str, check_only: bool = False) -> Optional[str]:
+    """Проверить копию и подменить ею базу; путь, куда отложена прежняя база
+
+    Порядок: контрольная сумма, распаковка рядом с базой, integrity_check
+    распакованного файла, и только потом замена. Прежний файл вместе с
+    -wal/-shm переименовывается в *.before-restore-<время>: каждое
+    восстановление откладывает свою копию, а старый -wal не достанется
+    новой базе. Бот на время восстановления должен быть остановлен.
+    С check_only база не меняется.
+    """
+    problem = verify_backup(path)
+    if problem:
+        raise BackupError(problem)
+
+    restored = _temp_file(os.path.dirname(os.path.abspath(db_path)), f"{os.path.basename(db_path)}.", '.restore.tmp')
+    try:
+        with gzip.open(path, 'rb') as src, open(restored, 'wb') as dst:
+            shutil.copyfileobj(src, dst, CHUNK)
+        result = integrity_check(restored)
+        if result != 'ok':
+            raise BackupError(f"{path} failed integrity check: {result}")
+        if check_only:
+            return None
+
+        # -wal/-shm убираются и без основного файла: чужой журнал применился бы к восстановленной базе
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        previous = f"{db_path}.before-restore-{stamp}"
+        attempt = 1
+        while any(os.path.exists(previous + suffix) for suffix in ('', '-wal', '-shm')):
+            attempt += 1
+            previous = f"{db_path}.before-restore-{stamp}-{attempt}"
+        moved = False
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.replace(db_path + suffix, previous + suffix)
+                moved = moved or suffix == ''
+        previous = previous if moved else None
+        if previous:
+            # mkstemp создаёт файл с правами 0600 — возвращаем права прежней базы
+            shutil.copymode(previous, restored)
+        os.replace(restored, db_path)
+        logger.info(f"Restored {db_path} from {path}" + (f", previous file kept as {previous}" if previous else ""))
+        return previous
+    except (OSError, EOFError, sqlite3.Error) as e:
+        raise BackupError(f"Cannot restore from {path}: {e}") from e
+    finally:
+        if os.path.exists(restored):
+            os.remove(restored)
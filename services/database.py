@@ -1,17 +1,131 @@
+import functools
+import glob
+import json
+import os
+import time
 import aiosqlite
+from contextlib import asynccontextmanager
 from datetime import date, datetime
-from typing import Optional, List, Dict
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+from bot.config import Config
 from database.models import User, Report, PendingRegistration, BlockedUser, DatabaseModel
 from utils.logger import get_logger
+from utils.metrics import REGISTRY
+from services.query_log import QueryStats, TimedConnection
 
 logger = get_logger(__name__)
 
+DB_METHOD_SECONDS = REGISTRY.histogram(
+    'db_method_duration_seconds', 'DatabaseService method latency', ['method']
+)
+
+def observed(func):
+    """Record latency of a DatabaseService method"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_METHOD_SECONDS.observe(time.perf_counter() - started, method=func.__name__)
+    return wrapper
+
+# Query statistics since startup (shared by all DatabaseService instances)
+QUERY_STATS = QueryStats()
+
+# Max telegram_ids in one IN (...) clause; older SQLite builds allow only 999 variables
+ID_CHUNK = 500
+
+# Columns of the reports snapshot that rebuild_reports compares and rewrites
+REPORT_COLUMNS = ('id, user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate, '
+                  'submitted_at, updated_at')
+EVENT_COLUMNS = ('id, report_id, user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate, '
+                 'created_at')
+
+# Reports as replayed from report_events: the last event of each (user_id, report_date) gives the values
+REBUILT_REPORTS = """SELECT l.report_id AS id, l.user_id, l.report_date, l.calls_count, l.kp_plus, l.kp,
+                            l.rejections, l.inadequate, f.created_at AS submitted_at,
+                            CASE WHEN g.first_id <> g.last_id THEN l.created_at END AS updated_at
+                     FROM (SELECT MIN(id) AS first_id, MAX(id) AS last_id
+                           FROM report_events GROUP BY user_id, report_date) g
+                     JOIN report_events f ON f.id = g.first_id
+                     JOIN report_events l ON l.id = g.last_id"""
+
+# Pages released per incremental_vacuum step; the write lock is dropped between steps
+VACUUM_STEP_PAGES = 1000
+
+# The read replica counts as stale after this many missed scheduler refreshes
+REPLICA_MISSED_REFRESHES = 3
+
+DB_SIZE_BYTES = REGISTRY.gauge(
+    'db_size_bytes', 'Database file size after the last maintenance run', ['db']
+)
+
 class DatabaseService:
     """Database service for managing users and reports"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, slow_query_ms: float = None, archive_dir: str = None,
+                 replica_path: str = None, replica_max_age: float = None):
         self.db_path = db_path
+        # Read-only copy refreshed by the scheduler (services.backup.refresh_replica); used by replica=True reads.
+        # After a few missed refreshes the replica is considered stale and reads go to the primary
+        self.replica_path = replica_path
+        self.replica_max_age = (replica_max_age if replica_max_age is not None
+                                else REPLICA_MISSED_REFRESHES * Config.READ_REPLICA_REFRESH_MINUTES * 60)
+        # Yearly archives of old reports: <archive_dir>/reports-YYYY.db, next to the database by default
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+        self.query_stats = QUERY_STATS
+        # Per instance: statistics are shared, the slow-query threshold is not
+        self.slow_query_ms = slow_query_ms if slow_query_ms is not None else QUERY_STATS.slow_threshold_ms
+
+    @asynccontextmanager
+    async def _connect(self, read_only: bool = False, replica: bool = False):
+        """Open connection with per-query timing and slow-query logging
+
+        read_only opens the file with mode=ro and PRAGMA query_only, so a long
+        scan can never take the write lock; in WAL mode it reads a consistent
+        snapshot without blocking the writer. replica additionally reads the
+        replica file when one is configured and fresh, keeping the scan off
+        the primary's disk entirely.
+        """
+        if read_only or replica:
+            path = (replica and self._fresh_replica()) or self.db_path
+            connection = aiosqlite.connect(f"{Path(path).absolute().as_uri()}?mode=ro", uri=True)
+        else:
+            connection = aiosqlite.connect(self.db_path)
+
+        async with connection as db:
+            if read_only or replica:
+                await db.execute("PRAGMA query_only = ON")
+            timed = TimedConnection(db, self.query_stats, self.slow_query_ms)
+            try:
+                yield timed
+            finally:
+                await timed.finish()
+
+    def _fresh_replica(self) -> Optional[str]:
+        """Replica path if it exists and was refreshed within replica_max_age seconds"""
+        if not self.replica_path:
+            return None
+        try:
+            age = time.time() - os.path.getmtime(self.replica_path)
+        except OSError:
+            return None
+        if self.replica_max_age and age > self.replica_max_age:
+            logger.warning(f"Read replica {self.replica_path} is {age:.0f} s old, reading the primary")
+            return None
+        return self.replica_path
+
+    def archive_path(self, year: str) -> str:
+        return os.path.join(self.archive_dir, f"reports-{year}.db")
+
+    def archive_years(self) -> List[str]:
+        """Years that have an archive file, newest first"""
+        paths = glob.glob(os.path.join(self.archive_dir, 'reports-[0-9][0-9][0-9][0-9].db'))
+        return sorted((os.path.basename(path)[8:12] for path in paths), reverse=True)
 
+    @observed
     async def initialize(self):
         """Initialize database and create tables"""
         try:
@@ -22,10 +136,11 @@ class DatabaseService:
             raise
 
     # User operations
+    @observed
     async def create_user(self, telegram_id: int, full_name: str, username: str = None) -> Optional[User]:
         """Create new user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     """INSERT INTO users (telegram_id, full_name, username)
@@ -50,10 +165,11 @@ class DatabaseService:
             logger.error(f"Failed to create user {telegram_id}: {e}")
             return None
 
+    @observed
     async def get_user(self, telegram_id: int) -> Optional[User]:
         """Get user by telegram_id"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)
@@ -68,10 +184,11 @@ class DatabaseService:
             logger.error(f"Failed to get user {telegram_id}: {e}")
             return None
 
-    async def get_all_users(self, active_only: bool = True) -> List[User]:
-        """Get all users"""
+    @observed
+    async def get_all_users(self, active_only: bool = True, replica: bool = False) -> List[User]:
+        """Get all users (read-only connection; replica=True may read the read replica)"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect(read_only=True, replica=replica) as db:
                 db.row_factory = aiosqlite.Row
                 query = "SELECT * FROM users"
                 params = ()
@@ -90,6 +207,7 @@ class DatabaseService:
             logger.error(f"Failed to get all users: {e}")
             return []
 
+    @observed
     async def update_user(self, telegram_id: int, **kwargs) -> bool:
         """Update user data"""
         try:
@@ -99,7 +217,7 @@ class DatabaseService:
             set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
             values = list(kwargs.values()) + [telegram_id]
 
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 await db.execute(
                     f"UPDATE users SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE telegram_id = ?",
                     values
@@ -112,20 +230,119 @@ class DatabaseService:
             logger.error(f"Failed to update user {telegram_id}: {e}")
             return False
 
+    @observed
+    async def get_reminder_preferences(self) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """(telegram_id, timezone, reminder_time) of active users; None means the Config default"""
+        try:
+            async with self._connect() as db:
+                cursor = await db.execute(
+                    "SELECT telegram_id, timezone, reminder_time FROM users WHERE is_active = 1"
+                )
+                rows = await cursor.fetchall()
+                return [(row[0], row[1], row[2]) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Failed to get reminder preferences: {e}")
+            return []
+
+    @observed
+    async def record_delivery_failure(self, telegram_id: int, kind: str, error: str,
+                                      permanent: bool, deactivate_after: int) -> bool:
+        """Store a failed send; True if this permanent failure deactivated the user
+
+        Only permanent failures (bot blocked, chat gone) count towards
+        deactivation; transient ones just update last_delivery_error.
+        """
+        try:
+            last_error = f"{kind}: {error}"[:500]
+            async with self._connect() as db:
+                if not permanent:
+                    await db.execute(
+                        "UPDATE users SET last_delivery_error = ? WHERE telegram_id = ?",
+                        (last_error, telegram_id)
+                    )
+                    await db.commit()
+                    return False
+
+                cursor = await db.execute(
+                    """
+                    UPDATE users SET
+                        delivery_failures = COALESCE(delivery_failures, 0) + 1,
+                        last_delivery_error = ?,
+                        is_active = CASE WHEN COALESCE(delivery_failures, 0) + 1 >= ? THEN 0 ELSE is_active END,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE telegram_id = ? AND is_active = 1
+                    """,
+                    (last_error, deactivate_after, telegram_id)
+                )
+                counted = cursor.rowcount > 0
+                cursor = await db.execute("SELECT is_active FROM users WHERE telegram_id = ?", (telegram_id,))
+                row = await cursor.fetchone()
+                await db.commit()
+                # Active before this UPDATE and inactive after it: this call deactivated the user
+                return counted and row is not None and not row[0]
+
+        except Exception as e:
+            logger.error(f"Failed to record delivery failure for {telegram_id}: {e}")
+            return False
+
+    @observed
+    async def reset_delivery_failures(self, telegram_id: int) -> bool:
+        """Clear the failure counter after a successful send"""
+        try:
+            async with self._connect() as db:
+                await db.execute(
+                    """
+                    UPDATE users SET delivery_failures = 0, last_delivery_error = NULL
+                    WHERE telegram_id = ? AND (delivery_failures > 0 OR last_delivery_error IS NOT NULL)
+                    """,
+                    (telegram_id,)
+                )
+                await db.commit()
+                return True
+
+        except Exception as e:
+            logger.error(f"Failed to reset delivery failures for {telegram_id}: {e}")
+            return False
+
     # Report operations
+    @observed
     async def create_report(self, user_id: int, report_date: str, calls_count: int,
-                          kp_plus: int, kp: int, rejections: int, inadequate: int) -> Optional[Report]:
-        """Create new report"""
+                          kp_plus: int, kp: int, rejections: int, inadequate: int,
+                          submission_id: str = None) -> Optional[Report]:
+        """Create or update the report for the date and append the submission to report_events.
+
+        An existing report keeps its id and submitted_at; the snapshot row and
+        its event are committed together. With a submission_id that was
+        already used, nothing is written and the report as it was first
+        submitted is returned with duplicate=True.
+        """
+        values = (calls_count, kp_plus, kp, rejections, inadequate)
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
-                cursor = await db.execute(
-                    """INSERT OR REPLACE INTO reports
+                if submission_id:
+                    cursor = await db.execute(
+                        "INSERT OR IGNORE INTO report_submissions (submission_id, user_id) VALUES (?, ?)",
+                        (submission_id, user_id)
+                    )
+                    if cursor.rowcount == 0:
+                        await db.rollback()
+                        return await self._submitted_report(db, submission_id, user_id)
+
+                await db.execute(
+                    """INSERT INTO reports
                        (user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(user_id, report_date) DO UPDATE SET
+                           calls_count = excluded.calls_count,
+                           kp_plus = excluded.kp_plus,
+                           kp = excluded.kp,
+                           rejections = excluded.rejections,
+                           inadequate = excluded.inadequate,
+                           updated_at = CURRENT_TIMESTAMP""",
+                    (user_id, report_date) + values
                 )
-                await db.commit()
 
                 # Get created/updated report
                 report_row = await db.execute(
@@ -133,21 +350,106 @@ class DatabaseService:
                     (user_id, report_date)
                 )
                 row = await report_row.fetchone()
+                if not row:
+                    await db.rollback()
+                    return None
 
-                if row:
-                    report = Report.from_row(row)
-                    logger.info(f"Created/updated report for user {user_id} on {report_date}")
-                    return report
-                return None
+                cursor = await db.execute(
+                    """INSERT INTO report_events
+                       (report_id, user_id, report_date, calls_count, kp_plus, kp, rejections, inadequate,
+                        created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                    (row['id'], user_id, report_date) + values + (row['updated_at'] or row['submitted_at'],)
+                )
+                if submission_id:
+                    await db.execute(
+                        "UPDATE report_submissions SET event_id = ? WHERE submission_id = ?",
+                        (cursor.lastrowid, submission_id)
+                    )
+                await db.commit()
+
+                report = Report.from_row(row)
+                logger.info(f"Created/updated report for user {user_id} on {report_date}")
+                return report
 
         except Exception as e:
             logger.error(f"Failed to create report for user {user_id}: {e}")
             return None
 
+    async def _submitted_report(self, db, submission_id: str, user_id: int) -> Optional[Report]:
+        """The report as written by an earlier submission with this ID"""
+        cursor = await db.execute(
+            """SELECT e.report_id AS id, e.user_id, e.report_date, e.calls_count, e.kp_plus, e.kp,
+                      e.rejections, e.inadequate, COALESCE(r.submitted_at, e.created_at) AS submitted_at,
+                      NULL AS updated_at, s.user_id AS owner_id
+               FROM report_submissions s
+               JOIN report_events e ON e.id = s.event_id
+               LEFT JOIN reports r ON r.id = e.report_id
+               WHERE s.submission_id = ?""",
+            (submission_id,)
+        )
+        row = await cursor.fetchone()
+        if not row or row['owner_id'] != user_id:
+            logger.warning(f"Submission {submission_id} belongs to another user or has no report")
+            return None
+
+        logger.info(f"Duplicate submission {submission_id} for user {user_id} ignored")
+        report = Report.from_row(row)
+        report.duplicate = True
+        return report
+
+    @observed
+    async def get_submission_result(self, submission_id: str) -> Optional[Dict]:
+        """Outcome stored by save_submission_result (e.g. {'sheets': True})"""
+        try:
+            async with self._connect() as db:
+                cursor = await db.execute(
+                    "SELECT result FROM report_submissions WHERE submission_id = ?", (submission_id,)
+                )
+                row = await cursor.fetchone()
+                return json.loads(row[0]) if row and row[0] else None
+
+        except Exception as e:
+            logger.error(f"Failed to get submission result {submission_id}: {e}")
+            return None
+
+    @observed
+    async def save_submission_result(self, submission_id: str, result: Dict) -> bool:
+        """Store the outcome of the export/notification steps for repeats of the submission"""
+        try:
+            async with self._connect() as db:
+                await db.execute(
+                    "UPDATE report_submissions SET result = ? WHERE submission_id = ?",
+                    (json.dumps(result), submission_id)
+                )
+                await db.commit()
+                return True
+
+        except Exception as e:
+            logger.error(f"Failed to save submission result {submission_id}: {e}")
+            return False
+
+    @observed
+    async def purge_submissions(self, retention_hours: int) -> int:
+        """Forget submission IDs older than the retention window; returns the number removed"""
+        try:
+            async with self._connect() as db:
+                cursor = await db.execute(
+                    "DELETE FROM report_submissions WHERE created_at < datetime('now', ?)",
+                    (f"-{retention_hours} hours",)
+                )
+                await db.commit()
+                return cursor.rowcount
+
+        except Exception as e:
+            logger.error(f"Failed to purge submissions: {e}")
+            return 0
+
+    @observed
     async def get_report(self, user_id: int, report_date: str) -> Optional[Report]:
         """Get specific report"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM reports WHERE user_id = ? AND report_date = ?",
@@ -163,10 +465,11 @@ class DatabaseService:
             logger.error(f"Failed to get report for user {user_id} on {report_date}: {e}")
             return None
 
+    @observed
     async def get_user_reports(self, user_id: int, limit: int = 10) -> List[Report]:
         """Get user's recent reports"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM reports WHERE user_id = ? ORDER BY report_date DESC LIMIT ?",
@@ -180,10 +483,56 @@ class DatabaseService:
             logger.error(f"Failed to get reports for user {user_id}: {e}")
             return []
 
-    async def get_daily_reports(self, report_date: str) -> List[Dict]:
-        """Get all reports for specific date with user names"""
+    @observed
+    async def get_report_history(self, user_id: int, since: str,
+                                 until: str) -> Optional[Tuple[List[Report], Optional[str]]]:
+        """User's reports with since <= report_date < until (newest first) and the keyset of the previous page
+
+        The second value is the newest report_date before since, or None when
+        there are no older reports; both queries are range scans of the
+        UNIQUE(user_id, report_date) index. Yearly archives are attached only
+        when the range or the keyset reaches past the hot table. None on
+        failure, so callers do not cache an empty page.
+        """
+        page = "SELECT * FROM {schema}.reports WHERE user_id = ? AND report_date >= ? AND report_date < ?"
+        keyset = "SELECT MAX(report_date) FROM {schema}.reports WHERE user_id = ? AND report_date < ?"
+        try:
+            # Never the replica: the calendar must show a report right after it is sent
+            async with self._connect(read_only=True) as db:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute(page.format(schema='main'), (user_id, since, until))
+                rows = list(await cursor.fetchall())
+                cursor = await db.execute(keyset.format(schema='main'), (user_id, since))
+                previous = (await cursor.fetchone())[0]
+
+                for year in self.archive_years():
+                    if year > until[:4]:
+                        continue
+                    if previous and year < previous[:4]:
+                        break  # older archives cannot hold a later keyset
+                    await db.execute("ATTACH DATABASE ? AS archive", (self.archive_path(year),))
+                    try:
+                        if year >= since[:4]:
+                            cursor = await db.execute(page.format(schema='archive'), (user_id, since, until))
+                            rows.extend(await cursor.fetchall())
+                        cursor = await db.execute(keyset.format(schema='archive'), (user_id, since))
+                        found = (await cursor.fetchone())[0]
+                        previous = max(filter(None, (previous, found)), default=None)
+                    finally:
+                        await db.execute("DETACH DATABASE archive")
+
+                rows.sort(key=lambda row: row['report_date'], reverse=True)
+                return [Report.from_row(row) for row in rows], previous
+
+        except Exception as e:
+            logger.error(f"Failed to get report history for user {user_id} from {since} to {until}: {e}")
+            return None
+
+    @observed
+    async def get_daily_reports(self, report_date: str, replica: bool = False) -> List[Dict]:
+        """Get all reports for specific date with user names (read-only; replica=True may read the replica)"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect(read_only=True, replica=replica) as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute("""
                     SELECT r.*, u.full_name, u.telegram_id
@@ -208,10 +557,11 @@ class DatabaseService:
             logger.error(f"Failed to get daily reports for {report_date}: {e}")
             return []
 
+    @observed
     async def check_report_exists(self, user_id: int, report_date: str) -> bool:
         """Check if report exists for user on specific date"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 cursor = await db.execute(
                     "SELECT 1 FROM reports WHERE user_id = ? AND report_date = ?",
                     (user_id, report_date)
@@ -223,21 +573,49 @@ class DatabaseService:
             logger.error(f"Failed to check report existence for user {user_id}: {e}")
             return False
 
-    async def get_users_without_report(self, report_date: str) -> List[User]:
-        """Get all active users who haven't submitted report for specific date"""
+    @observed
+    async def get_users_without_report(self, report_date: str, timezone: str = None,
+                                       telegram_ids: List[int] = None, replica: bool = False) -> List[User]:
+        """Get all active users who haven't submitted report for specific date
+
+        With timezone, only users whose effective timezone (users.timezone,
+        or Config.TIMEZONE when unset) matches it. With telegram_ids, only
+        those users (queried in chunks to stay under SQLite's variable limit).
+        replica=True is for summaries that tolerate the replica's lag, never
+        for reminders.
+        """
+        if telegram_ids is not None:
+            users = []
+            for start in range(0, len(telegram_ids), ID_CHUNK):
+                chunk = telegram_ids[start:start + ID_CHUNK]
+                users.extend(await self._get_users_without_report(report_date, timezone, chunk, replica))
+            return users
+        return await self._get_users_without_report(report_date, timezone, None, replica)
+
+    async def _get_users_without_report(self, report_date: str, timezone: Optional[str],
+                                        telegram_ids: Optional[List[int]], replica: bool) -> List[User]:
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            query = """
+                SELECT u.* FROM users u
+                WHERE u.is_active = 1
+                AND u.telegram_id NOT IN (
+                    SELECT u2.telegram_id FROM users u2
+                    JOIN reports r ON u2.id = r.user_id
+                    WHERE r.report_date = ?
+                )
+            """
+            params = [report_date]
+            if timezone:
+                query += " AND COALESCE(u.timezone, ?) = ?"
+                params += [Config.TIMEZONE, timezone]
+            if telegram_ids is not None:
+                query += f" AND u.telegram_id IN ({', '.join('?' * len(telegram_ids))})"
+                params += telegram_ids
+            query += " ORDER BY u.full_name"
+
+            async with self._connect(read_only=True, replica=replica) as db:
                 db.row_factory = aiosqlite.Row
-                cursor = await db.execute("""
-                    SELECT u.* FROM users u
-                    WHERE u.is_active = 1
-                    AND u.telegram_id NOT IN (
-                        SELECT u2.telegram_id FROM users u2
-                        JOIN reports r ON u2.id = r.user_id
-                        WHERE r.report_date = ?
-                    )
-                    ORDER BY u.full_name
-                """, (report_date,))
+                cursor = await db.execute(query, params)
                 rows = await cursor.fetchall()
 
                 return [User.from_row(row) for row in rows]
@@ -246,11 +624,192 @@ class DatabaseService:
             logger.error(f"Failed to get users without report for {report_date}: {e}")
             return []
 
+    # Snapshot rebuild from the event log
+    @observed
+    async def rebuild_reports(self, dry_run: bool = False) -> Optional[Dict[str, int]]:
+        """Rebuild the reports snapshot by replaying report_events.
+
+        One pass over the (user_id, report_date) index groups the events of
+        each report: the last event gives the values, the first one gives
+        submitted_at. Only rows that differ from the current snapshot are
+        rewritten, and reports without events are removed. With dry_run
+        nothing is written and the counts show what would change; the dry
+        run uses a read-only connection and a CTE instead of a temp table.
+
+        Returns {'events', 'reports', 'changed', 'removed'} or None on failure.
+        """
+        columns = REPORT_COLUMNS
+        try:
+            async with self._connect(read_only=dry_run) as db:
+                if dry_run:
+                    source = f"WITH reports_rebuild AS ({REBUILT_REPORTS}) "
+                else:
+                    # Writers wait until the snapshot is swapped
+                    await db.execute("BEGIN IMMEDIATE")
+                    await db.execute("DROP TABLE IF EXISTS temp.reports_rebuild")
+                    await db.execute(f"CREATE TEMP TABLE reports_rebuild AS {REBUILT_REPORTS}")
+                    source = ""
+
+                cursor = await db.execute(
+                    source + f"""SELECT (SELECT COUNT(*) FROM report_events),
+                               (SELECT COUNT(*) FROM reports_rebuild),
+                               (SELECT COUNT(*) FROM (SELECT {columns} FROM reports_rebuild
+                                                      EXCEPT SELECT {columns} FROM main.reports)),
+                               (SELECT COUNT(*) FROM main.reports
+                                WHERE id NOT IN (SELECT id FROM reports_rebuild))"""
+                )
+                events, reports, changed, removed = await cursor.fetchone()
+
+                if not dry_run and (changed or removed):
+                    await db.execute("DELETE FROM main.reports WHERE id NOT IN (SELECT id FROM reports_rebuild)")
+                    # REPLACE also drops a row that holds the same (user_id, report_date) under another id
+                    await db.execute(
+                        f"""INSERT OR REPLACE INTO main.reports ({columns})
+                            SELECT {columns} FROM reports_rebuild
+                            EXCEPT SELECT {columns} FROM main.reports"""
+                    )
+                if not dry_run:
+                    await db.execute("DROP TABLE temp.reports_rebuild")
+                    await db.commit()
+
+                result = {'events': events, 'reports': reports, 'changed': changed, 'removed': removed}
+                logger.info(f"Reports rebuild{' (dry run)' if dry_run else ''}: {result}")
+                return result
+
+        except Exception as e:
+            logger.error(f"Failed to rebuild reports from events: {e}")
+            return None
+
+    @observed
+    async def archive_reports(self, before: str) -> Optional[Dict[str, int]]:
+        """Move reports (and their events) dated before `before` into yearly archive databases
+
+        One calendar month per transaction, so the writer lock is held only
+        briefly. Rows are copied with INSERT OR REPLACE before they are
+        deleted, so a run interrupted between the two databases is simply
+        repeated by the next one.
+
+        Returns {'months', 'reports', 'events'} or None on failure.
+        """
+        moved = {'months': 0, 'reports': 0, 'events': 0}
+        try:
+            async with self._connect() as db:
+                cursor = await db.execute(
+                    "SELECT DISTINCT substr(report_date, 1, 7) FROM reports WHERE report_date < ? ORDER BY 1",
+                    (before,)
+                )
+                months = [row[0] for row in await cursor.fetchall()]
+                attached = None
+                try:
+                    for month in months:
+                        year, number = month[:4], int(month[5:])
+                        if year != attached:
+                            if attached:
+                                await db.execute("DETACH DATABASE archive")
+                            os.makedirs(self.archive_dir, exist_ok=True)
+                            await db.execute("ATTACH DATABASE ? AS archive", (self.archive_path(year),))
+                            attached = year
+                            await DatabaseModel.create_archive_tables(db, 'archive')
+                            await db.commit()
+
+                        following = f"{int(year) + 1}-01-01" if number == 12 else f"{year}-{number + 1:02d}-01"
+                        bounds = (f"{month}-01", min(following, before))
+                        await db.execute("BEGIN IMMEDIATE")
+                        cursor = await db.execute(
+                            f"""INSERT OR REPLACE INTO archive.reports ({REPORT_COLUMNS})
+                                SELECT {REPORT_COLUMNS} FROM main.reports WHERE report_date >= ? AND report_date < ?""",
+                            bounds
+                        )
+                        moved['reports'] += cursor.rowcount
+                        cursor = await db.execute(
+                            f"""INSERT OR REPLACE INTO archive.report_events ({EVENT_COLUMNS})
+                                SELECT {EVENT_COLUMNS} FROM main.report_events
+                                WHERE report_date >= ? AND report_date < ?""",
+                            bounds
+                        )
+                        moved['events'] += cursor.rowcount
+                        await db.execute("DELETE FROM main.report_events WHERE report_date >= ? AND report_date < ?", bounds)
+                        await db.execute("DELETE FROM main.reports WHERE report_date >= ? AND report_date < ?", bounds)
+                        await db.commit()
+                        moved['months'] += 1
+                finally:
+                    if attached:
+                        await db.execute("DETACH DATABASE archive")
+
+            if moved['months']:
+                logger.info(f"Archived reports before {before}: {moved}")
+            return moved
+
+        except Exception as e:
+            logger.error(f"Failed to archive reports before {before}: {e}")
+            return None
+
+    @observed
+    async def run_maintenance(self, full_vacuum: bool = False) -> Optional[Dict]:
+        """Return free pages to the OS and refresh planner statistics
+
+        Incremental vacuum runs in VACUUM_STEP_PAGES steps with a commit in
+        between, so writers wait for one step at most. It needs
+        auto_vacuum=INCREMENTAL: new databases get it at creation, older ones
+        switch with full_vacuum=True, which rewrites the whole file and blocks
+        writers for the duration (run it from manage.py during a quiet hour).
+        Statistics: the first run builds them with ANALYZE, later runs use
+        PRAGMA optimize, which re-analyzes only tables that changed enough.
+        """
+        async def pragma(name: str) -> int:
+            cursor = await db.execute(f"PRAGMA {name}")
+            return (await cursor.fetchone())[0]
+
+        try:
+            async with self._connect() as db:
+                if full_vacuum:
+                    await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    await db.execute("VACUUM")
+
+                freed = 0
+                mode = await pragma('auto_vacuum')
+                if mode == 2:  # INCREMENTAL
+                    while True:
+                        free = await pragma('freelist_count')
+                        if not free:
+                            break
+                        # The pragma frees one page per step; executescript steps it to the end
+                        await db.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+                        step = free - await pragma('freelist_count')
+                        if step <= 0:
+                            break
+                        freed += step
+
+                cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+                analyzed = await cursor.fetchone() is not None
+                await db.execute("PRAGMA optimize" if analyzed else "ANALYZE")
+                await db.commit()
+
+                size = await pragma('page_count') * await pragma('page_size')
+                result = {
+                    'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(mode, str(mode)),
+                    'freed_pages': freed,
+                    'free_pages': await pragma('freelist_count'),
+                    'size_bytes': size,
+                    'statistics': 'optimize' if analyzed else 'analyze',
+                }
+
+            DB_SIZE_BYTES.set(size, db='main')
+            DB_SIZE_BYTES.set(sum(os.path.getsize(self.archive_path(year)) for year in self.archive_years()),
+                              db='archive')
+            logger.info(f"Database maintenance: {result}")
+            return result
+
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
+            return None
+
     # Registration management operations
+    @observed
     async def create_pending_registration(self, telegram_id: int, full_name: str, username: str = None) -> Optional[PendingRegistration]:
         """Create new pending registration"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     """INSERT INTO pending_registrations (telegram_id, full_name, username)
@@ -275,10 +834,11 @@ class DatabaseService:
             logger.error(f"Failed to create pending registration {telegram_id}: {e}")
             return None
 
+    @observed
     async def get_pending_registrations(self, status: str = 'pending') -> List[PendingRegistration]:
         """Get pending registrations by status"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM pending_registrations WHERE status = ? ORDER BY requested_at",
@@ -292,10 +852,11 @@ class DatabaseService:
             logger.error(f"Failed to get pending registrations: {e}")
             return []
 
+    @observed
     async def get_pending_registration(self, telegram_id: int) -> Optional[PendingRegistration]:
         """Get pending registration by telegram_id"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM pending_registrations WHERE telegram_id = ?", (telegram_id,)
@@ -310,10 +871,11 @@ class DatabaseService:
             logger.error(f"Failed to get pending registration {telegram_id}: {e}")
             return None
 
+    @observed
     async def approve_registration(self, registration_id: int) -> bool:
         """Approve pending registration and create user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
 
                 # Get registration details
@@ -349,10 +911,11 @@ class DatabaseService:
             logger.error(f"Failed to approve registration {registration_id}: {e}")
             return False
 
+    @observed
     async def reject_registration(self, registration_id: int) -> bool:
         """Reject pending registration"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 await db.execute(
                     "UPDATE pending_registrations SET status = 'rejected' WHERE id = ?",
                     (registration_id,)
@@ -365,10 +928,11 @@ class DatabaseService:
             logger.error(f"Failed to reject registration {registration_id}: {e}")
             return False
 
+    @observed
     async def is_user_blocked(self, telegram_id: int) -> bool:
         """Check if user is blocked"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 cursor = await db.execute(
                     "SELECT 1 FROM blocked_users WHERE telegram_id = ?", (telegram_id,)
                 )
@@ -379,10 +943,11 @@ class DatabaseService:
             logger.error(f"Failed to check if user {telegram_id} is blocked: {e}")
             return False
 
+    @observed
     async def block_user(self, telegram_id: int, reason: str, blocked_by: int, full_name: str = None, username: str = None) -> bool:
         """Block user"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 await db.execute(
                     """INSERT OR REPLACE INTO blocked_users (telegram_id, full_name, username, reason, blocked_by)
                        VALUES (?, ?, ?, ?, ?)""",
@@ -396,10 +961,11 @@ class DatabaseService:
             logger.error(f"Failed to block user {telegram_id}: {e}")
             return False
 
+    @observed
     async def get_blocked_users(self) -> List[BlockedUser]:
         """Get all blocked users"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._connect() as db:
                 db.row_factory = aiosqlite.Row
                 cursor = await db.execute(
                     "SELECT * FROM blocked_users ORDER BY blocked_at DESC"
@@ -412,12 +978,23 @@ class DatabaseService:
             logger.error(f"Failed to get blocked users: {e}")
             return []
 
+    @observed
     async def delete_user(self, user_id: int) -> bool:
         """Delete user and all associated data (reports, etc.)"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Сначала удаляем связанные отчёты
+            async with self._connect() as db:
+                # Архивные отчёты — по файлу за раз (ATTACH нельзя внутри транзакции)
+                for year in self.archive_years():
+                    await db.execute("ATTACH DATABASE ? AS archive", (self.archive_path(year),))
+                    await db.execute("DELETE FROM archive.reports WHERE user_id = ?", (user_id,))
+                    await db.execute("DELETE FROM archive.report_events WHERE user_id = ?", (user_id,))
+                    await db.commit()
+                    await db.execute("DETACH DATABASE archive")
+
+                # Сначала удаляем связанные отчёты и их историю
                 await db.execute("DELETE FROM reports WHERE user_id = ?", (user_id,))
+                await db.execute("DELETE FROM report_events WHERE user_id = ?", (user_id,))
+                await db.execute("DELETE FROM report_submissions WHERE user_id = ?", (user_id,))
 
                 # Затем удаляем самого пользователя
                 cursor = await db.execute("DELETE FROM users WHERE id = ?", (user_id,))
@@ -434,4 +1011,34 @@ class DatabaseService:
 
         except Exception as e:
             logger.error(f"Failed to delete user {user_id}: {e}")
-            return False
\ No newline at end of file
+            return False
+    # Settings operations
+    @observed
+    async def get_setting(self, key: str) -> Optional[str]:
+        """Get value from the key-value settings table"""
+        try:
+            async with self._connect() as db:
+                cursor = await db.execute("SELECT value FROM settings WHERE key = ?", (key,))
+                row = await cursor.fetchone()
+                return row[0] if row else None
+
+        except Exception as e:
+            logger.error(f"Failed to get setting {key}: {e}")
+            return None
+
+    @observed
+    async def set_setting(self, key: str, value: str) -> bool:
+        """Insert or update a setting"""
+        try:
+            async with self._connect() as db:
+                await db.execute(
+                    """INSERT INTO settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                       ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP""",
+                    (key, value)
+                )
+                await db.commit()
+                return True
+
+        except Exception as e:
+            logger.error(f"Failed to set setting {key}: {e}")
+            return False
@@ -0,0 +1,149 @@
+"""
+Доставка сообщений сотрудникам с учётом недоступных чатов
+
+Ошибки отправки делятся на виды:
+- forbidden — бот заблокирован или аккаунт удалён (постоянная);
+- chat_not_found — чата больше нет (постоянная);
+- flood — Telegram попросил подождать (RetryAfter), повторяем один раз;
+- transient — сеть, 5xx и прочее, считается временной.
+
+Постоянные ошибки копятся в users.delivery_failures. После
+DELIVERY_MAX_FAILURES отказов подряд сотрудник становится неактивным:
+ему больше не приходят напоминания и рассылки, а администратор получает
+сводку об отключённых. Успешная отправка обнуляет счётчик.
+"""
+
+import asyncio
+from html import escape
+from typing import TYPE_CHECKING, List, Tuple
+
+from bot.config import Config
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from database.models import User
+    from services.database import DatabaseService
+
+logger = get_logger(__name__)
+
+DELIVERY_FAILURES = REGISTRY.counter(
+    'delivery_failures', 'Failed sends to employees by error kind', ['kind']
+)
+USERS_DEACTIVATED = REGISTRY.counter(
+    'users_deactivated', 'Employees deactivated after repeated permanent delivery failures'
+)
+
+FORBIDDEN = 'forbidden'
+CHAT_NOT_FOUND = 'chat_not_found'
+FLOOD = 'flood'
+TRANSIENT = 'transient'
+PERMANENT_KINDS = {FORBIDDEN, CHAT_NOT_FOUND}
+
+KIND_TITLES = {
+    FORBIDDEN: 'бот заблокирован',
+    CHAT_NOT_FOUND: 'чат не найден',
+    FLOOD: 'ограничение частоты',
+    TRANSIENT: 'временная ошибка',
+}
+
+# Максимальная пауза по RetryAfter: дольше не ждём, а считаем ошибку временной
+MAX_RETRY_AFTER_SECONDS = 60
+
+def classify_delivery_error(error: Exception) -> str:
+    """Вид ошибки отправки: forbidden, chat_not_found, flood или transient"""
+    from aiogram.exceptions import (
+        TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+    )
+
+    if isinstance(error, TelegramRetryAfter):
+        return FLOOD
+    if isinstance(error, TelegramForbiddenError):
+        return FORBIDDEN
+    if isinstance(error, TelegramNotFound):
+        return CHAT_NOT_FOUND
+    if isinstance(error, TelegramBadRequest):
+        text = str(error).lower()
+        if 'chat not found' in text or 'user not found' in text:
+            return CHAT_NOT_FOUND
+        if 'user is deactivated' in text or 'bot was blocked' in text:
+            return FORBIDDEN
+    return TRANSIENT
+
+class DeliveryService:
+    """Отправка сотрудникам с учётом ошибок и отключением недоступных"""
+
+    def __init__(self, bot: "Bot", db: "DatabaseService", max_failures: int = None):
+        self.bot = bot
+        self.db = db
+        self.max_failures = max_failures or Config.DELIVERY_MAX_FAILURES
+        self._deactivated: List[Tuple["User", str]] = []
+
+    async def send(self, user: "User", text: str, **kwargs) -> bool:
+        """Отправить сообщение; False, если не доставлено"""
+        try:
+            await self._send_with_retry(user.telegram_id, text, **kwargs)
+        except Exception as e:
+            await self._record_failure(user, e)
+            return False
+
+        if user.delivery_failures or user.last_delivery_error:
+            await self.db.reset_delivery_failures(user.telegram_id)
+            user.delivery_failures, user.last_delivery_error = 0, None
+        return True
+
+    async def _send_with_retry(self, chat_id: int, text: str, **kwargs):
+        from aiogram.exceptions import TelegramRetryAfter
+
+        try:
+            await self.bot.send_message(chat_id, text, **kwargs)
+        except TelegramRetryAfter as e:
+            if e.retry_after > MAX_RETRY_AFTER_SECONDS:
+                raise
+            logger.warning(f"Flood control for {chat_id}, retrying in {e.retry_after} s")
+            await asyncio.sleep(e.retry_after)
+            await self.bot.send_message(chat_id, text, **kwargs)
+
+    async def _record_failure(self, user: "User", error: Exception):
+        kind = classify_delivery_error(error)
+        DELIVERY_FAILURES.inc(kind=kind)
+        permanent = kind in PERMANENT_KINDS
+        deactivated = await self.db.record_delivery_failure(
+            user.telegram_id, kind, str(error), permanent, self.max_failures
+        )
+        if deactivated:
+            USERS_DEACTIVATED.inc()
+            self._deactivated.append((user, kind))
+            logger.warning(f"User {user.full_name} ({user.telegram_id}) deactivated: {kind}")
+        elif permanent:
+            logger.warning(f"Permanent delivery failure for {user.full_name} ({user.telegram_id}): {kind}")
+        else:
+            logger.error(f"Failed to deliver to {user.full_name} ({user.telegram_id}): {kind}: {error}")
+
+    def take_deactivated(self) -> List[Tuple["User", str]]:
+        """Отключённые с прошлого вызова: [(пользователь, вид ошибки)]"""
+        deactivated, self._deactivated = self._deactivated, []
+        return deactivated
+
+    async def send_admin_digest(self) -> List[int]:
+        """Одно сообщение администратору обо всех отключённых; возвращает их telegram_id"""
+        deactivated = self.take_deactivated()
+        if not deactivated:
+            return []
+
+        lines = [
+            f"• {escape(user.full_name)} (<code>{user.telegram_id}</code>) — {KIND_TITLES.get(kind, kind)}"
+            for user, kind in deactivated
+        ]
+        text = (
+            f"🚫 <b>Сотрудники отключены ({len(deactivated)})</b>\n\n"
+            f"Сообщения не доставляются {self.max_failures} раз подряд, напоминания им больше не отправляются:\n\n"
+            + "\n".join(lines)
+            + "\n\nСотрудник снова станет активным, если напишет боту /start."
+        )
+        try:
+            await self.bot.send_message(Config.ADMIN_TELEGRAM_ID, text)
+        except Exception as e:
+            logger.error(f"Failed to send deactivation digest to admin: {e}")
+        return [user.telegram_id for user, _ in deactivated]
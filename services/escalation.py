@@ -0,0 +1,153 @@
+"""
+Политика эскалации напоминаний: этапы, смещения и шаблоны сообщений
+
+Политика задаётся строкой REMINDER_ESCALATION вида
+``daily:0,repeat:30,last:60,admin:90`` — этапы через запятую, у каждого
+имя и смещение в минутах от времени напоминания пользователя. Этап с
+именем ``admin`` не пишет сотрудникам, а присылает администратору список
+тех, кто так и не сдал отчёт. Без REMINDER_ESCALATION политика прежняя:
+напоминание и один повтор через REMINDER_REPEAT_AFTER_MINUTES.
+"""
+
+from functools import lru_cache
+from html import escape
+from typing import List, Optional, Tuple
+
+from bot.config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ADMIN_STAGE = 'admin'
+
+# Шаблон сотруднику выбирается по месту этапа в цепочке: первый, промежуточный, последний
+TEMPLATES = {
+    'first': (
+        "⏰ <b>Напоминание о отчёте</b>\n\n"
+        "👋 {first_name}, не забудьте отправить отчёт за сегодня!\n\n"
+        "📊 Нажмите кнопку ниже, чтобы заполнить форму:"
+    ),
+    'middle': (
+        "🔔 <b>Напоминание о отчёте</b>\n\n"
+        "{first_name}, отчёт за {report_date} ещё не отправлен.\n\n"
+        "📊 Нажмите кнопку ниже, чтобы заполнить форму:"
+    ),
+    'last': (
+        "⚠️ <b>Последнее напоминание!</b>\n\n"
+        "🔔 {first_name}, вы ещё не отправили отчёт за сегодня.\n\n"
+        "📋 Пожалуйста, заполните форму отчёта сейчас:\n\n"
+        "⏱️ Отчёты принимаются до конца рабочего дня."
+    ),
+    ADMIN_STAGE: (
+        "🚨 <b>Не сдали отчёт за {report_date}</b>\n"
+        "после всех напоминаний ({count}):\n\n"
+        "{names}"
+    ),
+}
+
+class EscalationStage:
+    """Один этап цепочки напоминаний"""
+
+    def __init__(self, name: str, offset_minutes: int, template: str, notify_admin: bool = False):
+        self.name = name
+        self.offset_minutes = offset_minutes
+        self.template = template
+        self.notify_admin = notify_admin
+
+    def render(self, report_date: str, full_name: str = '', names: Optional[List[str]] = None) -> str:
+        """Текст этапа; report_date в формате YYYY-MM-DD"""
+        year, month, day = report_date.split('-')
+        names = names or []
+        return self.template.format(
+            first_name=escape((full_name.split() or [''])[0]),
+            full_name=escape(full_name),
+            report_date=f"{day}.{month}.{year}",
+            count=len(names),
+            names='\n'.join(f"• {escape(name)}" for name in names),
+        )
+
+    def __repr__(self) -> str:
+        return f"<EscalationStage {self.name} +{self.offset_minutes}m{' admin' if self.notify_admin else ''}>"
+
+class EscalationPolicy:
+    """Упорядоченная по смещению цепочка этапов"""
+
+    def __init__(self, stages: List[EscalationStage]):
+        if not stages:
+            raise ValueError("Escalation policy needs at least one stage")
+        self.stages = sorted(stages, key=lambda stage: stage.offset_minutes)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "EscalationPolicy":
+        """Разобрать строку вида ``daily:0,repeat:30,admin:90``"""
+        parsed: List[Tuple[str, int]] = []
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, offset = item.partition(':')
+            name = name.strip()
+            if not name or not offset.strip().lstrip('-').isdigit():
+                raise ValueError(f"Bad escalation stage '{item}', expected name:minutes")
+            parsed.append((name, int(offset)))
+
+        names = [name for name, _ in parsed]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate escalation stage names in '{spec}'")
+
+        parsed.sort(key=lambda item: item[1])
+        employee = [name for name, _ in parsed if name != ADMIN_STAGE]
+        if not employee:
+            raise ValueError(f"Escalation policy '{spec}' has no employee stages")
+
+        stages = []
+        for name, offset in parsed:
+            if name == ADMIN_STAGE:
+                stages.append(EscalationStage(name, offset, TEMPLATES[ADMIN_STAGE], notify_admin=True))
+                continue
+            position = employee.index(name)
+            if position == 0:
+                template = TEMPLATES['first']
+            elif position == len(employee) - 1:
+                template = TEMPLATES['last']
+            else:
+                template = TEMPLATES['middle']
+            stages.append(EscalationStage(name, offset, template))
+        return cls(stages)
+
+    @classmethod
+    def default_spec(cls) -> str:
+        return f"daily:0,repeat:{Config.REMINDER_REPEAT_AFTER_MINUTES}"
+
+    @classmethod
+    def from_config(cls) -> "EscalationPolicy":
+        """Политика из REMINDER_ESCALATION; при ошибке в строке — политика по умолчанию"""
+        spec = Config.REMINDER_ESCALATION or cls.default_spec()
+        try:
+            return cls.from_spec(spec)
+        except ValueError as e:
+            logger.error(f"Invalid REMINDER_ESCALATION, using default: {e}")
+            return cls.from_spec(cls.default_spec())
+
+    def get(self, name: str) -> Optional[EscalationStage]:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        return None
+
+    def dispatcher_stages(self) -> List[Tuple[str, int]]:
+        """Этапы в формате ReminderDispatcher: (имя, смещение в минутах)"""
+        return [(stage.name, stage.offset_minutes) for stage in self.stages]
+
+    def describe(self) -> str:
+        """Короткое описание цепочки для сообщений: «сразу, +30 мин, админу +90 мин»"""
+        parts = []
+        for stage in self.stages:
+            when = 'сразу' if stage.offset_minutes == 0 else f"{stage.offset_minutes:+d} мин"
+            parts.append(f"админу {when}" if stage.notify_admin else when)
+        return ', '.join(parts)
+
+@lru_cache(maxsize=1)
+def get_policy() -> EscalationPolicy:
+    """Политика процесса (REMINDER_ESCALATION читается один раз)"""
+    return EscalationPolicy.from_config()
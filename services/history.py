@@ -0,0 +1,149 @@
+"""
+История отчётов сотрудника для календаря Mini App
+
+Страница истории — календарный месяц. Ссылка на предыдущую страницу
+ищется по ключу report_date (ближайший более ранний отчёт), так что пустые
+месяцы календарь пропускает без лишних запросов.
+
+Готовый ответ (тело, ETag, Last-Modified) кэшируется на сотрудника и месяц.
+Записи сотрудника сбрасываются, когда он отправляет отчёт; ограничение по
+времени — на случай, если отчёт сохранил другой процесс (api_server.py
+отдельно от бота). Неизменившийся месяц клиент получает как 304.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from utils.metrics import REGISTRY
+from utils.timezone import business_today, format_moscow_time
+
+if TYPE_CHECKING:
+    from database.models import User
+    from services.database import DatabaseService
+
+HISTORY_REQUESTS = REGISTRY.counter(
+    'history_requests', 'Report history requests by result', ['result']
+)
+HISTORY_CACHE_ENTRIES = REGISTRY.gauge(
+    'history_cache_entries', 'Cached report history pages'
+)
+
+HISTORY_CACHE_SECONDS = 600
+HISTORY_CACHE_SIZE = 4096
+
+_MONTH = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+def parse_month(value, tz_name: Optional[str] = None) -> str:
+    """Месяц YYYY-MM из запроса; без него — текущий месяц сотрудника. ValueError — неверный формат"""
+    if value is None or value == '':
+        return business_today(tz_name)[:7]
+    if not isinstance(value, str) or not _MONTH.match(value):
+        raise ValueError(f"Invalid month: {value!r}")
+    return value
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    """'2025-12' -> ('2025-12-01', '2026-01-01'): полуинтервал дат месяца"""
+    year, number = int(month[:4]), int(month[5:])
+    following = f"{year + 1}-01" if number == 12 else f"{year}-{number + 1:02d}"
+    return f"{month}-01", f"{following}-01"
+
+class HistoryPage:
+    """Готовый ответ на запрос месяца"""
+
+    def __init__(self, body: bytes, last_modified: Optional[datetime]):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.last_modified = last_modified
+
+    def not_modified(self, if_none_match, if_modified_since: Optional[datetime]) -> bool:
+        """Условный запрос: If-None-Match важнее If-Modified-Since"""
+        if if_none_match:
+            return any(etag.value in ('*', self.etag) for etag in if_none_match)
+        if if_modified_since and self.last_modified:
+            return self.last_modified <= if_modified_since
+        return False
+
+class HistoryCache:
+    """Страницы истории на (сотрудник, месяц)
+
+    В ключ входят текущий месяц (от него зависит ссылка на следующий) и
+    часовой пояс (в нём показано время отправки).
+    """
+
+    def __init__(self, ttl: float = HISTORY_CACHE_SECONDS, max_entries: int = HISTORY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[tuple, float, HistoryPage]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int, month: str, key: tuple) -> Optional[HistoryPage]:
+        entry = self._entries.get((user_id, month))
+        if entry and entry[0] == key and time.monotonic() - entry[1] < self.ttl:
+            return entry[2]
+        return None
+
+    def put(self, user_id: int, month: str, key: tuple, page: HistoryPage):
+        self._entries[(user_id, month)] = (key, time.monotonic(), page)
+        self._entries.move_to_end((user_id, month))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Сбросить все месяцы сотрудника: поздний отчёт меняет и прошлые месяцы"""
+        for entry_key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[entry_key]
+
+HISTORY_CACHE = HistoryCache()
+
+async def history_page(db: "DatabaseService", user: "User", month: str) -> Optional[HistoryPage]:
+    """Месяц истории сотрудника (из кэша, если он не отправлял отчётов); None — ошибка базы"""
+    current = business_today(user.timezone)[:7]
+    key = (current, user.timezone or '')
+    page = HISTORY_CACHE.get(user.id, month, key)
+    if page is not None:
+        HISTORY_REQUESTS.inc(result='hit')
+        return page
+
+    since, until = month_bounds(month)
+    result = await db.get_report_history(user.id, since, until)
+    if result is None:
+        return None
+    reports, previous = result
+    HISTORY_REQUESTS.inc(result='miss')
+
+    following = month_bounds(month)[1][:7]
+    body = json.dumps({
+        'month': month,
+        'reports': [
+            {
+                'report_date': report.report_date,
+                'calls_count': report.calls_count,
+                'kp_plus': report.kp_plus,
+                'kp': report.kp,
+                'rejections': report.rejections,
+                'inadequate': report.inadequate,
+                'submitted_at': format_moscow_time(report.submitted_at, tz_name=user.timezone),
+            }
+            for report in reports
+        ],
+        'prev_month': previous[:7] if previous else None,
+        'next_month': following if following <= current else None,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    # В базе время в UTC без пояса; Last-Modified — с точностью до секунды, как в HTTP
+    changed = [report.updated_at or report.submitted_at for report in reports]
+    last_modified = max(
+        (dt.replace(tzinfo=timezone.utc, microsecond=0) for dt in changed if dt), default=None
+    )
+    page = HistoryPage(body, last_modified)
+    HISTORY_CACHE.put(user.id, month, key, page)
+    return page
+
+HISTORY_CACHE_ENTRIES.set_function(lambda: len(HISTORY_CACHE))
@@ -0,0 +1,119 @@
+"""
+Мониторинг задержки event loop и поиск блокирующих вызовов
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+LOOP_LAG_SECONDS = REGISTRY.gauge(
+    'event_loop_lag_seconds', 'Last measured event loop scheduling lag'
+)
+LOOP_LAG_HISTOGRAM = REGISTRY.histogram(
+    'event_loop_lag_distribution_seconds', 'Event loop scheduling lag',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKS = REGISTRY.counter(
+    'event_loop_blocks', 'Times the loop was held longer than the block threshold'
+)
+
+class LoopMonitor:
+    """Измеряет задержку планирования event loop.
+
+    Корутина засыпает на interval секунд и сравнивает фактическое время
+    пробуждения с ожидаемым — разница и есть задержка loop. В режиме
+    capture_stacks отдельный поток-сторож следит за «пульсом» корутины и,
+    если loop не отвечает дольше порога, логирует стек потока loop —
+    это код, который его держит.
+    """
+
+    def __init__(self, interval: float = 0.5, block_threshold: float = 0.25, capture_stacks: bool = False):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.capture_stacks = capture_stacks
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+
+    async def start(self):
+        """Запустить мониторинг в текущем loop"""
+        if self._task:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+
+        if self.capture_stacks:
+            self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._watchdog.start()
+
+        logger.info(
+            f"Loop monitor started: interval {self.interval}s, "
+            f"block threshold {self.block_threshold * 1000:.0f} ms, stacks {'on' if self.capture_stacks else 'off'}"
+        )
+
+    async def stop(self):
+        """Остановить мониторинг"""
+        self._stopped.set()
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+
+            LOOP_LAG_SECONDS.set(lag)
+            LOOP_LAG_HISTOGRAM.observe(lag)
+
+            if lag >= self.block_threshold:
+                LOOP_BLOCKS.inc()
+                if not self.capture_stacks:
+                    logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        """Поток-сторож: снимает стек потока loop, пока тот заблокирован"""
+        check_every = min(self.block_threshold / 2, 0.1)
+        reported_beat = None
+
+        while not self._stopped.wait(check_every):
+            beat = self._heartbeat
+            stalled_for = time.monotonic() - beat - self.interval
+
+            if stalled_for < self.block_threshold or beat == reported_beat:
+                continue
+
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = ''.join(traceback.format_stack(frame))
+            logger.warning(
+                f"Event loop blocked for at least {stalled_for * 1000:.0f} ms, loop thread stack:\n{stack}"
+            )
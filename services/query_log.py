@@ -0,0 +1,238 @@
+"""
+Query timing instrumentation and slow-query log for DatabaseService
+"""
+import re
+import time
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(sql: str) -> str:
+    """Normalize SQL so that the same statement with different literals groups together"""
+    normalized = _STRING_LITERAL.sub('?', sql)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return _IN_LIST.sub('(?+)', normalized)
+
+def _returns_rows(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    return head in ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN')
+
+class QueryStat:
+    """Aggregated timings for one SQL fingerprint"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+        self.slow_count = 0
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'total_ms': round(self.total_time * 1000, 3),
+            'avg_ms': round(self.avg_time * 1000, 3),
+            'max_ms': round(self.max_time * 1000, 3),
+            'rows': self.rows,
+            'slow_count': self.slow_count,
+        }
+
+class QueryStats:
+    """Per-fingerprint query statistics collected since startup"""
+
+    def __init__(self, slow_threshold_ms: float = 100.0):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._stats: Dict[str, QueryStat] = {}
+
+    def record(self, sql: str, elapsed: float, rows: int, slow_threshold_ms: Optional[float] = None) -> bool:
+        """Record one execution, returns True if it was slow (threshold defaults to slow_threshold_ms)"""
+        key = fingerprint(sql)
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = self._stats[key] = QueryStat(key)
+
+        stat.count += 1
+        stat.total_time += elapsed
+        stat.max_time = max(stat.max_time, elapsed)
+        stat.rows += max(rows, 0)
+
+        threshold = self.slow_threshold_ms if slow_threshold_ms is None else slow_threshold_ms
+        is_slow = elapsed * 1000 >= threshold
+        if is_slow:
+            stat.slow_count += 1
+        return is_slow
+
+    def top(self, limit: int = 10) -> List[QueryStat]:
+        """Slowest fingerprints by worst execution time"""
+        return sorted(self._stats.values(), key=lambda s: s.max_time, reverse=True)[:limit]
+
+    def reset(self):
+        self._stats.clear()
+
+class TimedCursor:
+    """Cursor proxy that finishes the timing once rows are fetched
+
+    The query is recorded when the rows are fetched (fetch*, async
+    iteration to the end), when the cursor is closed, or when the
+    connection is released, whichever comes first.
+    """
+
+    def __init__(self, connection: 'TimedConnection', cursor: aiosqlite.Cursor,
+                 sql: str, parameters, elapsed: float):
+        self._connection = connection
+        self._cursor = cursor
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = elapsed
+        self._rows = 0
+        self._recorded = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def _finish(self, fetch_elapsed: float = 0.0, rows: int = 0):
+        self._elapsed += fetch_elapsed
+        self._rows += rows
+        if self._recorded:
+            return
+        self._recorded = True
+        await self._connection._record(self._sql, self._parameters, self._elapsed, self._rows)
+
+    async def fetchone(self):
+        started = time.perf_counter()
+        row = await self._cursor.fetchone()
+        await self._finish(time.perf_counter() - started, 1 if row is not None else 0)
+        return row
+
+    async def fetchall(self):
+        started = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        await self._finish(time.perf_counter() - started, len(rows))
+        return rows
+
+    async def fetchmany(self, size: Optional[int] = None):
+        started = time.perf_counter()
+        rows = await (self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+        await self._finish(time.perf_counter() - started, len(rows))
+        return rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        # Rows are timed while they are read; the caller's loop body is not
+        while True:
+            started = time.perf_counter()
+            row = await self._cursor.fetchone()
+            if row is None:
+                await self._finish(time.perf_counter() - started)
+                return
+            self._elapsed += time.perf_counter() - started
+            self._rows += 1
+            yield row
+
+    async def close(self):
+        await self._finish()
+        await self._cursor.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+class _TimedExecute:
+    """Result of TimedConnection.execute: awaitable and async context manager, like aiosqlite's"""
+
+    def __init__(self, coro):
+        self._coro = coro
+        self._cursor = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._cursor = await self._coro
+        return self._cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._cursor.close()
+
+class TimedConnection:
+    """aiosqlite connection proxy that times every execute"""
+
+    def __init__(self, connection: aiosqlite.Connection, stats: QueryStats,
+                 slow_threshold_ms: Optional[float] = None):
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, '_slow_threshold_ms', slow_threshold_ms)
+        object.__setattr__(self, '_pending', [])
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        # row_factory и прочие атрибуты задаются на реальном соединении
+        setattr(self._connection, name, value)
+
+    def execute(self, sql: str, parameters=None) -> _TimedExecute:
+        return _TimedExecute(self._execute(sql, parameters))
+
+    async def _execute(self, sql: str, parameters):
+        started = time.perf_counter()
+        cursor = await self._connection.execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+
+        if _returns_rows(sql):
+            timed = TimedCursor(self, cursor, sql, parameters, elapsed)
+            self._pending.append(timed)
+            return timed
+
+        await self._record(sql, parameters, elapsed, cursor.rowcount)
+        return cursor
+
+    async def finish(self):
+        """Record cursors whose rows were never fetched; called before the connection is closed"""
+        for cursor in self._pending:
+            await cursor._finish()
+        self._pending.clear()
+
+    async def executemany(self, sql: str, parameters):
+        started = time.perf_counter()
+        cursor = await self._connection.executemany(sql, parameters)
+        await self._record(sql, None, time.perf_counter() - started, cursor.rowcount, explain=False)
+        return cursor
+
+    async def _record(self, sql: str, parameters, elapsed: float, rows: int, explain: bool = True):
+        if not self._stats.record(sql, elapsed, rows, self._slow_threshold_ms):
+            return
+
+        plan = await self._explain(sql, parameters) if explain else ''
+        logger.warning(
+            f"Slow query {elapsed * 1000:.1f} ms, {rows} rows: {fingerprint(sql)}"
+            + (f"\nQuery plan:\n{plan}" if plan else '')
+        )
+
+    async def _explain(self, sql: str, parameters) -> str:
+        try:
+            cursor = await self._connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            rows = await cursor.fetchall()
+            return '\n'.join(f"  {row[3]}" for row in rows)
+        except Exception as e:
+            return f"  (plan unavailable: {e})"
@@ -0,0 +1,239 @@
+"""
+Диспетчер персональных напоминаний на min-heap
+"""
+
+import asyncio
+import heapq
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from bot.config import Config
+from utils.logger import get_logger
+from utils.metrics import REGISTRY
+from utils.timezone import get_timezone
+from services.escalation import get_policy
+
+logger = get_logger(__name__)
+
+REMINDER_HEAP_ENTRIES = REGISTRY.gauge(
+    'reminder_heap_entries', 'Entries in the reminder heap, including stale ones'
+)
+REMINDER_USERS = REGISTRY.gauge(
+    'reminder_users', 'Users with scheduled reminders'
+)
+REMINDERS_DUE = REGISTRY.counter(
+    'reminders_due', 'Reminders handed to the sender', ['stage']
+)
+
+# (имя этапа, смещение от времени напоминания в минутах)
+Stage = Tuple[str, int]
+# (telegram_id, часовой пояс или None, время HH:MM или None)
+Preference = Tuple[int, Optional[str], Optional[str]]
+# Отправитель: (этап, дата отчёта YYYY-MM-DD, telegram_id) -> None
+BatchSender = Callable[[str, str, List[int]], Awaitable[None]]
+
+def default_stages() -> List[Stage]:
+    return get_policy().dispatcher_stages()
+
+class ReminderDispatcher:
+    """Один цикл на все персональные напоминания.
+
+    В куче лежат записи (момент срабатывания, telegram_id, версия, этап,
+    дата отчёта) — по одной на пользователя и этап. При смене настроек
+    версия пользователя растёт, а старые записи не удаляются из кучи, а
+    пропускаются при извлечении (ленивая инвалидация); когда устаревших
+    становится больше живых, куча пересобирается. Сработавшие записи
+    группируются по (этап, дата отчёта) и отдаются отправителю пачкой,
+    после чего для каждого пользователя кладётся следующее срабатывание.
+    """
+
+    def __init__(self, send_batch: BatchSender, stages: Optional[List[Stage]] = None,
+                 clock: Callable[[], float] = time.time, max_sleep: float = 60.0):
+        self.send_batch = send_batch
+        self.stages = stages or default_stages()
+        self.clock = clock
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[float, int, int, int, int]] = []
+        self._versions: Dict[int, int] = {}
+        self._preferences: Dict[int, Tuple[str, str]] = {}
+        self._stale = 0
+        self._fire_cache: Dict[Tuple[str, str, int], Tuple[float, float, date]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._sending: Set[asyncio.Task] = set()
+        REMINDER_HEAP_ENTRIES.set_function(lambda: len(self._heap))
+        REMINDER_USERS.set_function(lambda: len(self._preferences))
+
+    def __len__(self) -> int:
+        return len(self._preferences)
+
+    @staticmethod
+    def resolve(timezone: Optional[str], reminder_time: Optional[str]) -> Tuple[str, str]:
+        """Пустые настройки пользователя заменяются значениями из Config"""
+        return timezone or Config.TIMEZONE, reminder_time or Config.REMINDER_TIME
+
+    def next_fire(self, timezone: str, reminder_time: str, offset_minutes: int,
+                  now: float) -> Tuple[float, date]:
+        """Ближайшее срабатывание этапа после now: (unix time, локальная дата отчёта)
+
+        У большинства пользователей одинаковые настройки, поэтому результат
+        кэшируется: посчитанный для момента computed_at он верен для любого
+        now из [computed_at, fire_at).
+        """
+        key = (timezone, reminder_time, offset_minutes)
+        cached = self._fire_cache.get(key)
+        if cached and cached[0] <= now < cached[1]:
+            return cached[1], cached[2]
+
+        fire_at, day = self._compute_next_fire(timezone, reminder_time, offset_minutes, now)
+        self._fire_cache[key] = (now, fire_at, day)
+        return fire_at, day
+
+    @staticmethod
+    def _compute_next_fire(timezone: str, reminder_time: str, offset_minutes: int,
+                           now: float) -> Tuple[float, date]:
+        tz = get_timezone(timezone)
+        at = dt_time.fromisoformat(reminder_time)
+        # Смещение этапа может перенести срабатывание за полночь — начинаем со вчера
+        day = datetime.fromtimestamp(now, tz).date() - timedelta(days=1)
+        while True:
+            local = tz.localize(datetime.combine(day, at)) + timedelta(minutes=offset_minutes)
+            fire_at = local.timestamp()
+            if fire_at > now:
+                return fire_at, day
+            day += timedelta(days=1)
+
+    def _push_user(self, telegram_id: int, version: int, now: float):
+        timezone, reminder_time = self._preferences[telegram_id]
+        for stage_index, (_, offset) in enumerate(self.stages):
+            fire_at, day = self.next_fire(timezone, reminder_time, offset, now)
+            heapq.heappush(self._heap, (fire_at, telegram_id, version, stage_index, day.toordinal()))
+
+    def set_user(self, telegram_id: int, timezone: Optional[str] = None, reminder_time: Optional[str] = None,
+                 now: Optional[float] = None) -> bool:
+        """Добавить пользователя или обновить его настройки; False, если ничего не изменилось"""
+        preference = self.resolve(timezone, reminder_time)
+        if self._preferences.get(telegram_id) == preference:
+            return False
+
+        if telegram_id in self._preferences:
+            self._stale += len(self.stages)
+        version = self._versions.get(telegram_id, 0) + 1
+        self._versions[telegram_id] = version
+        self._preferences[telegram_id] = preference
+        self._push_user(telegram_id, version, self.clock() if now is None else now)
+
+        self._maybe_compact()
+        self._wakeup.set()
+        return True
+
+    def remove_user(self, telegram_id: int) -> bool:
+        if self._preferences.pop(telegram_id, None) is None:
+            return False
+        self._versions[telegram_id] = self._versions.get(telegram_id, 0) + 1
+        self._stale += len(self.stages)
+        self._maybe_compact()
+        return True
+
+    def sync(self, preferences: Iterable[Preference], now: Optional[float] = None) -> Tuple[int, int, int]:
+        """Свести кучу с полным списком настроек: (добавлено, изменено, удалено)
+
+        Трогаются только пользователи, у которых что-то поменялось.
+        """
+        added = changed = 0
+        seen = set()
+        for telegram_id, timezone, reminder_time in preferences:
+            seen.add(telegram_id)
+            known = telegram_id in self._preferences
+            if self.set_user(telegram_id, timezone, reminder_time, now=now):
+                if known:
+                    changed += 1
+                else:
+                    added += 1
+
+        removed = 0
+        for telegram_id in [tid for tid in self._preferences if tid not in seen]:
+            self.remove_user(telegram_id)
+            removed += 1
+        return added, changed, removed
+
+    def _maybe_compact(self):
+        if self._stale > 1024 and self._stale > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _is_live(self, entry) -> bool:
+        return entry[1] in self._preferences and self._versions.get(entry[1]) == entry[2]
+
+    def next_fire_at(self) -> Optional[float]:
+        """Момент ближайшего живого срабатывания (устаревшие записи сверху выбрасываются)"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale = max(0, self._stale - 1)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> Dict[Tuple[str, str], List[int]]:
+        """Извлечь всё, что пора отправить: {(этап, дата отчёта): [telegram_id, ...]}"""
+        now = self.clock() if now is None else now
+        due: Dict[Tuple[str, str], List[int]] = {}
+
+        while True:
+            fire_at = self.next_fire_at()
+            if fire_at is None or fire_at > now:
+                break
+            _, telegram_id, version, stage_index, ordinal = heapq.heappop(self._heap)
+            stage_name, offset = self.stages[stage_index]
+            report_date = date.fromordinal(ordinal).strftime('%Y-%m-%d')
+            due.setdefault((stage_name, report_date), []).append(telegram_id)
+
+            # Следующее срабатывание того же этапа
+            timezone, reminder_time = self._preferences[telegram_id]
+            next_at, day = self.next_fire(timezone, reminder_time, offset, max(now, fire_at))
+            heapq.heappush(self._heap, (next_at, telegram_id, version, stage_index, day.toordinal()))
+
+        return due
+
+    async def start(self):
+        if self._task:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Reminder dispatcher started: {len(self)} users, stages {self.stages}")
+
+    async def stop(self):
+        # Флаг вместо cancel(): wait_for теряет отмену, если событие сработало одновременно с ней
+        if self._task:
+            self._running = False
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        while self._running:
+            self._wakeup.clear()
+            next_at = self.next_fire_at()
+            delay = self.max_sleep if next_at is None else min(self.max_sleep, max(0.0, next_at - self.clock()))
+            if delay > 0:
+                try:
+                    # Новые настройки могут дать более раннее срабатывание — будят цикл
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            for (stage_name, report_date), telegram_ids in self.pop_due().items():
+                REMINDERS_DUE.inc(len(telegram_ids), stage=stage_name)
+                # Отправка идёт отдельной задачей, чтобы медленная пачка не задерживала следующие
+                task = asyncio.create_task(self._send(stage_name, report_date, telegram_ids))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+
+    async def _send(self, stage_name: str, report_date: str, telegram_ids: List[int]):
+        try:
+            await self.send_batch(stage_name, report_date, telegram_ids)
+        except Exception as e:
+            logger.error(f"Failed to send {stage_name} reminders for {report_date}: {e}")
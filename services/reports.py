@@ -0,0 +1,223 @@
+"""
+Приём отчёта: запись, выгрузка в Google Таблицу и уведомление администратора
+
+Один конвейер для обработчика Mini App в боте и для api_server.py. Mini App
+присылает с каждой отправкой submission_id — ID, сгенерированный на клиенте.
+Повтор с тем же ID (двойное нажатие, повторная попытка) ничего не
+записывает, не выгружает и не уведомляет, а возвращает результат первой
+отправки. ID помнятся SUBMISSION_RETENTION_HOURS часов.
+
+Отправка, которую Mini App держала в очереди без связи, приходит с датой
+нажатия — отчёт пишется за неё, если она не старше LATE_REPORT_DAYS дней.
+"""
+
+import re
+import time
+from datetime import datetime, timedelta
+from html import escape
+from typing import TYPE_CHECKING, Dict, Optional
+
+import aiohttp
+
+from bot.config import Config
+from services.history import HISTORY_CACHE
+from utils.logger import get_logger, get_correlation_id
+from utils.metrics import REGISTRY
+from utils.timezone import business_today, format_moscow_time
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from database.models import Report, User
+    from services.database import DatabaseService
+
+logger = get_logger(__name__)
+
+SHEETS_REQUEST_SECONDS = REGISTRY.histogram(
+    'sheets_request_duration_seconds', 'Google Sheets webhook latency'
+)
+SHEETS_REQUESTS = REGISTRY.counter(
+    'sheets_requests', 'Google Sheets webhook calls by result', ['result']
+)
+REPORT_SUBMISSIONS = REGISTRY.counter(
+    'report_submissions', 'Report submissions by outcome', ['result']
+)
+
+REPORT_FIELDS = ('calls_count', 'kp_plus', 'kp', 'rejections', 'inadequate')
+
+# Правила проверки значений (те же, что в обработчике бота и api_server.py) — отдаются форме
+REPORT_LIMITS = {
+    'min_value': 0,                       # все поля — целые числа не меньше нуля
+    'min_calls': 1,                       # звонков хотя бы один
+    'resultative': ['kp_plus', 'kp'],     # их сумма не больше calls_count
+}
+
+# UUID из crypto.randomUUID() или любой другой ID из латиницы, цифр, «-» и «_»
+_SUBMISSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+def parse_submission_id(value) -> Optional[str]:
+    """submission_id из данных формы; None, если клиент его не прислал
+
+    ValueError — если прислал, но в неверном формате.
+    """
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str) or not _SUBMISSION_ID.match(value):
+        raise ValueError(f"Invalid submission_id: {value!r}")
+    return value
+
+def parse_report_date(value, tz_name: Optional[str] = None) -> str:
+    """Дата отчёта из данных формы: сегодня (по поясу сотрудника), если не указана
+
+    Прошедшая дата принимается не дальше LATE_REPORT_DAYS дней назад —
+    это повтор из очереди Mini App. ValueError — неверный формат, будущее
+    или слишком старая дата.
+    """
+    today = business_today(tz_name)
+    if value is None or value == '' or value == today:
+        return today
+    try:
+        date = datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid report_date: {value!r}")
+
+    newest = datetime.strptime(today, '%Y-%m-%d').date()
+    if not newest - timedelta(days=Config.LATE_REPORT_DAYS) <= date <= newest:
+        raise ValueError(f"report_date {value} is outside the accepted window")
+    return date.isoformat()
+
+class SubmissionResult:
+    """Итог приёма отчёта"""
+
+    def __init__(self, report: "Report", duplicate: bool = False, sheets_ok: Optional[bool] = None):
+        self.report = report
+        self.duplicate = duplicate
+        # None — неизвестно: первая отправка с этим ID ещё не закончила выгрузку
+        self.sheets_ok = sheets_ok
+
+async def submit_report(db: "DatabaseService", user: "User", values: Dict[str, int],
+                        submission_id: Optional[str] = None, bot: "Bot" = None,
+                        report_date: Optional[str] = None) -> Optional[SubmissionResult]:
+    """Сохранить проверенный отчёт и выполнить все шаги после записи
+
+    report_date — уже проверенная parse_report_date дата, по умолчанию
+    бизнес-дата сотрудника. Без bot уведомление администратору не
+    отправляется. None — отчёт не сохранён.
+    """
+    from bot.rendering import STATUS_CACHE
+
+    today = business_today(user.timezone)
+    report_date = report_date or today
+    if report_date != today:
+        logger.info(f"Late report from {user.full_name} for {report_date} (today {today})")
+    report = await db.create_report(
+        user_id=user.id,
+        report_date=report_date,
+        submission_id=submission_id,
+        **{field: values[field] for field in REPORT_FIELDS}
+    )
+    if report is None:
+        REPORT_SUBMISSIONS.inc(result='failed')
+        return None
+
+    if report.duplicate:
+        REPORT_SUBMISSIONS.inc(result='duplicate')
+        stored = await db.get_submission_result(submission_id) or {}
+        return SubmissionResult(report, duplicate=True, sheets_ok=stored.get('sheets'))
+
+    REPORT_SUBMISSIONS.inc(result='new')
+    STATUS_CACHE.invalidate(user.telegram_id)
+    HISTORY_CACHE.invalidate(user.id)
+
+    sheets_ok = await send_to_google_sheets({
+        "employee_name": user.full_name,
+        "report_date": report_date,
+        **{field: values[field] for field in REPORT_FIELDS},
+    })
+
+    if bot is not None:
+        await notify_admin(bot, user, report)
+
+    if submission_id:
+        await db.save_submission_result(submission_id, {'sheets': sheets_ok})
+    return SubmissionResult(report, sheets_ok=sheets_ok)
+
+async def notify_admin(bot: "Bot", user: "User", report: "Report"):
+    """Уведомление администратора о новом отчёте"""
+    total_resultative = report.kp_plus + report.kp
+    conversion = round((total_resultative / report.calls_count) * 100, 1) if report.calls_count > 0 else 0
+    year, month, day = report.report_date.split('-')
+    try:
+        await bot.send_message(
+            Config.ADMIN_TELEGRAM_ID,
+            f"📊 <b>Новый отчёт получен</b>\n\n"
+            f"👤 <b>Сотрудник:</b> {escape(user.full_name)}\n"
+            f"📅 <b>Дата:</b> {day}.{month}.{year}\n"
+            f"🕐 <b>Время:</b> {format_moscow_time(report.submitted_at, tz_name=user.timezone)}\n\n"
+            f"📞 <b>Звонков:</b> {report.calls_count}\n"
+            f"🎯 <b>Результативных:</b> {total_resultative} ({conversion}%)\n"
+            f"✅ <b>КЦ+:</b> {report.kp_plus} | 🔄 <b>КЦ:</b> {report.kp}\n"
+            f"❌ <b>Отказы:</b> {report.rejections} | 📵 <b>Пустые звонки:</b> {report.inadequate}"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to notify admin about new report: {e}")
+
+async def send_to_google_sheets(report_data: dict) -> bool:
+    """Отправка данных отчёта в Google Таблицу (с учётом метрик)"""
+    started = time.perf_counter()
+    success = await _post_to_google_sheets(report_data)
+    SHEETS_REQUEST_SECONDS.observe(time.perf_counter() - started)
+    SHEETS_REQUESTS.inc(result='success' if success else 'failure')
+    return success
+
+async def _post_to_google_sheets(report_data: dict) -> bool:
+    """POST отчёта в Google Apps Script"""
+    try:
+        # Подготовка данных для Google Sheets
+        payload = {
+            "secret_key": Config.GOOGLE_SHEETS_SECRET_KEY,
+            "employee_name": report_data.get("employee_name"),
+            "report_date": report_data.get("report_date"),
+            "calls_count": report_data.get("calls_count"),
+            "kp_plus": report_data.get("kp_plus"),
+            "kp": report_data.get("kp"),
+            "rejections": report_data.get("rejections"),
+            "inadequate": report_data.get("inadequate")
+        }
+
+        # Отправка POST запроса в Google Apps Script
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(
+                Config.GOOGLE_SHEETS_WEBHOOK_URL,
+                json=payload,
+                headers={
+                    'Content-Type': 'application/json',
+                    'X-Request-ID': get_correlation_id()
+                },
+                allow_redirects=True
+            ) as response:
+                logger.info(f"Google Sheets response status: {response.status}")
+
+                if response.status != 200:
+                    text = await response.text()
+                    logger.error(f"Google Sheets HTTP error {response.status}: {text[:200]}...")
+                    return False
+
+                content_type = response.headers.get('content-type', '')
+                if 'application/json' not in content_type:
+                    text = await response.text()
+                    logger.error(f"Google Sheets returned HTML instead of JSON: {text[:200]}...")
+                    return False
+
+                result = await response.json()
+
+                if result.get("status") == "success":
+                    logger.info(f"Successfully sent data to Google Sheets for {report_data.get('employee_name')}")
+                    return True
+                else:
+                    logger.error(f"Google Sheets error: {result.get('message', 'Unknown error')}")
+                    return False
+
+    except Exception as e:
+        logger.error(f"Failed to send data to Google Sheets: {e}")
+        return False
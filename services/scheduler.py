@@ -3,30 +3,55 @@
 """
 
 import asyncio
-from datetime import datetime, time
-from typing import TYPE_CHECKING
-
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-import pytz
+from html import escape
+from time import perf_counter
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Set
 
 from bot.config import Config
-from utils.logger import get_logger
+from utils.logger import get_logger, bind_correlation_id, reset_correlation_id
+from utils.metrics import REGISTRY
+from utils.timezone import business_now, business_today, format_moscow_time
+from services.delivery import DeliveryService
+from services.escalation import get_policy
+from services.reminder_dispatcher import ReminderDispatcher
 
 if TYPE_CHECKING:
     from aiogram import Bot
     from services.database import DatabaseService
+    from database.models import User
+    from services.escalation import EscalationStage
 
 logger = get_logger(__name__)
 
+SCHEDULER_JOB_SECONDS = REGISTRY.histogram(
+    'scheduler_job_duration_seconds', 'Scheduler job run time', ['job']
+)
+SCHEDULER_JOBS = REGISTRY.gauge(
+    'scheduler_jobs', 'Jobs registered in the scheduler'
+)
+
+REMINDERS_SKIPPED = REGISTRY.counter(
+    'reminders_skipped', 'Due reminders dropped because the report was already in', ['stage']
+)
+
+REMINDER_SYNC_MINUTES = 15
+REPORTED_DATES_KEPT = 3
+SUBMISSION_PURGE_HOURS = 6
+
 class SchedulerService:
     """Сервис планировщика для напоминаний"""
 
     def __init__(self, bot: "Bot", db: "DatabaseService"):
         self.bot = bot
         self.db = db
-        self.scheduler = AsyncIOScheduler(timezone=Config.TIMEZONE)
+        self.scheduler = None  # APScheduler импортируется при запуске — он заметно замедляет старт
         self.is_running = False
+        self.policy = get_policy()
+        self.delivery = DeliveryService(bot, db)
+        self.reminders = ReminderDispatcher(self.send_reminder_batch, stages=self.policy.dispatcher_stages())
+        self._reported: Dict[str, Set[int]] = {}
+        SCHEDULER_JOBS.set_function(lambda: len(self.scheduler.get_jobs()) if self.scheduler else 0)
 
     async def start(self):
         """Запустить планировщик"""
@@ -34,174 +59,281 @@ class SchedulerService:
             logger.warning("Scheduler is already running")
             return
 
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        from apscheduler.triggers.interval import IntervalTrigger
+
         try:
-            # Парсинг времени напоминания
-            reminder_time = time.fromisoformat(Config.REMINDER_TIME)
+            self.scheduler = AsyncIOScheduler(timezone=Config.TIMEZONE)
+
+            # Персональные напоминания — один цикл на куче вместо задачи на пользователя
+            await self.refresh_reminders()
+            await self.reminders.start()
+
+            # Настройки меняются командами /timezone, /reminder и при регистрации — периодически сверяем
+            self.scheduler.add_job(
+                func=self._job('reminder_sync', self.refresh_reminders),
+                trigger=IntervalTrigger(minutes=REMINDER_SYNC_MINUTES),
+                id='reminder_sync',
+                name='Reminder Preferences Sync',
+                replace_existing=True
+            )
 
-            # Добавляем задачу ежедневных напоминаний
+            # ID отправок отчётов старше окна повторов больше не нужны
             self.scheduler.add_job(
-                func=self.send_daily_reminders,
-                trigger=CronTrigger(
-                    hour=reminder_time.hour,
-                    minute=reminder_time.minute,
-                    timezone=Config.TIMEZONE
-                ),
-                id='daily_reminders',
-                name='Daily Report Reminders',
+                func=self._job('submission_purge', self.purge_submissions),
+                trigger=IntervalTrigger(hours=SUBMISSION_PURGE_HOURS),
+                id='submission_purge',
+                name='Report Submission IDs Purge',
                 replace_existing=True
             )
 
-            # Добавляем задачу повторных напоминаний
+            # Ночное обслуживание БД: архив старых отчётов, возврат свободных страниц, статистика
+            hour, minute = map(int, Config.MAINTENANCE_TIME.split(':'))
             self.scheduler.add_job(
-                func=self.send_repeat_reminders,
-                trigger=CronTrigger(
-                    hour=(reminder_time.hour +
-                          Config.REMINDER_REPEAT_AFTER_MINUTES // 60) % 24,
-                    minute=(reminder_time.minute +
-                           Config.REMINDER_REPEAT_AFTER_MINUTES % 60) % 60,
-                    timezone=Config.TIMEZONE
-                ),
-                id='repeat_reminders',
-                name='Repeat Report Reminders',
+                func=self._job('db_maintenance', self.maintain_database),
+                trigger=CronTrigger(hour=hour, minute=minute),
+                id='db_maintenance',
+                name='Database Archive And Maintenance',
                 replace_existing=True
             )
 
+            # Горячая копия базы: backup API шагами в отдельном потоке, loop и писатели не ждут
+            if Config.BACKUP_INTERVAL_HOURS > 0:
+                self.scheduler.add_job(
+                    func=self._job('db_backup', self.backup_database),
+                    trigger=IntervalTrigger(hours=Config.BACKUP_INTERVAL_HOURS),
+                    id='db_backup',
+                    name='Database Online Backup',
+                    replace_existing=True
+                )
+
+            # Реплика для сводок и статистики: первая копия сразу, дальше по расписанию
+            if self.db.replica_path:
+                await self.refresh_replica()
+                self.scheduler.add_job(
+                    func=self._job('replica_refresh', self.refresh_replica),
+                    trigger=IntervalTrigger(minutes=Config.READ_REPLICA_REFRESH_MINUTES),
+                    id='replica_refresh',
+                    name='Read Replica Refresh',
+                    replace_existing=True
+                )
+
             # Запускаем планировщик
             self.scheduler.start()
             self.is_running = True
 
             logger.info(f"Scheduler started successfully")
-            logger.info(f"Daily reminders at: {Config.REMINDER_TIME}")
-            logger.info(f"Repeat reminders after: {Config.REMINDER_REPEAT_AFTER_MINUTES} minutes")
+            logger.info(f"Reminders scheduled for {len(self.reminders)} users")
+            logger.info(f"Default reminder time: {Config.REMINDER_TIME}")
+            logger.info(f"Escalation stages: {self.policy.stages}")
 
         except Exception as e:
             logger.error(f"Failed to start scheduler: {e}")
             raise
 
+    async def refresh_reminders(self):
+        """Свести диспетчер напоминаний с настройками в БД (меняются только изменившиеся записи)"""
+        added, changed, removed = self.reminders.sync(await self.db.get_reminder_preferences())
+        if added or changed or removed:
+            logger.info(f"Reminder preferences synced: +{added} ~{changed} -{removed}")
+
+    async def refresh_user_reminders(self, telegram_id: int):
+        """Пересчитать напоминания одного пользователя сразу после смены настроек"""
+        user = await self.db.get_user(telegram_id)
+        if user and user.is_active:
+            self.reminders.set_user(telegram_id, user.timezone, user.reminder_time)
+        else:
+            self.reminders.remove_user(telegram_id)
+
+    async def purge_submissions(self):
+        """Удалить ID отправок старше SUBMISSION_RETENTION_HOURS"""
+        removed = await self.db.purge_submissions(Config.SUBMISSION_RETENTION_HOURS)
+        if removed:
+            logger.info(f"Purged {removed} report submission IDs")
+
+    async def maintain_database(self):
+        """Отчёты старше REPORT_RETENTION_DAYS — в годовые архивы, затем vacuum и статистика"""
+        if Config.REPORT_RETENTION_DAYS > 0:
+            before = (business_now() - timedelta(days=Config.REPORT_RETENTION_DAYS)).strftime('%Y-%m-%d')
+            await self.db.archive_reports(before)
+        await self.db.run_maintenance()
+
+    async def backup_database(self):
+        """Сжатая копия базы в BACKUP_DIR, старше последних BACKUP_KEEP удаляются"""
+        from services.backup import BackupError, create_backup
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, create_backup, self.db.db_path, Config.BACKUP_DIR, Config.BACKUP_KEEP
+            )
+        except BackupError as e:
+            logger.error(f"Online backup failed: {e}")
+
+    async def refresh_replica(self):
+        """Обновить реплику для чтения; при ошибке чтения идут в основную базу, когда реплика устареет"""
+        from services.backup import BackupError, refresh_replica
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, refresh_replica, self.db.db_path, self.db.replica_path
+            )
+        except BackupError as e:
+            logger.error(f"Read replica refresh failed: {e}")
+
+    async def send_reminder_batch(self, stage: str, report_date: str, telegram_ids: List[int]):
+        """Отправить пачку этапа тем, кто ещё не сдал отчёт за report_date
+
+        Список должников пересчитывается один раз на пачку. Сдавшие
+        запоминаются, и следующие этапы за ту же дату их уже не проверяют —
+        когда сдали все, цепочка для пачки заканчивается без запросов к БД.
+        """
+        async def run():
+            escalation = self.policy.get(stage)
+            if escalation is None:
+                logger.warning(f"Unknown escalation stage {stage}, skipped")
+                return
+
+            reported = self._reported_for(report_date)
+            pending = [telegram_id for telegram_id in telegram_ids if telegram_id not in reported]
+            if len(pending) < len(telegram_ids):
+                REMINDERS_SKIPPED.inc(len(telegram_ids) - len(pending), stage=stage)
+            if not pending:
+                logger.info(f"Everyone in the {stage} batch has reported for {report_date}")
+                return
+
+            users = await self.db.get_users_without_report(report_date, telegram_ids=pending)
+            missing = {user.telegram_id for user in users}
+            reported.update(telegram_id for telegram_id in pending if telegram_id not in missing)
+
+            if escalation.notify_admin:
+                await self.send_admin_missing_alert(escalation, report_date, users)
+            else:
+                await self.send_stage_reminders(escalation, report_date, users)
+
+            # Недоступные после этой пачки — одной сводкой админу и сразу из расписания
+            for telegram_id in await self.delivery.send_admin_digest():
+                self.reminders.remove_user(telegram_id)
+
+        await self._job(f"{stage}_reminders", run)()
+
+    def _reported_for(self, report_date: str) -> Set[int]:
+        """Сдавшие за дату; держим только последние даты — цепочка не длиннее суток"""
+        if report_date not in self._reported:
+            for old_date in sorted(self._reported)[:-REPORTED_DATES_KEPT + 1]:
+                del self._reported[old_date]
+            self._reported[report_date] = set()
+        return self._reported[report_date]
+
+    def _job(self, job_id: str, func):
+        """Обернуть задачу: свой correlation ID и замер длительности на каждый запуск"""
+        async def run():
+            token = bind_correlation_id(prefix=f"job-{job_id}")
+            started = perf_counter()
+            try:
+                await func()
+            finally:
+                SCHEDULER_JOB_SECONDS.observe(perf_counter() - started, job=job_id)
+                reset_correlation_id(token)
+        return run
+
     async def stop(self):
         """Остановить планировщик"""
         if not self.is_running:
             return
 
         try:
+            await self.reminders.stop()
             self.scheduler.shutdown(wait=False)
             self.is_running = False
             logger.info("Scheduler stopped successfully")
         except Exception as e:
             logger.error(f"Error stopping scheduler: {e}")
 
-    async def send_daily_reminders(self):
-        """Отправить ежедневные напоминания"""
+    async def send_stage_reminders(self, stage: "EscalationStage", report_date: str,
+                                   users_without_report: List["User"]):
+        """Отправить сотрудникам напоминание этапа"""
         try:
-            # Получаем текущую дату
-            today = datetime.now().strftime('%Y-%m-%d')
-
-            # Получаем пользователей без отчёта за сегодня
-            users_without_report = await self.db.get_users_without_report(today)
-
             if not users_without_report:
-                logger.info("All users have submitted reports for today")
+                logger.info(f"All users have submitted reports - no {stage.name} reminders needed")
                 return
 
-            logger.info(f"Sending daily reminders to {len(users_without_report)} users")
+            logger.info(f"Sending {stage.name} reminders to {len(users_without_report)} users")
 
-            # Отправляем напоминания
             for user in users_without_report:
-                try:
-                    await self.bot.send_message(
-                        user.telegram_id,
-                        "⏰ <b>Напоминание о отчёте</b>\n\n"
-                        f"👋 {user.full_name.split()[0]}, не забудьте отправить отчёт за сегодня!\n\n"
-                        "📊 Нажмите кнопку ниже, чтобы заполнить форму:",
-                        reply_markup=self._get_reminder_keyboard()
-                    )
-                    logger.debug(f"Daily reminder sent to {user.full_name}")
-
-                    # Небольшая пауза между сообщениями
-                    await asyncio.sleep(0.1)
-
-                except Exception as e:
-                    logger.error(f"Failed to send daily reminder to {user.full_name}: {e}")
-
-        except Exception as e:
-            logger.error(f"Error in send_daily_reminders: {e}")
-
-    async def send_repeat_reminders(self):
-        """Отправить повторные напоминания"""
-        try:
-            # Получаем текущую дату
-            today = datetime.now().strftime('%Y-%m-%d')
+                if await self.delivery.send(
+                    user,
+                    stage.render(report_date, full_name=user.full_name),
+                    reply_markup=self._get_reminder_keyboard()
+                ):
+                    logger.debug(f"{stage.name} reminder sent to {user.full_name}")
 
-            # Получаем пользователей без отчёта за сегодня
-            users_without_report = await self.db.get_users_without_report(today)
+                # Небольшая пауза между сообщениями
+                await asyncio.sleep(0.1)
 
-            if not users_without_report:
-                logger.info("All users have submitted reports - no repeat reminders needed")
-                return
+        except Exception as e:
+            logger.error(f"Error in send_stage_reminders({stage.name}): {e}")
 
-            logger.info(f"Sending repeat reminders to {len(users_without_report)} users")
+    async def send_admin_missing_alert(self, stage: "EscalationStage", report_date: str,
+                                       users_without_report: List["User"]):
+        """Финальный этап: список тех, кто так и не сдал отчёт, администратору"""
+        if not users_without_report:
+            logger.info(f"Everyone reported for {report_date} - no admin alert needed")
+            return
 
-            # Отправляем повторные напоминания
-            for user in users_without_report:
-                try:
-                    await self.bot.send_message(
-                        user.telegram_id,
-                        "⚠️ <b>Последнее напоминание!</b>\n\n"
-                        f"🔔 {user.full_name.split()[0]}, вы ещё не отправили отчёт за сегодня.\n\n"
-                        "📋 Пожалуйста, заполните форму отчёта сейчас:\n\n"
-                        "⏱️ Отчёты принимаются до конца рабочего дня.",
-                        reply_markup=self._get_reminder_keyboard()
-                    )
-                    logger.debug(f"Repeat reminder sent to {user.full_name}")
-
-                    # Небольшая пауза между сообщениями
-                    await asyncio.sleep(0.1)
-
-                except Exception as e:
-                    logger.error(f"Failed to send repeat reminder to {user.full_name}: {e}")
+        from bot.rendering import send_long_message
 
+        try:
+            text = stage.render(report_date, names=[user.full_name for user in users_without_report])
+            await send_long_message(
+                self.bot, Config.ADMIN_TELEGRAM_ID, text.split('\n'),
+                document_name=f"missing_{report_date}.txt", head=3
+            )
+            logger.info(f"Admin alerted about {len(users_without_report)} missing reports for {report_date}")
         except Exception as e:
-            logger.error(f"Error in send_repeat_reminders: {e}")
+            logger.error(f"Error sending missing reports alert to admin: {e}")
 
     async def send_admin_daily_summary(self):
-        """Отправить админу ежедневную сводку"""
+        """Отправить админу ежедневную сводку (длинная делится на сообщения или уходит файлом)"""
+        from bot.rendering import send_long_message
+
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            today_display = datetime.now().strftime('%d.%m.%Y')
+            today = business_today()
+            today_display = business_today(format_string='%d.%m.%Y')
 
             # Получаем отчёты за сегодня
-            daily_reports = await self.db.get_daily_reports(today)
-            all_users = await self.db.get_all_users(active_only=True)
-            users_without_report = await self.db.get_users_without_report(today)
+            daily_reports = await self.db.get_daily_reports(today, replica=True)
+            all_users = await self.db.get_all_users(active_only=True, replica=True)
+            users_without_report = await self.db.get_users_without_report(today, replica=True)
 
             # Формируем сообщение
             total_users = len(all_users)
             reports_count = len(daily_reports)
             missing_count = len(users_without_report)
 
-            summary_text = (
-                f"📊 <b>Ежедневная сводка за {today_display}</b>\n\n"
-                f"👥 <b>Всего сотрудников:</b> {total_users}\n"
-                f"✅ <b>Отчёты отправлены:</b> {reports_count}\n"
-                f"❌ <b>Отчёты не отправлены:</b> {missing_count}\n\n"
-            )
+            lines = [
+                f"📊 <b>Ежедневная сводка за {today_display}</b>",
+                "",
+                f"👥 <b>Всего сотрудников:</b> {total_users}",
+                f"✅ <b>Отчёты отправлены:</b> {reports_count}",
+                f"❌ <b>Отчёты не отправлены:</b> {missing_count}",
+            ]
+            head = len(lines)
 
             if reports_count > 0:
-                summary_text += "📋 <b>Отправили отчёт:</b>\n"
+                lines += ["", "📋 <b>Отправили отчёт:</b>"]
                 for report in daily_reports:
-                    time_str = datetime.fromisoformat(report['submitted_at']).strftime('%H:%M')
-                    summary_text += f"• {report['full_name']} - {time_str}\n"
-                summary_text += "\n"
+                    time_str = format_moscow_time(datetime.fromisoformat(report['submitted_at']))
+                    lines.append(f"• {escape(report['full_name'])} - {time_str}")
 
             if missing_count > 0:
-                summary_text += "⚠️ <b>Не отправили отчёт:</b>\n"
-                for user in users_without_report:
-                    summary_text += f"• {user.full_name}\n"
+                lines += ["", "⚠️ <b>Не отправили отчёт:</b>"]
+                lines.extend(f"• {escape(user.full_name)}" for user in users_without_report)
 
             # Отправляем админу
-            await self.bot.send_message(
-                Config.ADMIN_TELEGRAM_ID,
-                summary_text
+            await send_long_message(
+                self.bot, Config.ADMIN_TELEGRAM_ID, lines,
+                document_name=f"summary_{today}.txt", head=head
             )
 
             logger.info(f"Daily summary sent to admin: {reports_count}/{total_users} reports")
@@ -210,21 +342,9 @@ class SchedulerService:
             logger.error(f"Error sending admin daily summary: {e}")
 
     def _get_reminder_keyboard(self):
-        """Получить клавиатуру для напоминания"""
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        from aiogram.types.web_app_info import WebAppInfo
-
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="📊 Отправить отчёт",
-                web_app=WebAppInfo(url=Config.WEBAPP_URL)
-            )],
-            [InlineKeyboardButton(
-                text="📈 Мой статус",
-                callback_data="check_status"
-            )]
-        ])
-        return keyboard
+        """Получить клавиатуру для напоминания (одна на всех получателей)"""
+        from bot.keyboards import get_reminder_keyboard
+        return get_reminder_keyboard()
 
     def get_status(self) -> dict:
         """Получить статус планировщика"""
@@ -0,0 +1,212 @@
+"""
+Статика Mini App для раздачи из нашего aiohttp сервера
+
+При старте каталог WEBAPP_DIR читается один раз:
+- каждый файл получает хеш содержимого — он идёт в ETag и в имя
+  (css/style.css -> css/style.3f2a9c1b.css);
+- index.html переписывается на хешированные имена: ресурсы с хешем
+  кэшируются навсегда (immutable), сам index.html всегда сверяется по ETag;
+- для текстовых файлов готовятся сжатые варианты gzip и, если установлен
+  пакет brotli, br. Готовые file.gz/file.br рядом с исходником (их кладёт
+  сборка) берутся как есть, остальные сжимаются в WEBAPP_CACHE_DIR.
+
+Ответ отдаётся файлом (FileResponse, sendfile без копирования в память).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+INDEX = 'index.html'
+COMPRESSIBLE = {'.html', '.css', '.js', '.svg', '.json', '.txt', '.map'}
+MIN_COMPRESS_BYTES = 256
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Порядок предпочтения кодировок
+ENCODINGS = ('br', 'gzip')
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def fingerprinted(name: str, digest: str) -> str:
+    """css/style.css -> css/style.<8 символов хеша>.css"""
+    stem, dot, ext = name.rpartition('.')
+    return f"{stem}.{digest[:8]}.{ext}" if dot else f"{name}.{digest[:8]}"
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{8})\.(?P<ext>[^./]+)$')
+
+def unfingerprinted(name: str, digest: str) -> Optional[str]:
+    """css/style.3f2a9c1b.css -> css/style.css, если хеш в имени совпадает с содержимым (файл из сборки)"""
+    match = _FINGERPRINTED.match(name)
+    if match and digest.startswith(match['hash']):
+        return f"{match['stem']}.{match['ext']}"
+    return None
+
+def accepted_encodings(header: str) -> List[str]:
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0"""
+    accepted = []
+    for item in header.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.append(name.strip())
+    return accepted
+
+class Asset:
+    """Один файл Mini App со всеми вариантами сжатия"""
+
+    def __init__(self, path: Path, digest: str, content_type: str, cache_control: str,
+                 variants: Dict[str, Path]):
+        self.path = path
+        self.digest = digest
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.variants = variants
+
+    def select(self, accept_encoding: str) -> Tuple[Optional[str], Path]:
+        """(кодировка или None, файл) для заголовка Accept-Encoding"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding, self.variants[encoding]
+        return None, self.path
+
+    def etag(self, encoding: Optional[str]) -> str:
+        """Сильный ETag варианта: у разных кодировок разные байты — разные теги"""
+        return f"{self.digest[:16]}-{encoding}" if encoding else self.digest[:16]
+
+    def matches(self, etags) -> bool:
+        """If-None-Match содержит тег любого варианта текущего содержимого"""
+        return any(
+            etag.value == '*' or etag.value.split('-')[0] == self.digest[:16]
+            for etag in etags
+        )
+
+class WebAppAssets:
+    """Манифест статики: путь в URL -> Asset"""
+
+    def __init__(self, root: str, cache_dir: str):
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir)
+        self.assets: Dict[str, Asset] = {}
+        self.bytes_total = 0
+        self.bytes_compressed = 0
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name or INDEX)
+
+    def load(self) -> "WebAppAssets":
+        """Прочитать каталог и подготовить варианты; блокирует — вызывать в executor"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        sources = sorted(
+            path for path in self.root.rglob('*')
+            if path.is_file() and path.suffix not in ('.gz', '.br')
+            and not any(part.startswith('.') for part in path.relative_to(self.root).parts)
+        )
+
+        renames: Dict[str, str] = {}
+        pages: List[Tuple[str, Path]] = []
+        for path in sources:
+            name = path.relative_to(self.root).as_posix()
+            if path.suffix == '.html':
+                pages.append((name, path))
+                continue
+            content = path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+            # Сборка (manage.py build-assets) уже дала файлу имя с хешем
+            original = unfingerprinted(name, digest)
+            if original:
+                hashed = name
+            else:
+                original, hashed = name, fingerprinted(name, digest)
+                renames[original] = hashed
+            self.assets[hashed] = self._asset(path, name, content, digest, IMMUTABLE)
+            # Имя без хеша тоже отвечает — для закэшированных страниц, но со сверкой
+            self.assets[original] = self._asset(path, name, content, digest, REVALIDATE)
+
+        # Страницы ссылаются на ресурсы по хешированным именам; переписанные лежат в кэше
+        for name, path in pages:
+            html = path.read_text(encoding='utf-8')
+            for original, hashed in renames.items():
+                for prefix in ('', './'):
+                    html = html.replace(f'"{prefix}{original}"', f'"{hashed}"')
+            content = html.encode('utf-8')
+            digest = hashlib.sha256(content).hexdigest()
+            rendered = self.cache_dir / f"{digest[:16]}.html"
+            if not rendered.exists():
+                _write_atomic(rendered, content)
+            self.assets[name] = self._asset(rendered, name, content, digest, REVALIDATE)
+
+        logger.info(
+            f"Mini App assets from {self.root}: {len(sources)} files, {self.bytes_total} bytes, "
+            f"{self.bytes_compressed} bytes compressed, brotli {'on' if brotli else 'off'}"
+        )
+        return self
+
+    def _asset(self, path: Path, name: str, content: bytes, digest: str, cache_control: str) -> Asset:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+
+        variants: Dict[str, Path] = {}
+        if Path(name).suffix in COMPRESSIBLE and len(content) >= MIN_COMPRESS_BYTES:
+            for encoding in ENCODINGS:
+                variant = self._variant(path, content, digest, encoding)
+                if variant:
+                    variants[encoding] = variant
+
+        # Объём первой загрузки: страница и ресурсы под хешированными именами
+        if cache_control == IMMUTABLE or path.suffix == '.html':
+            self.bytes_total += len(content)
+            self.bytes_compressed += min([len(content)] + [v.stat().st_size for v in variants.values()])
+        return Asset(path, digest, content_type, cache_control, variants)
+
+    def _variant(self, source: Path, content: bytes, digest: str, encoding: str) -> Optional[Path]:
+        suffix = SUFFIXES[encoding]
+        # Сборка уже положила сжатый файл рядом с исходником
+        prebuilt = source.with_name(source.name + suffix)
+        if prebuilt.exists() and prebuilt.stat().st_mtime >= source.stat().st_mtime:
+            return prebuilt
+
+        cached = self.cache_dir / f"{digest[:16]}{suffix}"
+        if cached.exists():
+            return cached
+        if encoding == 'br':
+            if brotli is None:
+                return None
+            compressed = brotli.compress(content, quality=11)
+        else:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            return None
+
+        _write_atomic(cached, compressed)
+        return cached
+
+def _write_atomic(path: Path, data: bytes):
+    """Запись через временный файл: параллельный процесс не увидит половину"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
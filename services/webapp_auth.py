@@ -0,0 +1,130 @@
+"""
+Проверка initData Telegram Mini App
+
+Mini App передаёт строку Telegram.WebApp.initData в заголовке
+Authorization: tma <initData>. Подпись проверяется по алгоритму Bot API:
+secret = HMAC_SHA256("WebAppData", BOT_TOKEN), hash = HMAC_SHA256(secret,
+data_check_string). Строка initData одна на весь сеанс Mini App, поэтому
+результат проверки кэшируется по ней до истечения срока.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from bot.config import Config
+from utils.metrics import REGISTRY
+
+WEBAPP_AUTH_CHECKS = REGISTRY.counter(
+    'webapp_auth_checks', 'Mini App initData verifications by result', ['result']
+)
+
+AUTH_SCHEME = 'tma'
+AUTH_CACHE_SIZE = 1024
+
+class InitDataError(ValueError):
+    """initData отсутствует, подделана или устарела"""
+
+class InitData:
+    """Проверенные данные запуска Mini App"""
+
+    def __init__(self, user: Dict, auth_date: int, query_id: Optional[str] = None):
+        self.user = user
+        self.auth_date = auth_date
+        self.query_id = query_id
+
+    @property
+    def telegram_id(self) -> int:
+        return int(self.user['id'])
+
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b'WebAppData', bot_token.encode('utf-8'), hashlib.sha256).digest()
+
+def parse_init_data(init_data: str, bot_token: str, max_age: Optional[int] = None,
+                    now: Optional[float] = None) -> InitData:
+    """Проверить подпись и срок initData; InitDataError, если что-то не так"""
+    if not init_data:
+        raise InitDataError("initData is empty")
+    try:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        raise InitDataError("initData is malformed")
+
+    received = fields.pop('hash', None)
+    if not received:
+        raise InitDataError("initData has no hash")
+    check_string = '\n'.join(f"{key}={fields[key]}" for key in sorted(fields))
+    expected = hmac.new(_secret_key(bot_token), check_string.encode('utf-8'), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, received):
+        raise InitDataError("initData signature mismatch")
+
+    try:
+        auth_date = int(fields['auth_date'])
+        user = json.loads(fields['user'])
+        int(user['id'])
+    except (KeyError, ValueError, TypeError):
+        raise InitDataError("initData has no user or auth_date")
+    if max_age and (now if now is not None else time.time()) - auth_date > max_age:
+        raise InitDataError("initData expired")
+    return InitData(user, auth_date, fields.get('query_id'))
+
+class InitDataVerifier:
+    """Проверка initData с кэшем на сеанс Mini App
+
+    Ключ кэша — хеш всей строки initData: подпись для неё уже сверена,
+    поэтому следующие запросы того же сеанса проходят без HMAC. Запись
+    живёт, пока initData не устарела (max_age от auth_date).
+    """
+
+    def __init__(self, bot_token: str, max_age: int, max_entries: int = AUTH_CACHE_SIZE):
+        # С пустым токеном подпись может вычислить кто угодно
+        if not bot_token:
+            raise ValueError("bot_token is required to verify initData")
+        self.bot_token = bot_token
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, InitData]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def verify(self, init_data: str) -> InitData:
+        key = hashlib.sha256(init_data.encode('utf-8')).digest()
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry and now < entry[0]:
+            WEBAPP_AUTH_CHECKS.inc(result='cached')
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        try:
+            parsed = parse_init_data(init_data, self.bot_token, self.max_age, now)
+        except InitDataError as e:
+            self._entries.pop(key, None)
+            WEBAPP_AUTH_CHECKS.inc(result='expired' if 'expired' in str(e) else 'invalid')
+            raise
+
+        WEBAPP_AUTH_CHECKS.inc(result='valid')
+        expires = parsed.auth_date + self.max_age if self.max_age else float('inf')
+        self._entries[key] = (expires, parsed)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return parsed
+
+    def from_header(self, header: Optional[str]) -> InitData:
+        """initData из заголовка Authorization: tma <initData>"""
+        scheme, _, value = (header or '').partition(' ')
+        if scheme.lower() != AUTH_SCHEME or not value.strip():
+            raise InitDataError("Authorization header must be 'tma <initData>'")
+        return self.verify(value.strip())
+
+def default_verifier() -> Optional[InitDataVerifier]:
+    """Проверка с токеном из конфигурации; None, если BOT_TOKEN не задан"""
+    if not Config.BOT_TOKEN:
+        return None
+    return InitDataVerifier(Config.BOT_TOKEN, Config.WEBAPP_AUTH_MAX_AGE)
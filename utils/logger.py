@@ -1,7 +1,112 @@
+import json
 import logging
 import colorlog
 import os
+import random
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, time
 from pathlib import Path
+from typing import Optional
+
+# Correlation ID of the Telegram update / API request / scheduler job being processed
+_correlation_id: ContextVar[str] = ContextVar('correlation_id', default='-')
+
+def get_correlation_id() -> str:
+    """Get correlation ID bound to the current context"""
+    return _correlation_id.get()
+
+def bind_correlation_id(value: Optional[str] = None, prefix: str = 'req'):
+    """Bind correlation ID to the current context, returns token for reset"""
+    if not value:
+        value = f"{prefix}-{uuid.uuid4().hex[:12]}"
+    return _correlation_id.set(value)
+
+def reset_correlation_id(token) -> None:
+    """Restore correlation ID that was active before bind_correlation_id"""
+    _correlation_id.reset(token)
+
+class CorrelationIdFilter(logging.Filter):
+    """Attach current correlation ID to every log record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = _correlation_id.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a share of DEBUG/INFO records, optionally inside a time window.
+
+    Sampling is decided per correlation ID, so all records of one update
+    are either kept or dropped together. WARNING and above always pass.
+    """
+
+    def __init__(self, rate: float, window: Optional[str] = None, timezone: Optional[str] = None):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+        self.window = self._parse_window(window) if window else None
+        self.timezone = timezone
+
+    @staticmethod
+    def _parse_window(window: str):
+        start, end = window.split('-')
+        return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+
+    def _in_window(self) -> bool:
+        if self.window is None:
+            return True
+
+        if self.timezone:
+            import pytz
+            now = datetime.now(pytz.timezone(self.timezone)).time()
+        else:
+            now = datetime.now().time()
+
+        start, end = self.window
+        if start <= end:
+            return start <= now < end
+        return now >= start or now < end
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+
+        if not self._in_window():
+            return True
+
+        correlation_id = getattr(record, 'correlation_id', None) or _correlation_id.get()
+        if correlation_id and correlation_id != '-':
+            return (zlib.crc32(correlation_id.encode()) % 10000) < self.rate * 10000
+        return random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log aggregation"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', _correlation_id.get()),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def _get_filters() -> list:
+    """Filters shared by all handlers"""
+    filters = [CorrelationIdFilter()]
+
+    sample_rate = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+    if sample_rate < 1.0:
+        filters.append(SamplingFilter(
+            rate=sample_rate,
+            window=os.getenv('LOG_SAMPLE_WINDOW') or None,
+            timezone=os.getenv('TIMEZONE', 'Europe/Moscow')
+        ))
+
+    return filters
 
 def get_logger(name: str) -> logging.Logger:
     """Get configured logger instance"""
@@ -17,23 +122,32 @@ def get_logger(name: str) -> logging.Logger:
     log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
     logger.setLevel(getattr(logging, log_level, logging.INFO))
 
+    # Output format: colored text (default) or JSON lines
+    json_format = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+    filters = _get_filters()
+
     # Console handler with colors
     console_handler = colorlog.StreamHandler()
     console_handler.setLevel(logging.DEBUG)
 
-    # Colorful formatter
-    console_formatter = colorlog.ColoredFormatter(
-        '%(log_color)s%(asctime)s [%(levelname)s] %(name)s: %(message)s%(reset)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'red,bg_white',
-        }
-    )
+    if json_format:
+        console_formatter = JsonFormatter()
+    else:
+        # Colorful formatter
+        console_formatter = colorlog.ColoredFormatter(
+            '%(log_color)s%(asctime)s [%(levelname)s] %(name)s [%(correlation_id)s]: %(message)s%(reset)s',
+            datefmt='%Y-%m-%d %H:%M:%S',
+            log_colors={
+                'DEBUG': 'cyan',
+                'INFO': 'green',
+                'WARNING': 'yellow',
+                'ERROR': 'red',
+                'CRITICAL': 'red,bg_white',
+            }
+        )
     console_handler.setFormatter(console_formatter)
+    for log_filter in filters:
+        console_handler.addFilter(log_filter)
     logger.addHandler(console_handler)
 
     # File handler (if LOG_FILE specified)
@@ -46,12 +160,17 @@ def get_logger(name: str) -> logging.Logger:
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setLevel(logging.DEBUG)
 
-        # Simple formatter for file
-        file_formatter = logging.Formatter(
-            '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if json_format:
+            file_formatter = JsonFormatter()
+        else:
+            # Simple formatter for file
+            file_formatter = logging.Formatter(
+                '%(asctime)s [%(levelname)s] %(name)s [%(correlation_id)s]: %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
         file_handler.setFormatter(file_formatter)
+        for log_filter in filters:
+            file_handler.addFilter(log_filter)
         logger.addHandler(file_handler)
 
-    return logger
\ No newline at end of file
+    return logger
@@ -1,31 +1,59 @@
 """
 Timezone utilities for proper datetime handling
+
+The "business date" of a report is the calendar date in the employee's
+timezone (users.timezone, falling back to Config.TIMEZONE), never the
+server's local date.
 """
-import pytz
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
 from bot.config import Config
 
+@lru_cache(maxsize=64)
+def get_timezone(name: Optional[str] = None):
+    """Get cached tz object; None or unknown name means Config.TIMEZONE
+
+    pytz is imported on first use to keep startup fast.
+    """
+    import pytz
+    try:
+        return pytz.timezone(name or Config.TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(Config.TIMEZONE)
+
+def is_valid_timezone(name: str) -> bool:
+    """Check that name is a known IANA timezone"""
+    import pytz
+    return name in pytz.all_timezones_set
+
+def business_now(tz_name: Optional[str] = None) -> datetime:
+    """Current aware datetime in the given timezone (default: Config.TIMEZONE)"""
+    return datetime.now(get_timezone(tz_name))
+
+def business_today(tz_name: Optional[str] = None, format_string: str = '%Y-%m-%d') -> str:
+    """Today's business date in the given timezone, as stored in reports.report_date"""
+    return business_now(tz_name).strftime(format_string)
+
 def get_moscow_timezone():
     """Get Moscow timezone object"""
-    return pytz.timezone(Config.TIMEZONE)
+    return get_timezone()
 
 def moscow_now():
     """Get current datetime in Moscow timezone"""
-    moscow_tz = get_moscow_timezone()
-    return datetime.now(moscow_tz)
+    return business_now()
 
-def format_moscow_time(dt, format_string='%H:%M'):
-    """Convert datetime to Moscow timezone and format it"""
+def format_moscow_time(dt, format_string='%H:%M', tz_name: Optional[str] = None):
+    """Convert datetime to Moscow (or the given) timezone and format it"""
     if dt is None:
         return ""
 
     # If datetime is naive (no timezone), assume it's UTC
     if dt.tzinfo is None:
-        dt = pytz.utc.localize(dt)
+        dt = dt.replace(tzinfo=timezone.utc)
 
     # Convert to Moscow timezone
-    moscow_tz = get_moscow_timezone()
-    moscow_dt = dt.astimezone(moscow_tz)
+    moscow_dt = dt.astimezone(get_timezone(tz_name))
 
     return moscow_dt.strftime(format_string)
 
@@ -33,4 +61,4 @@ def format_moscow_date(dt=None, format_string='%d.%m.%Y'):
     """Get Moscow date string"""
     if dt is None:
         dt = moscow_now()
-    return dt.strftime(format_string)
\ No newline at end of file
+    return dt.strftime(format_string)
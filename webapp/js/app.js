@@ -1,14 +1,47 @@
 // Telegram Mini App для отправки отчётов
 
+// Сколько ждать ответа сервера на одну попытку отправки
+const SUBMIT_TIMEOUT_MS = 10000;
+
+// Очередь неподтверждённых отправок в localStorage: report_date -> {user, payload, attempts, next_at}.
+// Ключи с ID пользователя Telegram: на одном устройстве могут работать разные аккаунты
+const QUEUE_KEY = 'report_queue';
+const SUBMISSION_KEY = 'report_submission';
+const RETRY_BASE_MS = 2000;
+const RETRY_MAX_MS = 60000;
+
+// Месяцы истории с ETag — неизменившийся месяц сервер отдаёт как 304 без тела
+const HISTORY_KEY = 'report_history';
+const MONTHS = ['Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+    'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'];
+
 class ReportApp {
     constructor() {
         this.tg = window.Telegram.WebApp;
         this.isFormValid = false;
+        this.isSubmitting = false;
+        // Бизнес-дата отчёта с сервера (по часовому поясу сотрудника); до ответа — дата устройства
+        this.reportDate = null;
+        // submission_id отправки, результат которой ждёт экран
+        this.pendingId = null;
+        this.flushing = false;
+        this.flushAgain = false;
+        this.retryTimer = null;
 
         this.initTelegramApp();
         this.initElements();
         this.initEventListeners();
         this.setupForm();
+        this.bootstrap();
+        // Общие для всех аккаунтов ключи прежних версий: чей там отчёт, уже не узнать
+        try {
+            localStorage.removeItem(QUEUE_KEY);
+            localStorage.removeItem(SUBMISSION_KEY);
+        } catch (e) {
+            console.warn('Cannot clean up old storage keys:', e);
+        }
+        // Отправки, не дошедшие в прошлый раз, уходят сразу при открытии
+        this.flushQueue();
     }
 
     initTelegramApp() {
@@ -35,9 +68,14 @@ class ReportApp {
         this.submitButton = document.getElementById('submitButton');
         this.loadingDiv = document.getElementById('loading');
         this.successDiv = document.getElementById('success');
+        this.successTitle = document.getElementById('successTitle');
+        this.successDetails = document.getElementById('successDetails');
         this.errorDiv = document.getElementById('error');
         this.errorMessage = document.getElementById('errorMessage');
         this.retryButton = document.getElementById('retryButton');
+        this.queuedDiv = document.getElementById('queued');
+        this.queuedMessage = document.getElementById('queuedMessage');
+        this.sendViaBotButton = document.getElementById('sendViaBotButton');
 
         // Поля формы
         this.employeeName = document.getElementById('employeeName');
@@ -54,6 +92,19 @@ class ReportApp {
 
         // Дата
         this.currentDate = document.getElementById('currentDate');
+
+        // Уже отправленный сегодня отчёт
+        this.existingReport = document.getElementById('existingReport');
+
+        // История отчётов
+        this.historyButton = document.getElementById('historyButton');
+        this.historySection = document.getElementById('history');
+        this.calendar = document.getElementById('calendar');
+        this.calendarTitle = document.getElementById('calendarTitle');
+        this.prevMonthButton = document.getElementById('prevMonth');
+        this.nextMonthButton = document.getElementById('nextMonth');
+        this.dayDetails = document.getElementById('dayDetails');
+        this.backToFormButton = document.getElementById('backToForm');
     }
 
     initEventListeners() {
@@ -69,6 +120,18 @@ class ReportApp {
 
         // Кнопка повтора
         this.retryButton.addEventListener('click', () => this.resetToForm());
+
+        // Отчёт ждёт связи: можно отправить его через бота, не дожидаясь
+        this.sendViaBotButton.addEventListener('click', () => this.sendQueuedViaBot());
+
+        // История: календарь по месяцам
+        this.historyButton.addEventListener('click', () => this.showHistory());
+        this.prevMonthButton.addEventListener('click', () => this.loadHistory(this.history.prev_month));
+        this.nextMonthButton.addEventListener('click', () => this.loadHistory(this.history.next_month));
+        this.backToFormButton.addEventListener('click', () => this.hideHistory());
+
+        // Связь вернулась — очередь уходит без ожидания следующей попытки
+        window.addEventListener('online', () => this.flushQueue(true));
     }
 
     setupForm() {
@@ -80,19 +143,211 @@ class ReportApp {
         });
         this.currentDate.textContent = today;
 
-        // Установить имя пользователя из Telegram
+        // Установить имя пользователя
+        this.setUserName();
+
+        // Инициализировать валидацию
+        this.updateSummaryAndValidation();
+    }
+
+    apiUrl(path) {
+        // API есть только у нашего сервера: форма, открытая с /webapp/, ходит туда же,
+        // копия на GitHub Pages работает без него
+        if (!window.location.pathname.startsWith('/webapp')) {
+            return null;
+        }
+        return `${window.location.origin}${path}`;
+    }
+
+    async bootstrap() {
+        // Сотрудник, сегодняшний отчёт и правила проверки одним запросом; подпись — initData Telegram
+        const url = this.apiUrl('/api/bootstrap');
+        if (!url || !this.tg.initData) {
+            return;
+        }
+
+        try {
+            const response = await fetch(url, {
+                headers: { 'Authorization': `tma ${this.tg.initData}` }
+            });
+            if (!response.ok) {
+                console.warn('Bootstrap failed:', response.status);
+                return;
+            }
+            this.applyBootstrap(await response.json());
+        } catch (error) {
+            console.warn('Bootstrap unavailable:', error);
+        }
+    }
+
+    applyBootstrap(data) {
+        this.employeeName.value = data.user.full_name;
+        this.historyButton.classList.remove('hidden');
+
+        this.reportDate = data.report_date;
+        const [year, month, day] = data.report_date.split('-');
+        this.currentDate.textContent = `${day}.${month}.${year}`;
+
+        const limits = data.limits || {};
+        [this.callsCount, this.kpPlus, this.kp, this.rejections, this.inadequate].forEach(input => {
+            input.min = limits.min_value ?? 0;
+        });
+        if (limits.min_calls !== undefined) {
+            this.callsCount.min = limits.min_calls;
+        }
+
+        const report = data.report;
+        if (report) {
+            // Поля, которые сотрудник уже начал заполнять, не перетираются
+            const fields = {
+                calls_count: this.callsCount, kp_plus: this.kpPlus, kp: this.kp,
+                rejections: this.rejections, inadequate: this.inadequate
+            };
+            Object.entries(fields).forEach(([name, input]) => {
+                if (input.value === '') {
+                    input.value = report[name];
+                }
+            });
+            this.existingReport.textContent =
+                `Отчёт за сегодня уже отправлен в ${report.submitted_at}. Повторная отправка обновит его.`;
+            this.existingReport.classList.remove('hidden');
+        }
+
+        this.updateSummaryAndValidation();
+    }
+
+    showHistory() {
+        this.form.classList.add('hidden');
+        this.historyButton.classList.add('hidden');
+        this.historySection.classList.remove('hidden');
+        this.loadHistory((this.reportDate || this.localDate()).slice(0, 7));
+    }
+
+    hideHistory() {
+        this.historySection.classList.add('hidden');
+        this.historyButton.classList.remove('hidden');
+        this.form.classList.remove('hidden');
+    }
+
+    async loadHistory(month) {
+        // Месяц из localStorage сверяется с сервером по ETag; 304 — показываем сохранённый
+        if (!month) {
+            return;
+        }
+        let saved = {};
+        try {
+            saved = JSON.parse(localStorage.getItem(HISTORY_KEY) || '{}');
+        } catch (e) {
+            console.warn('Saved history is unreadable:', e);
+        }
+        const userId = this.tg.initDataUnsafe?.user?.id;
+        const cached = saved.user === userId ? saved.months?.[month] : null;
+
+        const headers = { 'Authorization': `tma ${this.tg.initData}` };
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+        try {
+            const response = await fetch(this.apiUrl(`/api/history?month=${month}`), { headers });
+            if (response.status === 304 && cached) {
+                this.renderCalendar(cached.data);
+                return;
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const data = await response.json();
+            const months = saved.user === userId ? (saved.months || {}) : {};
+            months[month] = { etag: response.headers.get('ETag'), data };
+            try {
+                localStorage.setItem(HISTORY_KEY, JSON.stringify({ user: userId, months }));
+            } catch (e) {
+                console.warn('Cannot save history:', e);
+            }
+            this.renderCalendar(data);
+        } catch (error) {
+            console.warn('History unavailable:', error);
+            if (cached) {
+                this.renderCalendar(cached.data);
+            } else {
+                this.dayDetails.textContent = 'Не удалось загрузить историю. Проверьте связь.';
+            }
+        }
+    }
+
+    renderCalendar(data) {
+        this.history = data;
+        const [year, month] = data.month.split('-').map(Number);
+        this.calendarTitle.textContent = `${MONTHS[month - 1]} ${year}`;
+        this.prevMonthButton.disabled = !data.prev_month;
+        this.nextMonthButton.disabled = !data.next_month;
+        this.dayDetails.textContent = data.reports.length
+            ? `Отчётов за месяц: ${data.reports.length}. Выберите день, чтобы посмотреть отчёт`
+            : 'За этот месяц отчётов нет';
+
+        const reports = Object.fromEntries(data.reports.map(r => [r.report_date, r]));
+        const cells = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'].map(day => `<span class="weekday">${day}</span>`);
+        // Неделя с понедельника: пустые клетки до первого числа
+        const offset = (new Date(year, month - 1, 1).getDay() + 6) % 7;
+        for (let i = 0; i < offset; i++) {
+            cells.push('<span></span>');
+        }
+        const days = new Date(year, month, 0).getDate();
+        for (let day = 1; day <= days; day++) {
+            const date = `${data.month}-${String(day).padStart(2, '0')}`;
+            cells.push(reports[date]
+                ? `<span class="reported" data-date="${date}">${day}</span>`
+                : `<span>${day}</span>`);
+        }
+        this.calendar.innerHTML = cells.join('');
+        this.calendar.querySelectorAll('.reported').forEach(cell => {
+            cell.addEventListener('click', () => this.showDay(reports[cell.dataset.date]));
+        });
+    }
+
+    showDay(report) {
+        const [year, month, day] = report.report_date.split('-');
+        const resultative = report.kp_plus + report.kp;
+        const conversion = report.calls_count > 0 ? Math.round(resultative / report.calls_count * 100) : 0;
+        this.dayDetails.textContent =
+            `${day}.${month}.${year}, отправлен в ${report.submitted_at}: звонков ${report.calls_count}, ` +
+            `КЦ+ ${report.kp_plus}, КЦ ${report.kp}, отказов ${report.rejections}, ` +
+            `пустых ${report.inadequate}. Конверсия ${conversion}%.`;
+    }
+
+    setUserName() {
+        // Сначала попробуем получить имя из URL параметров (от бота)
+        const urlParams = new URLSearchParams(window.location.search);
+        const userNameFromUrl = urlParams.get('user_name');
+
+        if (userNameFromUrl) {
+            this.employeeName.value = decodeURIComponent(userNameFromUrl);
+            return;
+        }
+
+        // Если нет параметра URL, используем данные Telegram
         const user = this.tg.initDataUnsafe?.user;
-        if (user) {
+
+        if (user && user.id) {
+            // Попробуем получить имя из localStorage (если оно было сохранено ранее)
+            const savedName = localStorage.getItem(`user_name_${user.id}`);
+            if (savedName) {
+                this.employeeName.value = savedName;
+                console.log('Using saved user name:', savedName);
+                return;
+            }
+
+            // Если сохраненного имени нет, используем данные из Telegram
             const fullName = `${user.first_name} ${user.last_name || ''}`.trim();
             this.employeeName.value = fullName;
-            console.log('User info:', user);
+            console.log('Using Telegram user info:', user);
+
+            // Сохраним для следующего раза
+            localStorage.setItem(`user_name_${user.id}`, fullName);
         } else {
             this.employeeName.value = 'Пользователь';
             console.warn('No user info available');
         }
-
-        // Инициализировать валидацию
-        this.updateSummaryAndValidation();
     }
 
     updateSummaryAndValidation() {
@@ -195,6 +450,12 @@ class ReportApp {
             return;
         }
 
+        // Двойное нажатие не отправляет отчёт второй раз
+        if (this.isSubmitting) {
+            return;
+        }
+        this.isSubmitting = true;
+
         this.showLoading();
 
         const reportData = {
@@ -203,56 +464,343 @@ class ReportApp {
             kp: parseInt(this.kp.value),
             rejections: parseInt(this.rejections.value),
             inadequate: parseInt(this.inadequate.value),
-            report_date: new Date().toISOString().split('T')[0],
-            employee_name: this.employeeName.value
+            report_date: this.reportDate || this.localDate()
         };
+        reportData.submission_id = this.getSubmissionId(reportData);
+
+        console.log('Sending report data:', reportData);
+
+        // Без нашего сервера (копия на GitHub Pages) отчёт идёт только через бота
+        if (!this.apiUrl('/api/submit_report') || !this.tg.initData) {
+            this.sendViaBot(reportData);
+            return;
+        }
+
+        // Сначала на устройство: отчёт не потеряется, даже если связь пропадёт прямо сейчас
+        this.pendingId = reportData.submission_id;
+        this.enqueue(reportData);
+        await this.flushQueue(true);
+    }
+
+    userId() {
+        return this.tg.initDataUnsafe?.user?.id || null;
+    }
 
+    userKey(base) {
+        // Ключ localStorage текущего аккаунта; null — пользователь неизвестен, сохранять некуда
+        const userId = this.userId();
+        return userId ? `${base}_${userId}` : null;
+    }
+
+    loadQueue() {
+        const key = this.userKey(QUEUE_KEY);
+        if (!key) {
+            return {};
+        }
         try {
-            console.log('Sending report data:', reportData);
+            const queue = JSON.parse(localStorage.getItem(key) || '{}');
+            // Чужие записи не отправляются с initData этого аккаунта
+            const userId = this.userId();
+            return Object.fromEntries(Object.entries(queue).filter(([, entry]) => entry.user === userId));
+        } catch (e) {
+            console.warn('Report queue is unreadable:', e);
+            return {};
+        }
+    }
 
-            // Отправить данные через Telegram Web App
-            this.tg.sendData(JSON.stringify(reportData));
+    saveQueue(queue) {
+        const key = this.userKey(QUEUE_KEY);
+        if (!key) {
+            return;
+        }
+        try {
+            localStorage.setItem(key, JSON.stringify(queue));
+        } catch (e) {
+            console.warn('Cannot save report queue:', e);
+        }
+    }
+
+    enqueue(reportData) {
+        // Одна отправка на дату: новый отчёт за тот же день заменяет ещё не ушедший
+        const queue = this.loadQueue();
+        queue[reportData.report_date] = { user: this.userId(), payload: reportData, attempts: 0, next_at: 0 };
+        this.saveQueue(queue);
+    }
+
+    updateQueued(payload, change) {
+        // Очередь перечитывается: пока шёл запрос, отчёт за эту дату могли заменить
+        const queue = this.loadQueue();
+        const entry = queue[payload.report_date];
+        if (!entry || entry.payload.submission_id !== payload.submission_id) {
+            return null;
+        }
+        if (change === null) {
+            delete queue[payload.report_date];
+        } else {
+            Object.assign(entry, change);
+        }
+        this.saveQueue(queue);
+        return entry;
+    }
+
+    backoff(attempts) {
+        const delay = Math.min(RETRY_BASE_MS * 2 ** (attempts - 1), RETRY_MAX_MS);
+        return delay / 2 + Math.random() * delay / 2;
+    }
+
+    async flushQueue(now = false) {
+        // Отправить всё, чему подошло время; до подтверждения по submission_id запись остаётся в очереди
+        if (!this.apiUrl('/api/submit_report') || !this.tg.initData) {
+            return;
+        }
+        if (this.flushing) {
+            this.flushAgain = true;
+            return;
+        }
+        this.flushing = true;
+        clearTimeout(this.retryTimer);
+
+        let nextDelay = null;
+        try {
+            for (const entry of Object.values(this.loadQueue())) {
+                const wait = entry.next_at - Date.now();
+                if (wait > 0 && !now) {
+                    nextDelay = Math.min(nextDelay ?? wait, wait);
+                    continue;
+                }
+                const delay = await this.deliver(entry.payload);
+                if (delay !== null) {
+                    nextDelay = Math.min(nextDelay ?? delay, delay);
+                }
+            }
+        } finally {
+            this.flushing = false;
+        }
+
+        if (this.flushAgain) {
+            this.flushAgain = false;
+            await this.flushQueue(true);
+        } else if (nextDelay !== null) {
+            this.retryTimer = setTimeout(() => this.flushQueue(), nextDelay);
+        }
+    }
+
+    async deliver(payload) {
+        // Одна попытка; возвращает задержку до следующей или null, если запись из очереди ушла
+        const current = payload.submission_id === this.pendingId;
+        let response = null;
+        try {
+            response = await this.postReport(payload);
+        } catch (error) {
+            console.warn('Report submit failed, will retry:', error);
+        }
+
+        if (response && response.ok) {
+            const result = await response.json();
+            this.updateQueued(payload, null);
+            if (current) {
+                this.pendingId = null;
+                this.showConfirmation(result);
+            } else {
+                // Отчёт из прошлого открытия формы наконец дошёл
+                const [year, month, day] = result.report.report_date.split('-');
+                this.existingReport.textContent =
+                    `Отчёт за ${day}.${month}.${year}, сохранённый без связи, отправлен.`;
+                this.existingReport.classList.remove('hidden');
+            }
+            return null;
+        }
+
+        if (response && response.status === 401) {
+            // initData этого сеанса больше не принимается — отчёт уйдёт при следующем открытии формы
+            if (current) {
+                this.showQueued('Сеанс формы устарел. Отчёт сохранён и уйдёт при следующем открытии формы.');
+            }
+            return null;
+        }
+
+        if (response && response.status < 500) {
+            // Сервер отчёт не примет и при повторе: неверные данные или дата вне допустимого окна
+            const body = await response.json().catch(() => ({}));
+            console.error('Report rejected:', response.status, body);
+            this.updateQueued(payload, null);
+            if (current) {
+                this.pendingId = null;
+                this.isSubmitting = false;
+                this.showError('Отчёт не принят: проверьте значения и попробуйте ещё раз.');
+            }
+            return null;
+        }
+
+        // Нет связи, таймаут или ошибка сервера — повтор с нарастающей паузой
+        const attempts = (this.loadQueue()[payload.report_date]?.attempts || 0) + 1;
+        const delay = this.backoff(attempts);
+        if (!this.updateQueued(payload, { attempts, next_at: Date.now() + delay })) {
+            return null;
+        }
+        if (current) {
+            this.showQueued(
+                `Нет связи с сервером. Отчёт сохранён на устройстве, повторная отправка через ${Math.ceil(delay / 1000)} с.`
+            );
+        }
+        return delay;
+    }
+
+    sendQueuedViaBot() {
+        // Отправка ждущего отчёта через Telegram; запись остаётся в очереди — повтор с тем же ID сервер узнает
+        const entry = Object.values(this.loadQueue()).find(e => e.payload.submission_id === this.pendingId);
+        if (entry) {
+            this.sendViaBot(entry.payload);
+        }
+    }
+
+    async postReport(reportData) {
+        // Прямая отправка на наш сервер с подписью initData; null — прямой путь недоступен
+        const url = this.apiUrl('/api/submit_report');
+        if (!url || !this.tg.initData) {
+            return null;
+        }
 
-            // Показать успех (это сработает, если sendData не закроет приложение)
-            setTimeout(() => {
-                this.showSuccess();
-            }, 1000);
+        const controller = new AbortController();
+        const timer = setTimeout(() => controller.abort(), SUBMIT_TIMEOUT_MS);
+        try {
+            return await fetch(url, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Authorization': `tma ${this.tg.initData}`
+                },
+                body: JSON.stringify(reportData),
+                signal: controller.signal
+            });
+        } finally {
+            clearTimeout(timer);
+        }
+    }
 
+    sendViaBot(reportData) {
+        // Запасной путь: данные идут боту через Telegram, Mini App при этом закрывается
+        try {
+            this.tg.sendData(JSON.stringify(reportData));
+            this.showSuccess();
         } catch (error) {
             console.error('Error submitting report:', error);
+            this.isSubmitting = false;
             this.showError('Ошибка отправки отчёта. Попробуйте ещё раз.');
         }
     }
 
+    localDate() {
+        // Дата устройства (не UTC) — та, что показана в шапке формы
+        const now = new Date();
+        const month = String(now.getMonth() + 1).padStart(2, '0');
+        const day = String(now.getDate()).padStart(2, '0');
+        return `${now.getFullYear()}-${month}-${day}`;
+    }
+
+    getSubmissionId(reportData) {
+        // Повторная отправка тех же данных (после ошибки или переоткрытия формы) идёт с тем же ID —
+        // сервер узнаёт повтор и не сохраняет отчёт второй раз
+        const key = JSON.stringify([
+            reportData.report_date, reportData.calls_count, reportData.kp_plus,
+            reportData.kp, reportData.rejections, reportData.inadequate
+        ]);
+        const storageKey = this.userKey(SUBMISSION_KEY);
+        try {
+            const saved = storageKey && JSON.parse(localStorage.getItem(storageKey) || 'null');
+            if (saved && saved.key === key) {
+                return saved.id;
+            }
+        } catch (e) {
+            console.warn('Saved submission ID is unreadable:', e);
+        }
+
+        const id = this.generateId();
+        try {
+            if (storageKey) {
+                localStorage.setItem(storageKey, JSON.stringify({ key, id }));
+            }
+        } catch (e) {
+            console.warn('Cannot save submission ID:', e);
+        }
+        return id;
+    }
+
+    generateId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        const bytes = new Uint8Array(16);
+        (window.crypto || window.msCrypto).getRandomValues(bytes);
+        return Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+    }
+
     showLoading() {
         this.form.classList.add('hidden');
         this.successDiv.classList.add('hidden');
         this.errorDiv.classList.add('hidden');
+        this.queuedDiv.classList.add('hidden');
         this.loadingDiv.classList.remove('hidden');
     }
 
-    showSuccess() {
+    showQueued(message) {
+        this.queuedMessage.textContent = message;
         this.form.classList.add('hidden');
         this.loadingDiv.classList.add('hidden');
+        this.successDiv.classList.add('hidden');
+        this.errorDiv.classList.add('hidden');
+        this.queuedDiv.classList.remove('hidden');
+    }
+
+    showConfirmation(result) {
+        // Ответ сервера после записи в базу: что именно сохранено и куда ещё ушло
+        const report = result.report;
+        const [year, month, day] = report.report_date.split('-');
+        this.successTitle.textContent = result.duplicate ? 'Этот отчёт уже принят' : 'Отчёт сохранён';
+
+        let sheets = 'Google Таблица: ошибка выгрузки, данные в базе сохранены';
+        if (result.sheets === null) {
+            sheets = 'Google Таблица: выгрузка ещё идёт';
+        } else if (result.sheets) {
+            sheets = 'Google Таблица: сохранено';
+        }
+        this.successDetails.textContent =
+            `${day}.${month}.${year}, ${report.submitted_at}: звонков ${report.calls_count}, ` +
+            `КЦ+ ${report.kp_plus}, КЦ ${report.kp}. ${sheets}.`;
+
+        if (this.tg.HapticFeedback) {
+            this.tg.HapticFeedback.notificationOccurred('success');
+        }
+        // Подтверждение стоит дать прочитать
+        this.showSuccess(4000);
+    }
+
+    showSuccess(closeAfterMs = 2000) {
+        this.form.classList.add('hidden');
+        this.queuedDiv.classList.add('hidden');
+        this.loadingDiv.classList.add('hidden');
         this.errorDiv.classList.add('hidden');
         this.successDiv.classList.remove('hidden');
 
         // Уведомить Telegram, что приложение готово к закрытию
         setTimeout(() => {
             this.tg.close();
-        }, 2000);
+        }, closeAfterMs);
     }
 
     showError(message) {
         this.errorMessage.textContent = message;
         this.form.classList.add('hidden');
+        this.queuedDiv.classList.add('hidden');
         this.loadingDiv.classList.add('hidden');
         this.successDiv.classList.add('hidden');
         this.errorDiv.classList.remove('hidden');
     }
 
     resetToForm() {
+        this.isSubmitting = false;
         this.form.classList.remove('hidden');
+        this.queuedDiv.classList.add('hidden');
         this.loadingDiv.classList.add('hidden');
         this.successDiv.classList.add('hidden');
         this.errorDiv.classList.add('hidden');
@@ -273,4 +821,5 @@ window.addEventListener('error', (event) => {
 window.addEventListener('unhandledrejection', (event) => {
     console.error('Unhandled promise rejection:', event.reason);
     event.preventDefault();
-});
\ No newline at end of file
+});
+